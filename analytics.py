@@ -0,0 +1,527 @@
+"""
+Offline analytics over the run history.
+
+Exports the runs, their participants and the outcomes of finished groups from the bot's
+database into a compact columnar snapshot file, and computes per-user and per-server
+statistics on top of it: keys by dungeon, role mix, completion rate and weekly trends.
+
+The export reads through its own read-only connection inside a single read transaction.
+The database runs in WAL mode, so the bot keeps writing while the export streams the
+tables in chunks, and the snapshot is consistent as of the moment the export started.
+Statistics are computed from the snapshot alone and never touch the database.
+
+Snapshots store every column as a raw little-endian array, so they load straight into
+NumPy arrays when NumPy is installed and into array.array otherwise.
+
+Usage:
+    python analytics.py export [--db data/mythicmate.db] [--out data/analytics.snapshot]
+    python analytics.py stats --guild ID [--user ID] [--snapshot data/analytics.snapshot]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SNAPSHOT_PATH = "data/analytics.snapshot"
+
+SNAPSHOT_MAGIC = b"MMSNAP01"
+
+# Rows fetched from SQLite at a time while exporting
+CHUNK_SIZE = 10_000
+
+# Column name -> array typecode. Runs and outcomes are referenced by their row index,
+# dungeons and roles by their code in the snapshot's dictionaries.
+COLUMNS = {
+    "run_server": "q",
+    "run_dungeon": "i",
+    "run_key": "i",
+    "run_time": "q",
+    "participant_run": "i",
+    "participant_server": "q",
+    "participant_user": "q",
+    "participant_role": "b",
+    "outcome_server": "q",
+    "outcome_dungeon": "i",
+    "outcome_key": "i",
+    "outcome_completed": "b",
+    "outcome_time": "q",
+    "member_outcome": "i",
+    "member_user": "q",
+}
+
+ROLES = ("Tank", "Healer", "DPS")
+
+# Weeks start on Monday, 1970-01-01 was a Thursday
+WEEK = 7 * 86400
+WEEK_OFFSET = 3 * 86400
+
+EXPORT_RUNS = '''
+    SELECT run_id, CAST(server_id AS INTEGER), dungeon_name, key_level, CAST(strftime('%s', completion_time) AS INTEGER)
+    FROM runs
+    WHERE completion_time IS NOT NULL
+    ORDER BY CAST(server_id AS INTEGER), completion_time
+'''
+
+EXPORT_PARTICIPANTS = '''
+    SELECT run_id, CAST(server_id AS INTEGER), CAST(user_id AS INTEGER), role
+    FROM participants
+    ORDER BY CAST(server_id AS INTEGER), CAST(user_id AS INTEGER)
+'''
+
+EXPORT_OUTCOMES = '''
+    SELECT CAST(server_id AS INTEGER), dungeon_name, key_level, outcome,
+        CAST(strftime('%s', finished_at) AS INTEGER), members
+    FROM group_outcomes
+    ORDER BY CAST(server_id AS INTEGER), finished_at
+'''
+
+
+def _key_level(text):
+    # Group key levels are stored as entered, e.g. "+10"
+    try:
+        return int(str(text).strip().lstrip("+"))
+    except ValueError:
+        return -1
+
+
+class Snapshot:
+    """
+    Columnar copy of the run history.
+
+    Runs and outcomes are sorted by server, participants by server and user, and group
+    members by user, so the rows of one server or user are found by binary search.
+
+    Attributes:
+        columns: Column name -> array, see COLUMNS
+        dungeons: Dungeon names, indexed by the dungeon codes
+        roles: Role names, indexed by the role codes
+        created_at: Unix time the export started
+    """
+    def __init__(self, columns, dungeons, roles=ROLES, created_at=None):
+        self.columns = columns
+        self.dungeons = list(dungeons)
+        self.roles = list(roles)
+        self.created_at = created_at if created_at is not None else int(time.time())
+
+    def __len__(self):
+        return len(self.columns["run_key"])
+
+    @classmethod
+    def export(cls, db_path, chunk_size=CHUNK_SIZE):
+        """
+        Streams the run history out of a database into a new snapshot.
+
+        Args:
+            db_path: Path to the bot's SQLite database
+            chunk_size: Rows fetched at a time
+
+        Returns:
+            Snapshot: The exported history
+        """
+        columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        dungeon_codes = {}
+        role_codes = {role: code for code, role in enumerate(ROLES)}
+        run_rows = {}  # run_id -> row index
+        members = []  # (user_id, outcome row index)
+
+        def dungeon_code(name):
+            code = dungeon_codes.get(name)
+            if code is None:
+                code = dungeon_codes[name] = len(dungeon_codes)
+            return code
+
+        def chunks(cursor):
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+        try:
+            # One read transaction, so all tables are read as of the same moment
+            conn.execute('BEGIN')
+            created_at = int(time.time())
+
+            for rows in chunks(conn.execute(EXPORT_RUNS)):
+                for run_id, server_id, dungeon_name, key_level, completed_at in rows:
+                    run_rows[run_id] = len(run_rows)
+                    columns["run_server"].append(server_id)
+                    columns["run_dungeon"].append(dungeon_code(dungeon_name))
+                    columns["run_key"].append(key_level)
+                    columns["run_time"].append(completed_at)
+
+            for rows in chunks(conn.execute(EXPORT_PARTICIPANTS)):
+                for run_id, server_id, user_id, role in rows:
+                    row = run_rows.get(run_id)
+                    if row is None:
+                        continue
+                    if role not in role_codes:
+                        role_codes[role] = len(role_codes)
+                    columns["participant_run"].append(row)
+                    columns["participant_server"].append(server_id)
+                    columns["participant_user"].append(user_id)
+                    columns["participant_role"].append(role_codes[role])
+
+            for rows in chunks(conn.execute(EXPORT_OUTCOMES)):
+                for server_id, dungeon_name, key_level, outcome, finished_at, members_json in rows:
+                    row = len(columns["outcome_server"])
+                    columns["outcome_server"].append(server_id)
+                    columns["outcome_dungeon"].append(dungeon_code(dungeon_name))
+                    columns["outcome_key"].append(_key_level(key_level))
+                    columns["outcome_completed"].append(1 if outcome == "completed" else 0)
+                    columns["outcome_time"].append(finished_at)
+                    members.extend((int(user_id), row) for user_id in json.loads(members_json))
+        finally:
+            conn.close()
+
+        members.sort()
+        for user_id, row in members:
+            columns["member_user"].append(user_id)
+            columns["member_outcome"].append(row)
+
+        return cls(columns, dungeon_codes, role_codes, created_at)
+
+    def save(self, path):
+        """
+        Writes the snapshot to a file, replacing it atomically.
+
+        The file starts with SNAPSHOT_MAGIC and the length of a JSON header, followed by
+        the header and the columns as raw little-endian arrays, each aligned to 8 bytes.
+
+        Args:
+            path: Path of the snapshot file
+        """
+        buffers = []
+        layout = {}
+        offset = 0
+        for name, typecode in COLUMNS.items():
+            values = self.columns[name]
+            if numpy is not None and isinstance(values, numpy.ndarray):
+                data = values.astype(numpy.dtype(typecode).newbyteorder("<"), copy=False).tobytes()
+            else:
+                values = array(typecode, values)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                data = values.tobytes()
+            layout[name] = {"type": typecode, "offset": offset, "length": len(values)}
+            padding = -len(data) % 8
+            buffers.append(data + b"\0" * padding)
+            offset += len(data) + padding
+
+        header = json.dumps({
+            "created_at": self.created_at,
+            "dungeons": self.dungeons,
+            "roles": self.roles,
+            "columns": layout,
+        }).encode()
+        header += b" " * (-(len(SNAPSHOT_MAGIC) + 4 + len(header)) % 8)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for data in buffers:
+                f.write(data)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a snapshot file.
+
+        Args:
+            path: Path of the snapshot file
+
+        Returns:
+            Snapshot: The snapshot, with NumPy arrays as columns if NumPy is installed
+
+        Raises:
+            ValueError: If the file isn't a snapshot
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not an analytics snapshot")
+        start = len(SNAPSHOT_MAGIC) + 4
+        header_length, = struct.unpack_from("<I", data, len(SNAPSHOT_MAGIC))
+        header = json.loads(data[start:start + header_length])
+        body = start + header_length
+
+        columns = {}
+        for name, typecode in COLUMNS.items():
+            info = header["columns"][name]
+            offset = body + info["offset"]
+            if numpy is not None:
+                dtype = numpy.dtype(typecode).newbyteorder("<")
+                columns[name] = numpy.frombuffer(data, dtype=dtype, count=info["length"], offset=offset)
+            else:
+                values = array(typecode)
+                values.frombytes(data[offset:offset + info["length"] * values.itemsize])
+                if sys.byteorder == "big":
+                    values.byteswap()
+                columns[name] = values
+        return cls(columns, header["dungeons"], header["roles"], header["created_at"])
+
+
+class _NumpyOps:
+    # Column operations on NumPy arrays
+
+    @staticmethod
+    def span(column, value, lo=0, hi=None):
+        part = column[lo:hi]
+        return lo + int(numpy.searchsorted(part, value, "left")), lo + int(numpy.searchsorted(part, value, "right"))
+
+    @staticmethod
+    def where(column, value, indices):
+        return indices[column[indices] == value]
+
+    @staticmethod
+    def take(column, indices):
+        if isinstance(indices, range):
+            return column[indices.start:indices.stop]
+        return column[indices]
+
+    @staticmethod
+    def weeks(times, first_week):
+        return (times.astype(numpy.int64) + WEEK_OFFSET) // WEEK - first_week
+
+    @staticmethod
+    def group_stats(keys, values, size):
+        keys = numpy.asarray(keys, dtype=numpy.int64)
+        values = numpy.asarray(values, dtype=numpy.int64)
+        in_range = (keys >= 0) & (keys < size)
+        keys, values = keys[in_range], values[in_range]
+        counts = numpy.bincount(keys, minlength=size)
+        sums = numpy.bincount(keys, weights=values, minlength=size)
+        maxes = numpy.full(size, -1, dtype=numpy.int64)
+        numpy.maximum.at(maxes, keys, values)
+        return counts.tolist(), sums.tolist(), maxes.tolist()
+
+    @staticmethod
+    def count_unique(values):
+        return len(numpy.unique(values))
+
+    @staticmethod
+    def total(values):
+        return int(numpy.sum(values, dtype=numpy.int64))
+
+
+class _ArrayOps:
+    # The same operations on array.array, for installs without NumPy
+
+    @staticmethod
+    def span(column, value, lo=0, hi=None):
+        hi = len(column) if hi is None else hi
+        return bisect_left(column, value, lo, hi), bisect_right(column, value, lo, hi)
+
+    @staticmethod
+    def where(column, value, indices):
+        return [i for i in indices if column[i] == value]
+
+    @staticmethod
+    def take(column, indices):
+        if isinstance(indices, range):
+            return column[indices.start:indices.stop]
+        return [column[i] for i in indices]
+
+    @staticmethod
+    def weeks(times, first_week):
+        return [(t + WEEK_OFFSET) // WEEK - first_week for t in times]
+
+    @staticmethod
+    def group_stats(keys, values, size):
+        counts = [0] * size
+        sums = [0] * size
+        maxes = [-1] * size
+        for key, value in zip(keys, values):
+            if 0 <= key < size:
+                counts[key] += 1
+                sums[key] += value
+                if value > maxes[key]:
+                    maxes[key] = value
+        return counts, sums, maxes
+
+    @staticmethod
+    def count_unique(values):
+        return len(set(values))
+
+    @staticmethod
+    def total(values):
+        return sum(values)
+
+
+class StatsEngine:
+    """
+    Computes statistics from a snapshot with whole-column operations.
+
+    Each summary finds the rows of a user or server by binary search and aggregates them
+    per dungeon, role, key level and week in single passes, using NumPy when the snapshot
+    columns are NumPy arrays.
+
+    Attributes:
+        snapshot: The Snapshot statistics are computed from
+        weeks: Number of weeks in the weekly trends, ending with the snapshot's week
+    """
+    def __init__(self, snapshot, weeks=8):
+        self.snapshot = snapshot
+        self.weeks = weeks
+        columns = snapshot.columns
+        self.ops = _NumpyOps if numpy is not None and isinstance(columns["run_key"], numpy.ndarray) else _ArrayOps
+        self._first_week = (snapshot.created_at + WEEK_OFFSET) // WEEK - weeks + 1
+
+    def _run_stats(self, runs):
+        # Aggregates the runs at the given row indices
+        ops, columns = self.ops, self.snapshot.columns
+        keys = ops.take(columns["run_key"], runs)
+        dungeons = ops.take(columns["run_dungeon"], runs)
+        counts, sums, maxes = ops.group_stats(dungeons, keys, len(self.snapshot.dungeons))
+        by_dungeon = {
+            self.snapshot.dungeons[code]: {
+                "runs": count,
+                "average_key": round(sums[code] / count, 1),
+                "max_key": maxes[code],
+            }
+            for code, count in enumerate(counts) if count
+        }
+        by_dungeon = dict(sorted(by_dungeon.items(), key=lambda item: (-item[1]["runs"], item[0])))
+
+        weeks = ops.weeks(ops.take(columns["run_time"], runs), self._first_week)
+        week_counts, _, week_maxes = ops.group_stats(weeks, keys, self.weeks)
+        weekly = [
+            {
+                "week": self._week_start(week).isoformat(),
+                "runs": count,
+                "max_key": week_maxes[week] if count else None,
+            }
+            for week, count in enumerate(week_counts)
+        ]
+
+        total = len(keys)
+        return {
+            "runs": total,
+            "average_key": round(ops.total(keys) / total, 1) if total else None,
+            "max_key": max(maxes) if total else None,
+            "keys_by_dungeon": by_dungeon,
+            "weekly": weekly,
+        }
+
+    def _week_start(self, week):
+        start = (self._first_week + week) * WEEK - WEEK_OFFSET
+        return datetime.fromtimestamp(start, timezone.utc).date()
+
+    def _role_mix(self, lo, hi):
+        roles = self.snapshot.columns["participant_role"][lo:hi]
+        counts, _, _ = self.ops.group_stats(roles, roles, len(self.snapshot.roles))
+        return {role: counts[code] for code, role in enumerate(self.snapshot.roles)}
+
+    def _completion(self, outcomes):
+        finished = len(outcomes)
+        completed = self.ops.total(self.ops.take(self.snapshot.columns["outcome_completed"], outcomes))
+        return {
+            "groups_finished": finished,
+            "completion_rate": round(completed / finished, 3) if finished else None,
+        }
+
+    def user_summary(self, guild_id, user_id):
+        """
+        Summarizes a user's runs in one server.
+
+        Args:
+            guild_id: The Discord server ID
+            user_id: The Discord user ID
+
+        Returns:
+            dict: runs, average_key, max_key, keys_by_dungeon (runs, average and max key per
+                dungeon), role_mix (runs per role), groups_finished, completion_rate (share
+                of the user's finished groups that completed) and weekly (runs and max key per week)
+        """
+        ops, columns = self.ops, self.snapshot.columns
+        lo, hi = ops.span(columns["participant_server"], guild_id)
+        lo, hi = ops.span(columns["participant_user"], user_id, lo, hi)
+        lo_member, hi_member = ops.span(columns["member_user"], user_id)
+        outcomes = ops.where(columns["outcome_server"], guild_id, columns["member_outcome"][lo_member:hi_member])
+
+        summary = self._run_stats(columns["participant_run"][lo:hi])
+        summary["role_mix"] = self._role_mix(lo, hi)
+        summary.update(self._completion(outcomes))
+        return summary
+
+    def guild_summary(self, guild_id):
+        """
+        Summarizes all runs in one server.
+
+        Args:
+            guild_id: The Discord server ID
+
+        Returns:
+            dict: The user_summary fields for the whole server, plus players (distinct
+                users with a run) and key_levels (runs per key level)
+        """
+        ops, columns = self.ops, self.snapshot.columns
+        lo_run, hi_run = ops.span(columns["run_server"], guild_id)
+        lo, hi = ops.span(columns["participant_server"], guild_id)
+        lo_outcome, hi_outcome = ops.span(columns["outcome_server"], guild_id)
+
+        summary = self._run_stats(range(lo_run, hi_run))
+        summary["role_mix"] = self._role_mix(lo, hi)
+        summary.update(self._completion(range(lo_outcome, hi_outcome)))
+        summary["players"] = ops.count_unique(columns["participant_user"][lo:hi])
+        keys = columns["run_key"][lo_run:hi_run]
+        if summary["runs"]:
+            counts, _, _ = ops.group_stats(keys, keys, summary["max_key"] + 1)
+            summary["key_levels"] = {level: count for level, count in enumerate(counts) if count}
+        else:
+            summary["key_levels"] = {}
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Export the run history to a snapshot")
+    export.add_argument("--db", default=os.getenv("DB_PATH", "data/mythicmate.db"), help="Path to the bot's database")
+    export.add_argument("--out", default=SNAPSHOT_PATH, help="Path of the snapshot file")
+    export.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows fetched at a time")
+    stats = commands.add_parser("stats", help="Print statistics from a snapshot as JSON")
+    stats.add_argument("--snapshot", default=SNAPSHOT_PATH, help="Path of the snapshot file")
+    stats.add_argument("--guild", type=int, required=True, help="Server ID")
+    stats.add_argument("--user", type=int, help="User ID, omit for server statistics")
+    stats.add_argument("--weeks", type=int, default=8, help="Weeks in the weekly trend")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        started = time.perf_counter()
+        snapshot = Snapshot.export(args.db, args.chunk_size)
+        snapshot.save(args.out)
+        columns = snapshot.columns
+        print(
+            f"Exported {len(snapshot)} runs, {len(columns['participant_user'])} participants and "
+            f"{len(columns['outcome_server'])} group outcomes to {args.out} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+    else:
+        engine = StatsEngine(Snapshot.load(args.snapshot), args.weeks)
+        if args.user is None:
+            summary = engine.guild_summary(args.guild)
+        else:
+            summary = engine.user_summary(args.guild, args.user)
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Stand-ins for the Discord objects the bot's handlers touch, backed by a simulated REST API.
+
+Every call that would hit Discord goes through FakeRest, which counts it per route and
+waits a modelled latency. Requests over a route's rate limit get a 429, which is waited
+out and retried the way discord.py's HTTP client does, so rate limits show up as latency
+and only surface as errors once the retries run out.
+"""
+import asyncio
+import itertools
+import random
+import time
+import types
+from collections import Counter, deque
+
+import discord
+
+
+class RateLimit:
+    """
+    Sliding window limit of requests per route bucket.
+
+    Attributes:
+        limit: Requests allowed per window
+        per: Window length in seconds
+    """
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self._windows = {}  # bucket -> deque of request times
+
+    def hit(self, bucket, now):
+        """
+        Records a request if the bucket has room left.
+
+        Args:
+            bucket: Key of the rate limit bucket
+            now: Current monotonic time
+
+        Returns:
+            float: 0 if the request is allowed, otherwise seconds until it would be
+        """
+        window = self._windows.setdefault(bucket, deque())
+        while window and window[0] <= now - self.per:
+            window.popleft()
+        if len(window) >= self.limit:
+            return window[0] + self.per - now
+        window.append(now)
+        return 0.0
+
+
+# Default limits per route, loosely modelled on Discord's: message sends and edits are
+# limited per channel, reactions more strictly, interaction responses not at all
+DEFAULT_LIMITS = {
+    "POST /channels/{channel_id}/messages": RateLimit(5, 1.0),
+    "PATCH /channels/{channel_id}/messages/{message_id}": RateLimit(5, 1.0),
+    "PUT /channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me": RateLimit(1, 0.25),
+    "DELETE /channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{user_id}": RateLimit(1, 0.25),
+    "POST /users/@me/channels": RateLimit(10, 1.0),
+}
+
+# Requests across all routes per second
+GLOBAL_LIMIT = RateLimit(50, 1.0)
+
+
+class FakeRest:
+    """
+    Simulated Discord REST API.
+
+    Attributes:
+        latency: Median request latency in seconds
+        jitter: Latency spread, as a fraction of the median
+        limits: Rate limits by route
+        global_limit: Limit across all routes except interaction responses, or None
+        max_retries: Times a rate limited request is retried before failing
+        calls: Requests made, by route
+        rate_limited: Requests answered with a 429, by route
+    """
+    def __init__(self, latency=0.03, jitter=0.5, limits=None, global_limit=GLOBAL_LIMIT, max_retries=5, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.global_limit = global_limit
+        self.max_retries = max_retries
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self._rng = random.Random(seed)
+
+    def reset(self):
+        """Clears the counters and rate limit windows."""
+        self.calls.clear()
+        self.rate_limited.clear()
+        for limit in self.limits.values():
+            limit._windows.clear()
+        if self.global_limit:
+            self.global_limit._windows.clear()
+
+    async def request(self, route, bucket=None):
+        """
+        Performs a simulated request.
+
+        Args:
+            route: Route template, e.g. "PATCH /channels/{channel_id}/messages/{message_id}"
+            bucket: Major parameter the route's rate limit applies to, e.g. the channel ID
+
+        Raises:
+            discord.HTTPException: With status 429 when the request is still rate limited after all retries
+        """
+        self.calls[route] += 1
+        limit = self.limits.get(route)
+        for attempt in range(self.max_retries + 1):
+            spread = self.latency * self.jitter
+            await asyncio.sleep(max(0.0, self._rng.gauss(self.latency, spread)))
+            now = time.monotonic()
+            # Interaction responses don't count towards the global limit
+            retry_after = 0.0
+            if self.global_limit and not route.startswith("POST /interactions"):
+                retry_after = self.global_limit.hit(None, now)
+            if not retry_after and limit:
+                retry_after = limit.hit(bucket, now)
+            if not retry_after:
+                return
+            self.rate_limited[route] += 1
+            if attempt < self.max_retries:
+                await asyncio.sleep(retry_after)
+        response = types.SimpleNamespace(status=429, reason="Too Many Requests")
+        raise discord.HTTPException(response, {"message": "You are being rate limited.", "retry_after": retry_after, "code": 0})
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+
+_ids = itertools.count(10**17)
+
+
+class FakeUser:
+    """A guild member. Users with dms_open False answer DMs with 403 Forbidden."""
+    def __init__(self, rest, user_id=None, dms_open=True):
+        self.rest = rest
+        self.id = user_id or next(_ids)
+        self.bot = False
+        self.name = self.display_name = f"user{self.id}"
+        self.mention = f"<@{self.id}>"
+        self.avatar = types.SimpleNamespace(url=f"https://cdn.example/avatars/{self.id}.png")
+        self.dms_open = dms_open
+        self._dm_channel = None
+
+    async def send(self, content=None, **kwargs):
+        if self._dm_channel is None:
+            await self.rest.request("POST /users/@me/channels")
+            self._dm_channel = next(_ids)
+        await self.rest.request("POST /channels/{channel_id}/messages", self._dm_channel)
+        if not self.dms_open:
+            response = types.SimpleNamespace(status=403, reason="Forbidden")
+            raise discord.Forbidden(response, "Cannot send messages to this user")
+
+
+class FakeGuild:
+    def __init__(self, guild_id=None, name="Load Test"):
+        self.id = guild_id or next(_ids)
+        self.name = name
+        self.shard_id = 0
+
+
+class FakeChannel:
+    """A guild text channel that keeps the messages sent to it."""
+    def __init__(self, rest, guild):
+        self.rest = rest
+        self.id = next(_ids)
+        self.guild = guild
+        self.messages = {}
+
+    async def send(self, content=None, *, embed=None, view=None, delete_after=None, **kwargs):
+        await self.rest.request("POST /channels/{channel_id}/messages", self.id)
+        message = FakeMessage(self, embed)
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id):
+        return self.messages.get(message_id) or FakeMessage(self, None, message_id)
+
+
+class FakeMessage:
+    def __init__(self, channel, embed, message_id=None):
+        self.id = message_id or next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.jump_url = f"https://discord.com/channels/{channel.guild.id}/{channel.id}/{self.id}"
+        self.embeds = [embed] if embed else []
+        self.reactions = Counter()
+        self.user_reactions = set()  # (emoji, user ID) reactions left by users
+
+    async def edit(self, *, embed=None, view=discord.utils.MISSING, **kwargs):
+        await self.channel.rest.request("PATCH /channels/{channel_id}/messages/{message_id}", self.channel.id)
+        if embed is not None:
+            self.embeds = [embed]
+
+    async def delete(self, **kwargs):
+        await self.channel.rest.request("DELETE /channels/{channel_id}/messages/{message_id}", self.channel.id)
+        self.channel.messages.pop(self.id, None)
+
+    async def add_reaction(self, emoji):
+        await self.channel.rest.request("PUT /channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me", self.channel.id)
+        self.reactions[str(emoji)] += 1
+
+    async def remove_reaction(self, emoji, member):
+        # Counted as gone once the bot asks, a rate limited request shows up as an error instead
+        self.user_reactions.discard((str(emoji), member.id))
+        await self.channel.rest.request(
+            "DELETE /channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{user_id}", self.channel.id
+        )
+
+
+class FakeResponse:
+    """The interaction response, every method is one callback request."""
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _respond(self):
+        if self._done:
+            raise discord.InteractionResponded(self.interaction)
+        self._done = True
+        await self.interaction.rest.request("POST /interactions/{interaction_id}/{token}/callback")
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond()
+
+    async def edit_message(self, **kwargs):
+        await self._respond()
+        if self.interaction.message is not None and kwargs.get("embed") is not None:
+            self.interaction.message.embeds = [kwargs["embed"]]
+
+
+class FakeInteraction:
+    """A slash command or button interaction from a user in a channel."""
+    def __init__(self, rest, user, channel, message=None):
+        self.rest = rest
+        self.id = next(_ids)
+        self.user = user
+        self.channel = channel
+        self.guild = channel.guild
+        self.guild_id = channel.guild.id
+        self.message = message
+        self.response = FakeResponse(self)
+
+
+class FakeReaction:
+    """A raw reaction event payload, as passed to on_raw_reaction_add/remove."""
+    def __init__(self, message, user, emoji):
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id
+        self.user_id = user.id
+        self.member = user
+        self.emoji = discord.PartialEmoji(name=emoji)
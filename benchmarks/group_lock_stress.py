@@ -0,0 +1,191 @@
+"""
+Fires thousands of concurrent role button presses and reactions at a single group.
+
+Drives the bot's real handle_role_button and on_raw_reaction_add handlers against one
+shared group through the fake Discord objects in fake_discord.py. Looking the group up
+is made to await for a random short time, the way restoring it from the database does,
+so the handlers reach the group in an arbitrary order.
+
+Every role change applied to the group is recorded, and the roster, backups and
+completion markers must match a serial replay of the changes in the order they were
+applied. The same events run twice through the same handlers: once with the bot's
+GroupLocks and once with the locks replaced by no-ops. The handlers restore the group
+before taking its lock and never await while holding it, so the locked run should show
+next to no contention and both runs should keep the invariants. Only the locked run
+decides the exit status.
+
+Usage:
+    python benchmarks/group_lock_stress.py [--events N] [--users N]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeChannel, FakeGuild, FakeInteraction, FakeReaction, FakeRest, FakeUser
+
+ROLES = ["Tank", "Healer", "DPS", "DPS", "DPS", "Clear Role"]
+
+
+class NoLocks:
+    """Stand-in for GroupLocks that lets every handler through at once."""
+    def __call__(self, key):
+        return contextlib.nullcontext()
+
+    def stats(self):
+        return {}
+
+
+def make_events(count, users, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(("button", "reaction")), rng.randrange(users), rng.choice(ROLES)) for _ in range(count)]
+
+
+def slot_holders(group_state):
+    """Lists every user ID in a main slot or backup queue, duplicates included."""
+    holders = [user_id for user_id in (group_state.members["Tank"], group_state.members["Healer"]) if user_id]
+    holders += group_state.members["DPS"]
+    for backups in group_state.backups.values():
+        holders += backups
+    return holders
+
+
+async def run(bot_module, events, users, args, locked):
+    rest = FakeRest(latency=args.latency, limits={}, global_limit=None, seed=args.seed)
+    guild = FakeGuild()
+    channel = FakeChannel(rest, guild)
+    creator = FakeUser(rest)
+    people = [FakeUser(rest, user_id=user.id) for user in users]
+    bot_module.bot._connection.user = FakeUser(rest)
+    bot_module.bot.get_user = {user.id: user for user in people}.get
+    bot_module.bot.get_guild = {guild.id: guild}.get
+    bot_module.group_locks = bot_module.GroupLocks() if locked else NoLocks()
+
+    await bot_module.lfm.callback(FakeInteraction(rest, creator, channel), "ara", "+10", "Tank", "now")
+    message_id = next(reversed(bot_module.active_groups))
+    group_info = bot_module.active_groups[message_id]
+    message = group_info["message"]
+    emojis = bot_module.role_emojis
+
+    # Records the order role changes reach the group in, for the serial replay
+    applied = []
+    select_role = bot_module.GroupState.select_role
+
+    def recording_select_role(group_state, role, user_id):
+        if group_state is group_info["state"]:
+            applied.append((role, user_id))
+        return select_role(group_state, role, user_id)
+
+    async def handle(kind, user_index, role):
+        user = people[user_index]
+        if kind == "button":
+            await bot_module.handle_role_button(FakeInteraction(rest, user, channel, message), role)
+        else:
+            await bot_module.on_raw_reaction_add(FakeReaction(message, user, emojis[role]))
+
+    bot_module.GroupState.select_role = recording_select_role
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(handle(*event) for event in events))
+        elapsed = time.perf_counter() - started
+    finally:
+        bot_module.GroupState.select_role = select_role
+
+    replay = bot_module.GroupState(creator.id, "Tank")
+    replay_markers = sum(replay.select_role(role, user_id).completed for role, user_id in applied)
+    group_state = group_info["state"]
+    holders = slot_holders(group_state)
+    return {
+        "elapsed": elapsed,
+        "markers": message.reactions["✅"],
+        "replay_markers": replay_markers,
+        "duplicate_users": len(holders) - len(set(holders)),
+        "matches_serial_replay": group_state.members == replay.members and group_state.backups == replay.backups,
+        "lock_stats": bot_module.group_locks.stats(),
+    }
+
+
+async def run_suite(bot_module, args):
+    events = make_events(args.events, args.users, args.seed)
+    rest = FakeRest()
+    users = [FakeUser(rest) for _ in range(args.users)]
+
+    # Looking up the group awaits, like restoring it from the database after a restart
+    get_group_info = bot_module.get_group_info
+    rng = random.Random(args.seed)
+
+    async def slow_get_group_info(message_id):
+        await asyncio.sleep(rng.random() * args.lookup_delay)
+        return await get_group_info(message_id)
+    bot_module.get_group_info = slow_get_group_info
+
+    # Only the locks are under test here, not the per-user and per-guild limits
+    bot_module.action_limits = bot_module.ActionLimits({
+        action: {scope: (1e9, 1e9) for scope in scopes} for action, scopes in bot_module.action_limits.limits.items()
+    })
+
+    bot_module.notifications.start()
+    try:
+        locked = await run(bot_module, events, users, args, locked=True)
+        unlocked = await run(bot_module, events, users, args, locked=False)
+        await bot_module.embed_updater.flush_all()
+    finally:
+        await bot_module.notifications.stop()
+    return locked, unlocked
+
+
+def report(name, result, events):
+    print(
+        f"{name:<9} {events / result['elapsed']:>8,.0f} events/s, "
+        f"{result['markers']} completion markers (serial replay: {result['replay_markers']}), "
+        f"{result['duplicate_users']} duplicate users, matches serial replay: {result['matches_serial_replay']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000, help="Button presses and reactions")
+    parser.add_argument("--users", type=int, default=50, help="Number of distinct users")
+    parser.add_argument("--lookup-delay", type=float, default=0.005, help="Longest simulated group lookup in seconds")
+    parser.add_argument("--latency", type=float, default=0.001, help="Median REST latency in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    # Configure the bot before importing it: no metrics server, a throwaway database
+    data_dir = tempfile.mkdtemp(prefix="mythicmate-locks-")
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["LOG_LEVEL"] = "ERROR"
+    os.environ["DB_PATH"] = os.path.join(data_dir, "mythicmate.db")
+    os.environ.pop("SHARD_COUNT", None)
+    os.environ.pop("SHARD_IDS", None)
+    import bot as bot_module
+
+    try:
+        locked, unlocked = asyncio.run(run_suite(bot_module, args))
+    finally:
+        bot_module.database.close()
+        bot_module.log_listener.stop()
+
+    print(f"{args.events:,} events from {args.users} users on one group")
+    report("locked", locked, args.events)
+    print(f"          {locked['lock_stats']}")
+    report("unlocked", unlocked, args.events)
+
+    if (
+        not locked["matches_serial_replay"]
+        or locked["duplicate_users"]
+        or locked["markers"] != locked["replay_markers"]
+    ):
+        sys.exit("The locked run broke the group invariants")
+
+
+if __name__ == "__main__":
+    main()
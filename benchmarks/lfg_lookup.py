@@ -0,0 +1,121 @@
+"""
+Measures /lfg lookups in the matchmaking index against scanning every group.
+
+Builds a guild with many open groups spread over dungeons, key levels and start times,
+runs a random mix of role changes through GroupIndex.update, then times GroupIndex.find
+and a linear scan that ranks every group the same way. Every lookup is checked to return
+the same groups as the scan.
+
+Usage:
+    python benchmarks/lfg_lookup.py [--groups N] [--lookups N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from group_state import GroupState
+from lifecycle import OPEN, new_lifecycle, touch
+from matchmaking import GroupIndex, bucket_rank, key_level_band, missing_roles, schedule_window
+
+DUNGEONS = [f"Dungeon {number}" for number in range(8)]
+ROLES = ["Tank", "Healer", "DPS", "DPS", "DPS"]
+GUILD_ID = 1
+
+
+def make_groups(count, rng):
+    now = datetime.now(timezone.utc)
+    groups = {}
+    user_ids = iter(range(10, 10**9))
+    for group_key in range(1, count + 1):
+        schedule_time = None if rng.random() < 0.3 else now + timedelta(minutes=rng.randrange(15, 48 * 60))
+        group_state = GroupState(next(user_ids), rng.choice(ROLES[:3]), schedule_time)
+        for _ in range(rng.randrange(0, 4)):
+            group_state.select_role(rng.choice(ROLES), next(user_ids))
+        groups[group_key] = {
+            "state": group_state,
+            "guild_id": GUILD_ID,
+            "dungeon": rng.choice(DUNGEONS),
+            "key_level": f"+{rng.randrange(2, 25)}" if rng.random() < 0.95 else "+?",
+            "board": False,
+            **new_lifecycle(group_state),
+        }
+    return groups
+
+
+def linear_find(active_groups, guild_id, role, dungeon=None, key_level=None, limit=5):
+    """Ranks every group of the guild the way GroupIndex.find does."""
+    wanted_band = key_level_band(key_level) if key_level is not None else None
+    ranked = []
+    for group_key, group_info in active_groups.items():
+        group_state = group_info["state"]
+        if group_info["guild_id"] != guild_id or group_info["status"] != OPEN:
+            continue
+        if role not in missing_roles(group_state) or (dungeon and group_info["dungeon"] != dungeon):
+            continue
+        bucket = (group_info["dungeon"], key_level_band(group_info["key_level"]), schedule_window(group_state.schedule_time))
+        start = group_state.schedule_time.timestamp() if group_state.schedule_time else 0.0
+        ranked.append((bucket_rank(bucket, wanted_band), (start, -len(group_state.member_ids()), group_key)))
+    ranked.sort()
+    return [item[1][2] for item in ranked[:limit]]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=500, help="Open groups in the guild")
+    parser.add_argument("--changes", type=int, default=5_000, help="Role changes applied before the lookups")
+    parser.add_argument("--lookups", type=int, default=5_000, help="Number of lookups")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    active_groups = make_groups(args.groups, rng)
+    index = GroupIndex()
+    for group_key, group_info in active_groups.items():
+        index.update(group_key, group_info)
+
+    # Churn the rosters so the index has to follow joins, leaves and promotions
+    started = time.perf_counter()
+    for _ in range(args.changes):
+        group_key = rng.randrange(1, args.groups + 1)
+        group_info = active_groups[group_key]
+        group_info["state"].select_role(rng.choice(ROLES + ["Clear Role"]), rng.randrange(10, 2000))
+        touch(group_info)
+        index.update(group_key, group_info)
+    update_us = (time.perf_counter() - started) / args.changes * 1e6
+
+    queries = [
+        (rng.choice(ROLES[:3]), rng.choice(DUNGEONS + [None] * 4), rng.choice([None, f"+{rng.randrange(2, 25)}"]))
+        for _ in range(args.lookups)
+    ]
+    index_times, scan_times, mismatches = [], [], 0
+    for role, dungeon, key_level in queries:
+        started = time.perf_counter()
+        found = index.find(active_groups, GUILD_ID, role, dungeon, key_level)
+        index_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        expected = linear_find(active_groups, GUILD_ID, role, dungeon, key_level)
+        scan_times.append(time.perf_counter() - started)
+        mismatches += [match.group_key for match in found] != expected
+
+    print(f"{args.groups} groups, {args.changes} role changes ({update_us:.1f} us per index update), {args.lookups} lookups")
+    for name, times in (("index", index_times), ("scan", scan_times)):
+        print(f"{name:<6} p50 {percentile(times, 0.5) * 1e6:>8.1f} us   p99 {percentile(times, 0.99) * 1e6:>8.1f} us")
+    print(f"results differing from the scan: {mismatches}")
+    print(index.stats())
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
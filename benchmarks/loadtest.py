@@ -0,0 +1,333 @@
+"""
+Offline load test of the bot's handlers against a simulated Discord.
+
+Imports bot.py without connecting and drives the real /lfm command, role buttons, raw
+reaction handlers and reminder delivery with fake interactions, messages, users and
+channels. All Discord requests go to a fake REST layer that models latency and rate
+limits. Each scenario reports throughput, p50/p99 handler latency and REST requests per
+user action, including the embed edits sent in the background afterwards.
+
+Runs are seeded, so the same options produce the same sequence of actions. After every
+scenario, each group message is checked to show the group's current roster; messages
+left showing an older roster are reported as stale. Role reactions left on a group
+message by a user who doesn't hold that role, such as a rate limited signup the bot
+didn't take back, are reported as phantom signups.
+
+Usage:
+    python benchmarks/loadtest.py [--groups N] [--actions N] [--latency SECONDS] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+
+from fake_discord import FakeChannel, FakeGuild, FakeInteraction, FakeReaction, FakeRest, FakeUser
+
+ROLES = ["Tank", "Healer", "DPS", "DPS", "DPS", "Clear Role"]
+SCENARIOS = ("lfm", "buttons", "reactions", "mixed", "reminders")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LoadTest:
+    """
+    Runs scenarios against the imported bot module.
+
+    Attributes:
+        bot_module: The imported bot.py module
+        rest: The fake REST layer all requests go through
+        rng: Seeded random generator driving the actions
+        concurrency: Maximum number of actions in flight at once
+    """
+    def __init__(self, bot_module, rest, seed=1, users=500, guilds=5, channels=10, concurrency=100, closed_dms=0.1):
+        self.bot = bot_module
+        self.rest = rest
+        self.rng = random.Random(seed)
+        self.concurrency = concurrency
+        self.guilds = [FakeGuild() for _ in range(guilds)]
+        self.channels = [FakeChannel(rest, self.guilds[i % guilds]) for i in range(channels)]
+        self.users = [FakeUser(rest, dms_open=self.rng.random() >= closed_dms) for _ in range(users)]
+        self.groups = []
+        self.pressed = set()  # (message ID, user ID) of every button press
+
+        # Point the bot's user and guild lookups at the fakes
+        users_by_id = {user.id: user for user in self.users}
+        client = self.bot.bot
+        client._connection.user = FakeUser(rest)
+        client.get_user = users_by_id.get
+        client.get_guild = {guild.id: guild for guild in self.guilds}.get
+
+    async def _drain(self, timeout=30):
+        # Wait for the coalesced embed edits and batched notifications the handlers left behind
+        updater = self.bot.embed_updater
+        notifications = self.bot.notifications
+        deadline = time.monotonic() + timeout
+        while (updater._pending or updater._tasks or notifications.pending()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    def _phantom_signups(self):
+        # Role reactions still on a group message from users who don't hold that role.
+        # Buttons change roles without touching reactions, so users who pressed one are skipped
+        phantoms = 0
+        for group_info in self.bot.active_groups.values():
+            message = group_info["message"]
+            if message is None:
+                continue
+            for emoji, user_id in message.user_reactions:
+                role = self.bot.emoji_roles[emoji]
+                if role == "Clear Role" or (message.id, user_id) in self.pressed:
+                    continue
+                if group_info["state"].get_user_role(user_id) not in (role, f"Backup {role}"):
+                    phantoms += 1
+        return phantoms
+
+    def _stale_messages(self):
+        # Group messages whose displayed embed isn't the group's current one
+        stale = 0
+        for group_info in self.bot.active_groups.values():
+            message = group_info["message"]
+            if message is None:
+                continue
+            shown = message.embeds[-1].to_dict() if message.embeds else None
+            if shown != group_info["embed"].to_dict():
+                stale += 1
+        return stale
+
+    async def run(self, name, actions):
+        """
+        Runs a list of actions concurrently and measures them.
+
+        Args:
+            name: Scenario name for the report
+            actions: Coroutine functions, one per user action
+
+        Returns:
+            dict: The scenario's measurements
+        """
+        self.rest.reset()
+        notifications = self.bot.notifications
+        delivered = sum(notifications.delivered.values())
+        suppressed = notifications.suppressed
+        limited = self.bot.action_limits.rejected.total()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies = []
+        errors = Counter()
+
+        async def measure(action):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await action()
+                except Exception as e:
+                    errors[str(e) if isinstance(e, discord.HTTPException) else type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(measure(action) for action in actions))
+        elapsed = time.perf_counter() - started
+        await self._drain()
+
+        return {
+            "scenario": name,
+            "actions": len(actions),
+            "errors": sum(errors.values()),
+            "error_types": dict(errors),
+            "throughput": len(actions) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "rest_per_action": self.rest.total_calls / len(actions) if actions else 0.0,
+            "rate_limited": sum(self.rest.rate_limited.values()),
+            "notifications_delivered": sum(notifications.delivered.values()) - delivered,
+            "notifications_suppressed": notifications.suppressed - suppressed,
+            "limited": self.bot.action_limits.rejected.total() - limited,
+            "stale": self._stale_messages(),
+            "phantom": self._phantom_signups(),
+            "rest_calls": dict(self.rest.calls),
+        }
+
+    async def scenario_lfm(self, count):
+        def create():
+            user = self.rng.choice(self.users)
+            channel = self.rng.choice(self.channels)
+            role = self.rng.choice(ROLES[:3])
+
+            async def action():
+                interaction = FakeInteraction(self.rest, user, channel)
+                await self.bot.lfm.callback(interaction, "ara", "+10", role, "now")
+            return action
+
+        result = await self.run("lfm", [create() for _ in range(count)])
+        self.groups = [group_info["message"] for group_info in self.bot.active_groups.values()]
+        return result
+
+    async def scenario_buttons(self, count):
+        def press():
+            message = self.rng.choice(self.groups)
+            user = self.rng.choice(self.users)
+            role = self.rng.choice(ROLES)
+
+            async def action():
+                self.pressed.add((message.id, user.id))
+                interaction = FakeInteraction(self.rest, user, message.channel, message)
+                await self.bot.handle_role_button(interaction, role)
+            return action
+
+        return await self.run("buttons", [press() for _ in range(count)])
+
+    async def scenario_reactions(self, count):
+        emojis = list(self.bot.role_emojis.items())
+
+        def react():
+            message = self.rng.choice(self.groups)
+            user = self.rng.choice(self.users)
+            role, emoji = self.rng.choice(emojis)
+            # Most reactions are added, some removed again
+            removed = role != "Clear Role" and self.rng.random() < 0.2
+
+            async def action():
+                if removed:
+                    message.user_reactions.discard((emoji, user.id))
+                    await self.bot.on_raw_reaction_remove(FakeReaction(message, user, emoji))
+                else:
+                    message.user_reactions.add((emoji, user.id))
+                    await self.bot.on_raw_reaction_add(FakeReaction(message, user, emoji))
+            return action
+
+        return await self.run("reactions", [react() for _ in range(count)])
+
+    async def scenario_mixed(self, count):
+        # A reaction immediately followed by a button press on the same group, so the
+        # reaction's edit is still queued when the press updates the message directly
+        emojis = list(self.bot.role_emojis.items())
+
+        def act():
+            message = self.rng.choice(self.groups)
+            reacting, pressing = self.rng.sample(self.users, 2)
+            _, emoji = self.rng.choice(emojis)
+            role = self.rng.choice(ROLES)
+
+            async def action():
+                message.user_reactions.add((emoji, reacting.id))
+                await self.bot.on_raw_reaction_add(FakeReaction(message, reacting, emoji))
+                self.pressed.add((message.id, pressing.id))
+                interaction = FakeInteraction(self.rest, pressing, message.channel, message)
+                await self.bot.handle_role_button(interaction, role)
+            return action
+
+        return await self.run("mixed", [act() for _ in range(count)])
+
+    async def scenario_reminders(self):
+        groups = list(self.bot.active_groups.values())
+
+        def remind(group_info):
+            async def action():
+                await group_info["state"].send_reminder(group_info["channel"], self.bot.reminder_delivery)
+            return action
+
+        # Reminders only go to scheduled groups, give every group a start time
+        for group_info in groups:
+            group_info["state"].schedule_time = datetime.now(timezone.utc)
+        result = await self.run("reminders", [remind(group_info) for group_info in groups])
+        members = sum(len(group_info["state"].member_ids()) for group_info in groups)
+        result["rest_per_member"] = result["rest_per_action"] * len(groups) / members if members else 0.0
+        return result
+
+
+async def run_suite(bot_module, args):
+    rest = FakeRest(latency=args.latency, seed=args.seed)
+    load_test = LoadTest(
+        bot_module, rest, seed=args.seed, users=args.users, guilds=args.guilds, channels=args.channels,
+        concurrency=args.concurrency
+    )
+    # Batched notifications are sent by a background task, which setup_hook would start
+    bot_module.notifications.start()
+    try:
+        results = [await load_test.scenario_lfm(args.groups)]
+        if "buttons" in args.scenarios:
+            results.append(await load_test.scenario_buttons(args.actions))
+        if "reactions" in args.scenarios:
+            results.append(await load_test.scenario_reactions(args.actions))
+        if "mixed" in args.scenarios:
+            results.append(await load_test.scenario_mixed(args.actions))
+        if "reminders" in args.scenarios:
+            results.append(await load_test.scenario_reminders())
+    finally:
+        await bot_module.notifications.stop()
+    return results
+
+
+def print_report(results):
+    print(
+        f"{'scenario':<10} {'actions':>8} {'errors':>7} {'actions/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'REST/action':>12} {'429s':>6} {'notified':>9} {'deduped':>8} {'limited':>8} {'stale':>6} {'phantom':>8}"
+    )
+    for result in results:
+        print(
+            f"{result['scenario']:<10} {result['actions']:>8} {result['errors']:>7} {result['throughput']:>10.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['rest_per_action']:>12.2f} {result['rate_limited']:>6} "
+            f"{result['notifications_delivered']:>9} {result['notifications_suppressed']:>8} {result['limited']:>8} {result['stale']:>6} {result['phantom']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=50, help="Groups created with /lfm")
+    parser.add_argument("--actions", type=int, default=500, help="Button presses and reactions per scenario")
+    parser.add_argument("--users", type=int, default=500, help="Number of simulated users")
+    parser.add_argument("--guilds", type=int, default=5, help="Number of servers the channels are spread over")
+    parser.add_argument("--channels", type=int, default=10, help="Number of channels groups are posted in")
+    parser.add_argument("--concurrency", type=int, default=100, help="Actions in flight at once")
+    parser.add_argument("--latency", type=float, default=0.03, help="Median REST latency in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="Scenarios to run, lfm always runs first")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--log-level", default="ERROR", help="Log level of the bot while testing")
+    args = parser.parse_args()
+
+    # Configure the bot before importing it: no metrics server, a throwaway database
+    data_dir = tempfile.mkdtemp(prefix="mythicmate-loadtest-")
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["LOG_LEVEL"] = args.log_level
+    os.environ["DB_PATH"] = os.path.join(data_dir, "mythicmate.db")
+    os.environ.pop("SHARD_COUNT", None)
+    os.environ.pop("SHARD_IDS", None)
+    import bot as bot_module
+
+    try:
+        results = asyncio.run(run_suite(bot_module, args))
+    finally:
+        bot_module.database.close()
+        bot_module.log_listener.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    stale = sum(result["stale"] for result in results)
+    if stale:
+        sys.exit(f"{stale} group messages were left showing an outdated roster")
+    phantom = sum(result["phantom"] for result in results)
+    if phantom:
+        sys.exit(f"{phantom} role reactions were left on group messages without a matching role")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measures how many raw reaction events per second a single core can dispose of.
+
+Compares the reaction filter, which only looks at the JSON payload, against building
+the emoji and payload objects discord.py creates for every reaction it parses.
+
+Usage:
+    python benchmarks/reaction_filter.py [--events N] [--relevant FRACTION]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from discord.raw_models import RawReactionActionEvent
+
+from event_filter import ReactionFilter
+
+ROLE_EMOJIS = ["🛡️", "💚", "⚔️", "❌"]
+OTHER_EMOJIS = ["👍", "😂", "🎉", "🔥", "❤️"]
+BOT_ID = "100"
+
+
+def make_events(count, relevant_fraction, tracked):
+    """
+    Builds synthetic MESSAGE_REACTION_ADD payloads.
+
+    Args:
+        count: Number of payloads to build
+        relevant_fraction: Share of payloads that concern a tracked group
+        tracked: Set of tracked message IDs
+
+    Returns:
+        list: The raw payload dictionaries
+    """
+    rng = random.Random(1)
+    tracked_ids = list(tracked)
+    events = []
+    for _ in range(count):
+        relevant = rng.random() < relevant_fraction
+        if relevant:
+            message_id = rng.choice(tracked_ids)
+            emoji = {"id": None, "name": rng.choice(ROLE_EMOJIS)}
+        else:
+            message_id = rng.randrange(10**17, 10**18)
+            if rng.random() < 0.3:
+                emoji = {"id": str(rng.randrange(10**17, 10**18)), "name": "custom"}
+            else:
+                emoji = {"id": None, "name": rng.choice(OTHER_EMOJIS + ROLE_EMOJIS)}
+        events.append({
+            "user_id": str(rng.randrange(10**17, 10**18)),
+            "channel_id": "200",
+            "message_id": str(message_id),
+            "guild_id": "300",
+            "emoji": emoji,
+            "burst": False,
+            "type": 0,
+        })
+    return events
+
+
+def build_objects(data):
+    emoji = discord.PartialEmoji.from_dict(data["emoji"])
+    return RawReactionActionEvent(data, emoji, "REACTION_ADD")
+
+
+def run(label, events, handle):
+    started = time.perf_counter()
+    for data in events:
+        handle(data)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {len(events) / elapsed:>14,.0f} events/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000, help="Number of events to process")
+    parser.add_argument("--relevant", type=float, default=0.05, help="Share of events on group messages")
+    parser.add_argument("--groups", type=int, default=1_000, help="Number of tracked groups")
+    args = parser.parse_args()
+
+    tracked = {10**17 + i for i in range(args.groups)}
+    events = make_events(args.events, args.relevant, tracked)
+    reaction_filter = ReactionFilter(tracked.__contains__, ROLE_EMOJIS, lambda: BOT_ID)
+
+    def filter_then_build(data):
+        if reaction_filter.wants(data):
+            build_objects(data)
+
+    print(f"{args.events:,} events, {args.relevant:.0%} relevant, {args.groups:,} groups, single core")
+    run("build every event", events, build_objects)
+    run("filter, build relevant", events, filter_then_build)
+    run("filter only", events, reaction_filter.wants)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measures the cost of parsing /lfm schedules.
+
+Times parse_schedule for every supported form in a non-UTC timezone, next to the old
+strptime path that read "YYYY-MM-DD HH:MM" as UTC, and reports the cost per parse.
+
+Usage:
+    python benchmarks/schedule_parse.py [--number N]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_parser import parse_schedule
+
+INPUTS = [
+    "now",
+    "in 2h",
+    "in 1h30m",
+    "tonight",
+    "tonight 9pm",
+    "tomorrow at 19:30",
+    "21:30",
+    "2030-04-01 20:00",
+]
+
+
+def old_parse(text):
+    """The schedule parsing /lfm did before timezones were supported."""
+    if text.lower() == "now":
+        return None
+    return datetime.strptime(text, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=50_000, help="Parses per input")
+    parser.add_argument("--timezone", default="Europe/Berlin", help="Guild timezone to parse in")
+    args = parser.parse_args()
+
+    tz = ZoneInfo(args.timezone)
+    print(f"{'input':<20} {'us/parse':>9}")
+    for text in INPUTS:
+        seconds = min(timeit.repeat(lambda: parse_schedule(text, tz), number=args.number, repeat=3))
+        print(f"{text:<20} {seconds / args.number * 1e6:>9.2f}")
+    seconds = min(timeit.repeat(lambda: old_parse("2030-04-01 20:00"), number=args.number, repeat=3))
+    print(f"{'strptime (old)':<20} {seconds / args.number * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
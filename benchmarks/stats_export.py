@@ -0,0 +1,168 @@
+"""
+Measures the analytics export and stats engine against querying the live database.
+
+Fills a temporary database with synthetic run history, then times exporting it to a
+snapshot, loading the snapshot, and computing user and server summaries with the stats
+engine, next to the per-dungeon, per-role and per-week GROUP BY queries the same
+numbers take on the live database. The engine uses NumPy if it is installed.
+
+Usage:
+    python benchmarks/stats_export.py [--runs N] [--guilds N] [--users N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+from analytics import Snapshot, StatsEngine
+from database import CompletedRun, Database
+
+DUNGEONS = [f"Dungeon {i}" for i in range(8)]
+
+SQL_USER_QUERIES = [
+    '''
+    SELECT r.dungeon_name, COUNT(*), AVG(r.key_level), MAX(r.key_level)
+    FROM participants p JOIN runs r ON r.run_id = p.run_id
+    WHERE p.user_id = ? AND p.server_id = ?
+    GROUP BY r.dungeon_name
+    ''',
+    '''
+    SELECT role, COUNT(*) FROM participants WHERE user_id = ? AND server_id = ? GROUP BY role
+    ''',
+    '''
+    SELECT date(r.completion_time, '-' || ((strftime('%w', r.completion_time) + 6) % 7) || ' days'),
+        COUNT(*), MAX(r.key_level)
+    FROM participants p JOIN runs r ON r.run_id = p.run_id
+    WHERE p.user_id = ? AND p.server_id = ?
+    GROUP BY 1
+    ''',
+]
+
+SQL_GUILD_QUERIES = [
+    '''
+    SELECT dungeon_name, COUNT(*), AVG(key_level), MAX(key_level) FROM runs WHERE server_id = ? GROUP BY dungeon_name
+    ''',
+    '''
+    SELECT role, COUNT(*), COUNT(DISTINCT user_id) FROM participants WHERE server_id = ? GROUP BY role
+    ''',
+    '''
+    SELECT date(completion_time, '-' || ((strftime('%w', completion_time) + 6) % 7) || ' days'), COUNT(*), MAX(key_level)
+    FROM runs WHERE server_id = ? GROUP BY 1
+    ''',
+    '''
+    SELECT key_level, COUNT(*) FROM runs WHERE server_id = ? GROUP BY key_level
+    ''',
+    '''
+    SELECT outcome, COUNT(*) FROM group_outcomes WHERE server_id = ? GROUP BY outcome
+    ''',
+]
+
+
+async def fill(database, args):
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    runs = []
+    outcomes = []
+    for _ in range(args.runs):
+        guild_id = rng.randrange(args.guilds) + 1
+        players = rng.sample(range(1, args.users + 1), 5)
+        participants = list(zip(players, ("Tank", "Healer", "DPS", "DPS", "DPS")))
+        finished = now - timedelta(seconds=rng.randrange(90 * 86400))
+        level = rng.randint(2, 25)
+        dungeon = rng.choice(DUNGEONS)
+        runs.append(CompletedRun(guild_id, f"Guild {guild_id}", dungeon, level, participants, finished))
+        outcomes.append((str(guild_id), dungeon, f"+{level}", "completed", finished.strftime("%Y-%m-%d %H:%M:%S"),
+                         json.dumps([str(p) for p in players])))
+        if rng.random() < 0.3:
+            outcomes.append((str(guild_id), dungeon, f"+{level}", "expired", finished.strftime("%Y-%m-%d %H:%M:%S"),
+                             json.dumps([str(p) for p in players[:rng.randint(1, 4)]])))
+
+    for start in range(0, len(runs), 5000):
+        await database.run(database.write_runs, runs[start:start + 5000])
+
+    def insert_outcomes(conn):
+        with conn:
+            conn.executemany('''
+                INSERT INTO group_outcomes (server_id, dungeon_name, key_level, outcome, finished_at, members)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', outcomes)
+    await database.run(insert_outcomes)
+
+
+def per_call(fn, calls):
+    timings = []
+    for args in calls:
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100_000, help="Synthetic runs")
+    parser.add_argument("--guilds", type=int, default=20, help="Servers the runs are spread over")
+    parser.add_argument("--users", type=int, default=5_000, help="Distinct players")
+    parser.add_argument("--queries", type=int, default=200, help="Summaries timed per kind")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(os.path.join(directory, "bench.db"))
+        await database.bootstrap()
+        await fill(database, args)
+        snapshot_path = os.path.join(directory, "bench.snapshot")
+
+        started = time.perf_counter()
+        snapshot = Snapshot.export(database.path)
+        exported = time.perf_counter() - started
+        snapshot.save(snapshot_path)
+        saved = time.perf_counter() - started - exported
+        started = time.perf_counter()
+        snapshot = Snapshot.load(snapshot_path)
+        loaded = time.perf_counter() - started
+        engine = StatsEngine(snapshot)
+
+        print(f"backend: {'numpy' if analytics.numpy is not None else 'array'}")
+        print(f"runs: {len(snapshot)}, snapshot: {os.path.getsize(snapshot_path) / 1e6:.1f} MB, "
+              f"database: {os.path.getsize(database.path) / 1e6:.1f} MB")
+        print(f"export {exported * 1000:.0f} ms, save {saved * 1000:.0f} ms, load {loaded * 1000:.1f} ms")
+
+        rng = random.Random(args.seed)
+        users = [(rng.randrange(args.guilds) + 1, rng.randrange(args.users) + 1) for _ in range(args.queries)]
+        guilds = [(guild_id,) for guild_id in range(1, args.guilds + 1)]
+
+        # Sanity check: the engine and SQL agree on a user's runs per dungeon
+        guild_id, user_id = users[0]
+        with database.connection() as conn:
+            expected = {row[0]: row[1] for row in conn.execute(SQL_USER_QUERIES[0], (str(user_id), str(guild_id)))}
+        actual = {name: row["runs"] for name, row in engine.user_summary(guild_id, user_id)["keys_by_dungeon"].items()}
+        assert actual == expected, (actual, expected)
+
+        def sql_user_summary(guild_id, user_id):
+            with database.connection() as conn:
+                for sql in SQL_USER_QUERIES:
+                    conn.execute(sql, (str(user_id), str(guild_id))).fetchall()
+
+        def sql_guild_summary(guild_id):
+            with database.connection() as conn:
+                for sql in SQL_GUILD_QUERIES:
+                    conn.execute(sql, (str(guild_id),)).fetchall()
+
+        print(f"{'summary':<16} {'engine us':>10} {'sql us':>10}")
+        print(f"{'user':<16} {per_call(engine.user_summary, users):>10.0f} {per_call(sql_user_summary, users):>10.0f}")
+        print(f"{'guild':<16} {per_call(engine.guild_summary, guilds):>10.0f} {per_call(sql_guild_summary, guilds):>10.0f}")
+        database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,357 @@
+import asyncio
+import json
+import logging
+from sqlite3 import Error
+
+import discord
+
+from group_state import ROLE_SLOTS, mention
+from lifecycle import FULL, OPEN
+
+log = logging.getLogger(__name__)
+
+# Groups listed per board message, and messages per board
+PAGE_SIZE = 10
+MAX_PAGES = 3
+
+EMPTY_BOARD_TEXT = "No open groups right now. Use `/lfm` to start one."
+
+
+def _schedule_text(group_state):
+    if not group_state.schedule_time:
+        return "now"
+    # Discord shows timestamps in each reader's own timezone
+    return f"<t:{int(group_state.schedule_time.timestamp())}:f>"
+
+
+def _roster_text(group_state):
+    members = group_state.members
+    dps = [mention(user_id) for user_id in members["DPS"]]
+    dps += ["—"] * (ROLE_SLOTS["DPS"] - len(dps))
+    text = (
+        f"🛡️ {mention(members['Tank']) if members['Tank'] else '—'}  "
+        f"💚 {mention(members['Healer']) if members['Healer'] else '—'}  "
+        f"⚔️ {' '.join(dps)}"
+    )
+    backups = sum(len(user_ids) for user_ids in group_state.backups.values())
+    if backups:
+        text += f"\n📋 {backups} backup{'s' if backups != 1 else ''}"
+    return text
+
+
+def render_board(groups, page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+    """
+    Renders the board pages for a guild's groups.
+
+    Args:
+        groups: (group_key, group_info) pairs of the groups to list, in display order
+        page_size: Groups per page
+        max_pages: Maximum number of pages
+
+    Returns:
+        list: (embed dictionary, select options) per page, options being (label, value, description) tuples
+    """
+    shown = groups[:page_size * max_pages]
+    hidden = len(groups) - len(shown)
+    chunks = [shown[start:start + page_size] for start in range(0, len(shown), page_size)] or [[]]
+
+    pages = []
+    for number, chunk in enumerate(chunks, start=1):
+        fields = []
+        options = []
+        for group_key, group_info in chunk:
+            group_state = group_info["state"]
+            title = f"{group_info['dungeon']} {group_info['key_level']}"
+            status = " ✅ Full" if group_info["status"] == FULL else ""
+            fields.append({
+                "name": f"{title} · {_schedule_text(group_state)}{status}"[:256],
+                "value": _roster_text(group_state)[:1024],
+                "inline": False,
+            })
+            filled = len(group_state.member_ids())
+            schedule = group_state.schedule_time.strftime("%Y-%m-%d %H:%M UTC") if group_state.schedule_time else "now"
+            options.append((title[:100], str(group_key), f"{filled}/5 · {schedule}"[:100]))
+
+        embed = {
+            "type": "rich",
+            "title": "Open Groups" if len(chunks) == 1 else f"Open Groups ({number}/{len(chunks)})",
+            "color": discord.Color.blue().value,
+            "fields": fields,
+        }
+        if not fields:
+            embed["description"] = EMPTY_BOARD_TEXT
+        if hidden and number == len(chunks):
+            embed["footer"] = {"text": f"{hidden} more group{'s' if hidden != 1 else ''} not shown"}
+        pages.append((embed, options))
+    return pages
+
+
+class GroupBoards:
+    """
+    Per-guild boards that list every board group in a few paginated messages.
+
+    Guilds with a board don't get a message per group. Changes only mark the guild's
+    board as changed, and every board is refreshed from the in-memory groups on a fixed
+    cadence, editing only the pages whose content changed. A board therefore costs at
+    most max_pages edits per interval, no matter how many groups are open.
+
+    Attributes:
+        active_groups: The bot's in-memory group dictionary
+        database: The shared Database the boards table lives in
+        resolve_channel: Coroutine function returning the channel for a channel ID, or None
+        make_view: Function building the view for a page from its select options
+        interval: Seconds between refreshes
+        page_size: Groups per board message
+        max_pages: Maximum number of board messages per guild
+        owns: Function returning True if a guild's board belongs to this process
+    """
+    def __init__(self, active_groups, database, resolve_channel, make_view, interval=15,
+                 page_size=PAGE_SIZE, max_pages=MAX_PAGES, owns=None):
+        self.active_groups = active_groups
+        self.database = database
+        self.resolve_channel = resolve_channel
+        self.make_view = make_view
+        self.interval = interval
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.owns = owns or (lambda guild_id: True)
+        self._boards = {}  # guild_id -> {"channel_id", "message_ids", "sent", "enabled"}
+        self._changed = set()
+        self._task = None
+        self.refreshes = 0
+        self.edits = 0
+
+    def _load(self, conn):
+        return conn.execute('SELECT guild_id, channel_id, message_ids FROM boards').fetchall()
+
+    async def start(self):
+        """Loads the configured boards and starts the refresh task."""
+        try:
+            rows = await self.database.run(self._load)
+        except Error as e:
+            log.error("Error loading boards", extra={"error": str(e)})
+            rows = []
+        for guild_id, channel_id, message_ids in rows:
+            if self.owns(guild_id):
+                self._boards[guild_id] = {
+                    "channel_id": channel_id,
+                    "message_ids": json.loads(message_ids),
+                    "sent": [],
+                    "enabled": True,
+                }
+                # Refresh once after startup, the stored messages may be out of date
+                self._changed.add(guild_id)
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+        log.info("Boards ready", extra={"boards": len(self._boards)})
+
+    def stop(self):
+        """Stops the refresh task."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def is_enabled(self, guild_id):
+        """
+        Checks whether new groups in a guild go on its board.
+
+        Args:
+            guild_id: The Discord server ID
+
+        Returns:
+            bool: True if the guild has an enabled board
+        """
+        board = self._boards.get(guild_id)
+        return board is not None and board["enabled"]
+
+    def channel_id(self, guild_id):
+        """
+        Returns the channel a guild's board is posted in.
+
+        Args:
+            guild_id: The Discord server ID
+
+        Returns:
+            int: The channel ID, or None if the guild has no board
+        """
+        board = self._boards.get(guild_id)
+        return board["channel_id"] if board else None
+
+    def mark_changed(self, guild_id):
+        """
+        Queues a guild's board for the next refresh.
+
+        Args:
+            guild_id: The Discord server ID
+        """
+        if guild_id in self._boards:
+            self._changed.add(guild_id)
+
+    def _save(self, conn, guild_id, channel_id, message_ids):
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO boards (guild_id, channel_id, message_ids) VALUES (?, ?, ?)',
+                (guild_id, channel_id, json.dumps(message_ids))
+            )
+
+    def _delete(self, conn, guild_id):
+        with conn:
+            conn.execute('DELETE FROM boards WHERE guild_id = ?', (guild_id,))
+
+    async def enable(self, guild_id, channel_id):
+        """
+        Turns on board mode for a guild, posting the board in a channel.
+
+        Args:
+            guild_id: The Discord server ID
+            channel_id: ID of the channel to post the board in
+        """
+        board = self._boards.get(guild_id)
+        if board and board["channel_id"] != channel_id:
+            await self._delete_messages(board)
+            board = None
+        if board is None:
+            board = self._boards[guild_id] = {"channel_id": channel_id, "message_ids": [], "sent": [], "enabled": True}
+        board["enabled"] = True
+        await self.database.run(self._save, guild_id, channel_id, board["message_ids"])
+        await self.refresh(guild_id)
+
+    async def disable(self, guild_id):
+        """
+        Turns off board mode for a guild.
+
+        Groups already on the board stay listed until they finish, after which the board
+        messages are deleted. New groups get their own message again.
+
+        Args:
+            guild_id: The Discord server ID
+
+        Returns:
+            int: Number of groups still on the board
+        """
+        board = self._boards.get(guild_id)
+        if not board:
+            return 0
+        board["enabled"] = False
+        await self.database.run(self._delete, guild_id)
+        remaining = len(self._groups(guild_id))
+        self._changed.add(guild_id)
+        return remaining
+
+    def _groups(self, guild_id):
+        groups = [
+            (group_key, group_info)
+            for group_key, group_info in self.active_groups.items()
+            if group_info.get("board") and group_info["guild_id"] == guild_id and group_info["status"] in (OPEN, FULL)
+        ]
+        # Groups starting now first, then by scheduled time
+        groups.sort(key=lambda item: (item[1]["state"].schedule_time is not None, item[1]["state"].schedule_time or 0, item[0]))
+        return groups
+
+    async def _delete_messages(self, board):
+        channel = await self.resolve_channel(board["channel_id"])
+        for message_id in board["message_ids"]:
+            try:
+                if channel:
+                    await channel.get_partial_message(message_id).delete()
+            except discord.HTTPException:
+                pass
+        board["message_ids"] = []
+        board["sent"] = []
+
+    async def refresh(self, guild_id):
+        """
+        Brings a guild's board messages up to date with its groups.
+
+        Args:
+            guild_id: The Discord server ID
+        """
+        board = self._boards.get(guild_id)
+        if not board:
+            return
+        groups = self._groups(guild_id)
+        if not board["enabled"] and not groups:
+            # The board was turned off and its last group finished
+            await self._delete_messages(board)
+            del self._boards[guild_id]
+            return
+
+        channel = await self.resolve_channel(board["channel_id"])
+        if channel is None:
+            log.warning("Board channel not found", extra={"guild_id": guild_id, "channel_id": board["channel_id"]})
+            return
+
+        self.refreshes += 1
+        pages = render_board(groups, self.page_size, self.max_pages)
+        message_ids = list(board["message_ids"])
+        sent = list(board["sent"]) + [None] * (len(message_ids) - len(board["sent"]))
+        for number, page in enumerate(pages):
+            if number < len(message_ids) and sent[number] == page:
+                continue
+            embed = discord.Embed.from_dict(page[0])
+            view = self.make_view(page[1])
+            try:
+                if number < len(message_ids):
+                    try:
+                        await channel.get_partial_message(message_ids[number]).edit(embed=embed, view=view)
+                    except discord.NotFound:
+                        # Someone deleted the page, post it again
+                        message_ids[number] = (await channel.send(embed=embed, view=view)).id
+                else:
+                    message_ids.append((await channel.send(embed=embed, view=view)).id)
+                    sent.append(None)
+                sent[number] = page
+                self.edits += 1
+            except discord.HTTPException as e:
+                log.warning("Error updating board", extra={"guild_id": guild_id, "error": str(e)})
+                # Try again on the next refresh
+                self._changed.add(guild_id)
+                break
+
+        # Drop pages that are no longer needed
+        while len(message_ids) > len(pages):
+            message_id = message_ids.pop()
+            sent.pop()
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.HTTPException:
+                pass
+
+        board["sent"] = sent[:len(message_ids)]
+        if message_ids != board["message_ids"]:
+            board["message_ids"] = message_ids
+            if board["enabled"]:
+                try:
+                    await self.database.run(self._save, guild_id, board["channel_id"], message_ids)
+                except Error as e:
+                    log.error("Error saving board", extra={"guild_id": guild_id, "error": str(e)})
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                changed, self._changed = self._changed, set()
+                for guild_id in changed:
+                    # One broken board must not keep the other guilds' boards stale
+                    try:
+                        await self.refresh(guild_id)
+                    except Exception:
+                        log.exception("Error refreshing board", extra={"guild_id": guild_id})
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                log.exception("Error in board refresh")
+
+    def stats(self):
+        """
+        Returns the board counters.
+
+        Returns:
+            dict: Boards, boards waiting for a refresh, refreshes and message edits
+        """
+        return {
+            "boards": len(self._boards),
+            "boards_pending": len(self._changed),
+            "board_refreshes": self.refreshes,
+            "board_edits": self.edits,
+        }
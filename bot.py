@@ -1,62 +1,140 @@
+import time
+# Taken before the other imports so time-to-ready includes loading them
+STARTED = time.perf_counter()
+
 import discord
 from discord.ext import commands
 from discord import app_commands
 import os
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import asyncio
-import pytz
-import sqlite3
+import logging
+import math
 from sqlite3 import Error
+from board import GroupBoards
+from database import CompletedRun, Database, RunWriteQueue
+from dungeons import DungeonResolver
+from embed_render import embed_base, render_group
+from embed_updates import EmbedUpdateScheduler
+from event_filter import ReactionFilter, install_reaction_filter
+from group_locks import GroupLocks
+from group_state import GroupState, mention
+from group_store import GroupStore
+from lifecycle import COMPLETED, GroupSweeper, new_lifecycle, touch
+from matchmaking import GroupIndex
+from monitoring import instrument_http, metrics, setup_logging, start_metrics_server, timed
+from notifications import NotificationQueue
+from rate_limits import ActionLimits
+from reminders import REMINDER_LEAD_TIME, ReminderDelivery, ReminderScheduler
+from schedule_parser import SCHEDULE_FORMATS, GuildTimezones, find_timezone, parse_schedule, timezone_candidates
+from sharding import ShardPartition, shard_for_guild
+from startup import StartupTimer, sync_command_tree
+from stats_cache import StatsCache
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Log through a background queue so handlers never wait on output
+log_listener = setup_logging(os.getenv('LOG_LEVEL', 'INFO'))
+log = logging.getLogger("mythicmate")
+
 # Get the bot token from environment variables
 TOKEN = os.getenv('BOT_TOKEN')
 
-# At the start, after load_dotenv()
-print(f"Token loaded from environment: {'Yes' if TOKEN else 'No'}")
-print(f"Token length: {len(TOKEN) if TOKEN else 0}")
+# Set FORCE_COMMAND_SYNC=1 to sync the command tree even if it didn't change
+FORCE_COMMAND_SYNC = os.getenv('FORCE_COMMAND_SYNC', '') not in ('', '0')
+
+# Metrics are served locally on this port, set METRICS_PORT=0 to disable
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+
+log.info("Token loaded from environment: %s", "Yes" if TOKEN else "No")
+
+# Shards run by this process, set by launcher.py when running several processes
+shard_partition = ShardPartition.from_env(os.environ)
+log.info("Shard configuration", extra={"shards": repr(shard_partition)})
 
 # Configure the bot with the necessary intents (permissions)
-intents = discord.Intents.default()
-intents.reactions = True
+# Only guilds (channel cache) and guild reactions are needed; commands and buttons arrive as interactions
+intents = discord.Intents.none()
 intents.guilds = True
-intents.guild_messages = True
-intents.message_content = False
+intents.guild_reactions = True
+
+log.debug("Intents configured", extra={
+    "guilds": intents.guilds,
+    "guild_reactions": intents.guild_reactions
+})
 
-print("Intents configured:")
-print(f"- Reactions: {intents.reactions}")
-print(f"- Guilds: {intents.guilds}")
-print(f"- Guild Messages: {intents.guild_messages}")
-print(f"- Message Content: {intents.message_content}")
+class MythicMateBot(commands.AutoShardedBot):
+    """Bot subclass that restores stored groups on startup and saves them on shutdown."""
+    async def setup_hook(self):
+        # Runs once before connecting, unlike on_ready which fires again on every reconnect
+        instrument_http(self.http)
+        # Drop reactions on unrelated messages before discord.py parses them
+        install_reaction_filter(self._connection, ReactionFilter(
+            lambda message_id: message_id in active_groups or message_id in group_store.known_ids,
+            emoji_roles,
+            lambda: str(self.user.id) if self.user else None
+        ))
+        self.metrics_runner = None
+        if METRICS_PORT:
+            self.metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        await database.bootstrap()
+        await guild_timezones.load()
+        # Register the role buttons so messages sent before a restart keep working
+        self.add_view(RoleSelectView())
+        self.add_view(BoardView())
+        run_writer.start()
+        schedules = await group_store.start()
+        for message_id, schedule_time in schedules.items():
+            if schedule_time > datetime.now(timezone.utc):
+                reminder_scheduler.schedule(message_id, schedule_time - REMINDER_LEAD_TIME)
+        reminder_scheduler.start()
+        group_sweeper.start()
+        notifications.start()
+        await group_boards.start()
+        # Commands are global, so only the process running shard 0 syncs them. The sync
+        # runs in the background instead of delaying the gateway connection.
+        if shard_partition.runs_shard(0):
+            self.command_sync = asyncio.create_task(self.sync_commands())
+        startup_timer.mark("setup")
+
+    async def sync_commands(self):
+        try:
+            await sync_command_tree(self.tree, database, force=FORCE_COMMAND_SYNC)
+        except Exception:
+            log.exception("Error syncing commands")
+
+    async def close(self):
+        group_boards.stop()
+        group_sweeper.stop()
+        await notifications.stop()
+        await reminder_scheduler.stop()
+        await embed_updater.flush_all()
+        await group_store.close()
+        await run_writer.close()
+        await super().close()
+        database.close()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
 
 # Initialize the bot with a command prefix and intents
-bot = commands.Bot(command_prefix='!', intents=intents)
-
-# Define the available dungeons and their abbreviations
-# This dictionary maps full dungeon names to a list of their common abbreviations or shorthand names
-dungeon_aliases = {
-    "Ara-Kara, City of Echoes": ["ara", "city of echoes", "coe"],
-    "The Dawnbreaker": ["dawnbreaker", "breaker"],
-    "Operation: Floodgate": ["flood", "floodgate", "of"],
-    "Priory of the Sacred Flame": ["priory", "sacred", "flame", "psf"],
-    "Eco-Dome Al'dani": ["eco", "eco-dome", "dome"],
-    "Halls of Atonement": ["hoa", "halls of atonement", "halls"],
-    "Tazavesh the Veiled Market, Streets of Wonder": ["sow", "streets of wonder", "streets"],
-    "Tazavesh the Veiled Market, So'leah's Gambit": ["sol", "gambit", "sg"]
-    
-}
+# Reactions are handled from raw events, so the message cache isn't needed
+bot = MythicMateBot(
+    command_prefix='!',
+    intents=intents,
+    max_messages=None,
+    chunk_guilds_at_startup=False,
+    shard_count=shard_partition.shard_count,
+    shard_ids=shard_partition.shard_ids
+)
 
-# Convert to a more efficient structure using sets for O(1) lookup
-dungeon_lookup = {}
-for full_name, aliases in dungeon_aliases.items():
-    for alias in aliases + [full_name.lower()]:
-        dungeon_lookup[alias] = full_name
+# Resolves dungeon names, abbreviations and typos, reloading data/dungeons.json when it changes
+dungeon_resolver = DungeonResolver()
 
 def translate_dungeon_name(user_input):
-    return dungeon_lookup.get(user_input.lower())
+    return dungeon_resolver.resolve(user_input)
 
 # Define the roles for Tank, Healer, and DPS using emoji symbols
 role_emojis = {
@@ -66,85 +144,384 @@ role_emojis = {
     "Clear Role": "❌"  # This emoji is used to allow users to clear their selected role
 }
 
+# Reverse lookup from emoji to role, with and without the emoji variation selector
+emoji_roles = {}
+for role_name, emoji in role_emojis.items():
+    emoji_roles[emoji] = role_name
+    emoji_roles[emoji.replace("\ufe0f", "")] = role_name
+
+# Measures each startup phase, exported as metrics and logged once the bot is ready
+startup_timer = StartupTimer(STARTED)
+metrics.gauge("startup_seconds", "Duration of each startup phase", ("phase",), startup_timer.phase_durations)
+
 # Event handler for when the bot is ready and connected to Discord
+# Fires again after reconnects, so it must stay cheap; commands are synced from setup_hook
 @bot.event
 async def on_ready():
-    print(f'Bot is ready! Logged in as {bot.user}')
-    try:
-        synced = await bot.tree.sync()  # Synchronize the command tree with Discord
-        print(f"Synced {len(synced)} commands.")
-    except Exception as e:
-        print(f"Error syncing commands: {e}")
+    log.info("Bot is ready! Logged in as %s", bot.user, extra={"shards": len(bot.shards), "guilds": len(bot.guilds)})
+    if startup_timer.mark("ready") is not None:
+        log.info("Startup complete", extra={
+            "time_to_ready_seconds": round(startup_timer.time_to_ready, 3),
+            **{f"{phase}_seconds": round(seconds, 3) for phase, seconds in startup_timer.durations.items()}
+        })
+
+@bot.event
+async def on_shard_ready(shard_id):
+    log.info("Shard ready", extra={"shard_id": shard_id})
+    startup_timer.mark("connect")
 
 # Global dictionary to store active groups
+# Only groups of guilds on this process's shards ever end up here
 active_groups = {}
 
-async def update_group_embed(message, embed, group_state):
+# Serializes changes to each group, handlers only hold a group's lock while changing its state
+group_locks = GroupLocks()
+
+# Coalesces embed edits so a burst of reactions results in a single message edit
+# Groups whose message was deleted are evicted as soon as an edit finds it missing
+embed_updater = EmbedUpdateScheduler(on_missing=lambda message_id: evict_group(message_id))
+
+# Per-user and per-guild limits on group creation and role changes, so a single user
+# or server can't use up the bot's request budget for everyone else
+action_limits = ActionLimits()
+
+# Shared connection pool, all queries run on its own executor instead of the event loop
+database = Database()
+
+# Each guild's timezone for reading /lfm schedules, cached from the servers table
+guild_timezones = GuildTimezones(database)
+
+# Caches /mystats and /leaderboard results until a recorded run makes them stale
+stats_cache = StatsCache()
+
+# Completed runs are queued and written in batches by a background writer
+run_writer = RunWriteQueue(database, on_commit=stats_cache.invalidate_runs)
+
+# Persists active groups so they survive restarts, written in batches behind the handlers
+group_store = GroupStore(active_groups, database, owns=shard_partition.owns)
+
+# Open slots of open groups by guild and missing role, for /lfg
+group_index = GroupIndex()
+
+def shard_stats(values):
     """
-    Updates the embed message with current group composition and backup information.
+    Counts values per shard.
+
+    Args:
+        values: Iterable of (shard_id, amount) pairs
+
+    Returns:
+        dict: Totals keyed by (shard_id,) label tuples
+    """
+    totals = {(shard_id,): 0 for shard_id in bot.shards}
+    for shard_id, amount in values:
+        totals[(shard_id,)] = totals.get((shard_id,), 0) + amount
+    return totals
+
+metrics.register_collector(lambda: {"active_groups": len(active_groups)})
+metrics.register_collector(group_index.stats)
+metrics.register_collector(guild_timezones.stats)
+metrics.gauge(
+    "shard_latency_seconds", "Gateway heartbeat latency per shard", ("shard",),
+    lambda: {(shard_id,): latency for shard_id, latency in bot.latencies if math.isfinite(latency)}
+)
+metrics.gauge(
+    "shard_guilds", "Guilds per shard", ("shard",),
+    lambda: shard_stats((guild.shard_id, 1) for guild in bot.guilds)
+)
+metrics.gauge(
+    "shard_groups", "Active groups per shard", ("shard",),
+    lambda: shard_stats(
+        (shard_for_guild(group_info["guild_id"], bot.shard_count or 1) if group_info["guild_id"] else 0, 1)
+        for group_info in active_groups.values()
+    )
+)
+metrics.register_collector(embed_updater.stats)
+metrics.register_collector(action_limits.stats)
+metrics.gauge(
+    "rate_limited", "Actions rejected by the rate limits per action and scope", ("action", "scope"),
+    action_limits.rejected_counts
+)
+metrics.register_collector(stats_cache.stats)
+metrics.register_collector(run_writer.stats)
+
+async def resolve_user(user_id):
+    """
+    Resolves a stored user ID to something a DM can be sent to, preferring the cache.
+
+    Users who aren't cached are never fetched. Their DM channel is opened straight from
+    the ID instead, and discord.py keeps the most recent DM channels, so repeat DMs to
+    the same user need no extra request.
     
     Args:
-        message: The Discord message to update
-        embed: The embed object to modify
-        group_state: Current state of the group including members and backups
+        user_id: The Discord user ID
+        
+    Returns:
+        discord.abc.Messageable: The user or their DM channel, or None if it can't be opened
     """
-    if not message or not embed or not group_state:
-        print("Missing required parameters for update_group_embed")
-        return
+    user = bot.get_user(user_id)
+    if user:
+        return user
+    try:
+        return await bot.create_dm(discord.Object(id=user_id))
+    except discord.HTTPException as e:
+        log.warning("Could not open DM channel", extra={"user_id": user_id, "error": str(e)})
+        return None
+
+async def resolve_channel(channel_id):
+    """
+    Resolves a stored channel ID to a Discord channel, preferring the cache.
+    
+    Args:
+        channel_id: The Discord channel ID
         
+    Returns:
+        discord.abc.Messageable: The channel, or None if it can't be resolved
+    """
+    channel = bot.get_channel(channel_id)
+    if channel:
+        return channel
     try:
-        embed.clear_fields()
+        return await bot.fetch_channel(channel_id)
+    except discord.HTTPException as e:
+        log.warning("Could not resolve channel", extra={"channel_id": channel_id, "error": str(e)})
+        return None
+
+# One aggregated, periodically refreshed message per guild for guilds in board mode
+group_boards = GroupBoards(
+    active_groups, database, resolve_channel, lambda options: BoardView(options), owns=shard_partition.owns
+)
+metrics.register_collector(group_boards.stats)
+
+async def get_group_info(message_id):
+    """
+    Looks up an active group, restoring it from the database if it was stored before a restart.
+    
+    Args:
+        message_id: ID of the group message
         
-        # Display main role assignments
-        embed.add_field(
-            name="🛡️ Tank",
-            value=group_state.members["Tank"].mention if group_state.members["Tank"] else "None",
-            inline=False
-        )
-        embed.add_field(
-            name="💚 Healer",
-            value=group_state.members["Healer"].mention if group_state.members["Healer"] else "None",
-            inline=False
+    Returns:
+        dict: The group info, or None if the message isn't a group
+    """
+    group_info = active_groups.get(message_id)
+    if group_info:
+        return group_info
+
+    record = await group_store.load(message_id)
+    if not record:
+        return None
+
+    try:
+        channel = bot.get_channel(record["channel_id"]) or await bot.fetch_channel(record["channel_id"])
+    except discord.HTTPException as e:
+        log.warning("Could not restore group", extra={"message_id": message_id, "error": str(e)})
+        return None
+
+    group_state = GroupState.restore(record["members"], record["backups"], record["schedule_time"])
+    render = render_group(group_state, embed_base(record["embed"]))
+    # Board groups are only listed on the board and have no message of their own
+    message = None if record["board"] else channel.get_partial_message(message_id)
+    if message:
+        embed_updater.mark_sent(message_id, render.embed)
+
+    # Another event may have restored the group while we were waiting on Discord
+    group_info = active_groups.setdefault(message_id, {
+        "state": group_state,
+        "render": render,
+        "embed": render.embed,
+        "message": message,
+        "channel": channel,
+        "board": record["board"],
+        "guild_id": record["guild_id"],
+        "dungeon": record["dungeon"],
+        "key_level": record["key_level"],
+        **new_lifecycle(group_state)
+    })
+    group_index.update(message_id, group_info)
+    log.info("Restored group", extra={"message_id": message_id})
+    return group_info
+
+def evict_group(message_id):
+    """
+    Drops a group from memory and deletes it from the store.
+    
+    Args:
+        message_id: ID of the group message
+    """
+    group_info = active_groups.pop(message_id, None)
+    if group_info is None:
+        return
+    if group_info["board"]:
+        group_boards.mark_changed(group_info["guild_id"])
+    embed_updater.forget(message_id)
+    reminder_scheduler.cancel(message_id)
+    group_index.remove(message_id)
+    # Deleted on the next flush, and never restored in the meantime
+    group_store.delete(message_id)
+    log.info("Evicted group", extra={"message_id": message_id, "active_groups": len(active_groups)})
+
+async def finish_group(message_id, group_info):
+    """
+    Records a completed group's run, or closes an expired group, and evicts it.
+    
+    The group message keeps its final roster, marked as completed or expired, and
+    loses its role buttons. Board groups simply drop off the board.
+    
+    Args:
+        message_id: ID of the group message
+        group_info: The finished group
+    """
+    evict_group(message_id)
+    completed = group_info["status"] == COMPLETED
+    if group_info["guild_id"]:
+        # Written together with the group's deletion, for completion rates in the analytics export
+        group_store.record_outcome(group_info)
+    if completed and group_info["guild_id"]:
+        guild = bot.get_guild(group_info["guild_id"])
+        record_completed_run(
+            group_info["state"],
+            group_info["dungeon"],
+            group_info["key_level"],
+            group_info["guild_id"],
+            guild.name if guild else str(group_info["guild_id"])
         )
+    if group_info["board"]:
+        return
+
+    # Rendered embeds are shared with the render cache, so mark a copy
+    embed = group_info["embed"].copy()
+    embed.color = discord.Color.green() if completed else discord.Color.light_grey()
+    embed.set_footer(text="Run completed" if completed else "Group expired")
+    try:
+        await group_info["message"].edit(embed=embed, view=None)
+    except discord.NotFound:
+        pass
+    except discord.HTTPException as e:
+        log.warning("Error closing group message", extra={"message_id": message_id, "error": str(e)})
+
+async def send_due_reminders(message_ids):
+    """
+    Sends the reminders of every group in a batch that became due together.
+    
+    Args:
+        message_ids: IDs of the group messages whose reminders are due
+    """
+    async def remind(message_id):
+        group_info = await get_group_info(message_id)
+        if group_info:
+            await group_info["state"].send_reminder(group_info["channel"], reminder_delivery)
+
+    results = await asyncio.gather(*(remind(message_id) for message_id in message_ids), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            log.error("Error in reminder task", exc_info=result)
+
+# Sends reminder DMs with bounded parallelism shared by all groups
+reminder_delivery = ReminderDelivery(resolve_user)
+
+# Deduplicates and batches role change DMs and promotion announcements
+notifications = NotificationQueue(resolve_user)
+
+# Single timer heap owning every reminder deadline, instead of one sleeping task per group
+reminder_scheduler = ReminderScheduler(send_due_reminders)
+
+# Moves groups through their lifecycle, recording completed runs and evicting finished groups
+group_sweeper = GroupSweeper(active_groups, finish_group, group_store)
+
+metrics.register_collector(reminder_delivery.stats)
+metrics.register_collector(reminder_scheduler.stats)
+metrics.register_collector(group_sweeper.stats)
+metrics.register_collector(group_locks.stats)
+metrics.register_collector(notifications.stats)
+metrics.gauge("notifications_delivered", "Notifications delivered per route", ("route",), notifications.delivered_counts)
+metrics.gauge("groups_live", "Groups in memory per lifecycle status", ("status",), group_sweeper.live_counts)
+
+def rerender_group(group_info):
+    """
+    Renders a group's embed from its current roster.
+    
+    Args:
+        group_info: The group to render
         
-        # Display DPS slots (filled or empty)
-        dps_value = "\n".join([dps_user.mention for dps_user in group_state.members["DPS"]] + ["None"] * (3 - len(group_state.members["DPS"])))
-        embed.add_field(name="⚔️ DPS", value=dps_value, inline=False)
-        
-        # Display backup players for each role
-        backup_text = ""
-        for role, backups in group_state.backups.items():
-            if backups:
-                backup_text += f"\n**{role}**: " + ", ".join(backup.mention for backup in backups)
+    Returns:
+        bool: True if the embed changed, False if the roster was unchanged
+    """
+    previous = group_info["render"]
+    render = render_group(group_info["state"], previous.base, previous)
+    if render is previous:
+        return False
+    group_info["render"] = render
+    group_info["embed"] = render.embed
+    return True
+
+def apply_group_change(message_id, group_info):
+    """
+    Records a roster change: activity time, matchmaking index, stored copy and embed.
+    
+    Does no I/O, so it is called while still holding the group's lock.
+    
+    Args:
+        message_id: Key of the group
+        group_info: The group whose roster changed
         
-        if backup_text:
-            embed.add_field(name="📋 Backups", value=backup_text.strip(), inline=False)
+    Returns:
+        bool: True if the embed changed
+    """
+    touch(group_info)
+    group_index.update(message_id, group_info)
+    group_store.mark_dirty(message_id)
+    return rerender_group(group_info)
 
-        # Changed to use fetch_message and edit
-        try:
-            # Fetch a fresh message object before editing
-            current_message = await message.channel.fetch_message(message.id)
-            await current_message.edit(embed=embed)
-        except discord.NotFound:
-            print("Message not found - it may have been deleted")
-        except discord.Forbidden:
-            print("Bot doesn't have permission to edit the message")
-        except Exception as e:
-            print(f"Error updating message: {e}")
-
-    except Exception as e:
-        print(f"Error in update_group_embed: {e}")
+def update_group_embed(group_info):
+    """
+    Updates the group message with the current group composition and backup information.
+    
+    The edit itself is handed to the embed update scheduler, which coalesces bursts of
+    reactions on the same message into a single edit.
+    
+    Args:
+        group_info: The group whose roster changed
+    """
+    try:
+        message = group_info["message"]
+        if apply_group_change(message.id, group_info):
+            embed_updater.request(message, group_info["embed"], group_info["guild_id"])
+    except Exception:
+        log.exception("Error in update_group_embed")
+
+def locked_group(message_id, group_info):
+    """
+    Checks that a group looked up before taking its lock is still the live group.
+    
+    Args:
+        message_id: Key of the group
+        group_info: The group info from get_group_info, or None
+        
+    Returns:
+        dict: The group info, or None if the group finished while waiting for the lock
+    """
+    if group_info is not None and active_groups.get(message_id) is group_info:
+        return group_info
+    return None
 
 @bot.tree.command(name="lfm", description="Start looking for members for a Mythic+ run.")
 @app_commands.describe(
     dungeon="Enter the dungeon name or abbreviation",
     key_level="Enter the key level (e.g., +10)",
     role="Select your role in the group",
-    schedule="When to run (e.g., 'now' or 'YYYY-MM-DD HH:MM' in server time)"
+    schedule="When to run (e.g., 'now', 'in 2h', 'tonight 20:00' or 'YYYY-MM-DD HH:MM' in server time)"
 )
+@timed("lfm")
 async def lfm(interaction: discord.Interaction, dungeon: str, key_level: str, role: str, schedule: str):
-    print(f"LFM command received from {interaction.user}")
-    print("Starting LFM command...")
+    log.info("LFM command received", extra={"user_id": interaction.user.id, "guild_id": interaction.guild_id})
+
+    retry_after = action_limits.check("lfm", interaction.guild_id, interaction.user.id)
+    if retry_after:
+        await interaction.response.send_message(
+            f"Groups are being created too quickly. Please try again in {math.ceil(retry_after)} seconds.",
+            ephemeral=True
+        )
+        return
     
     # Validate dungeon name
     full_dungeon_name = translate_dungeon_name(dungeon)
@@ -155,33 +532,33 @@ async def lfm(interaction: discord.Interaction, dungeon: str, key_level: str, ro
         )
         return
 
-    # Handle scheduling
-    schedule_time = None
-    if schedule.lower() != "now":
-        try:
-            schedule_time = datetime.strptime(schedule, "%Y-%m-%d %H:%M")
-            schedule_time = pytz.UTC.localize(schedule_time)
-            
-            # Ensure scheduled time is in the future
-            if schedule_time <= datetime.now(pytz.UTC):
-                await interaction.response.send_message(
-                    "The scheduled time must be in the future.",
-                    ephemeral=True
-                )
-                return
-        except ValueError:
-            await interaction.response.send_message(
-                "Invalid date/time format. Please use 'now' or 'YYYY-MM-DD HH:MM'.",
-                ephemeral=True
-            )
-            return
+    # Handle scheduling, times are read in the server's timezone
+    try:
+        schedule_time = parse_schedule(schedule, guild_timezones.get(interaction.guild_id))
+    except ValueError:
+        await interaction.response.send_message(
+            f"Invalid schedule. Please use {SCHEDULE_FORMATS}.",
+            ephemeral=True
+        )
+        return
+
+    # Ensure scheduled time is in the future
+    if schedule_time and schedule_time <= datetime.now(timezone.utc):
+        await interaction.response.send_message(
+            "The scheduled time must be in the future.",
+            ephemeral=True
+        )
+        return
 
     # Format schedule string and send initial response
-    schedule_str = "now" if not schedule_time else schedule_time.strftime("%Y-%m-%d %H:%M")
-    await interaction.response.defer()
+    # Discord shows timestamps in each reader's own timezone
+    schedule_str = "now" if not schedule_time else f"<t:{int(schedule_time.timestamp())}:f>"
+    on_board = group_boards.is_enabled(interaction.guild_id)
+    if not on_board:
+        await interaction.response.defer()
 
     # Initialize group state and create embed
-    group_state = GroupState(interaction, role, schedule_time)
+    group_state = GroupState(interaction.user.id, role, schedule_time)
     embed = discord.Embed(
         title=f"Dungeon: {full_dungeon_name}",
         description=f"Difficulty: {key_level}\nScheduled: {schedule_str}",
@@ -190,355 +567,410 @@ async def lfm(interaction: discord.Interaction, dungeon: str, key_level: str, ro
     embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar.url)
     embed.set_thumbnail(url="https://example.com/path/to/your/image.png")
 
-    # Create and store group message - Changed to use channel.send instead of interaction.followup
-    group_message = await interaction.channel.send(embed=embed)
-    active_groups[group_message.id] = {
+    # Render the initial group composition so the message is complete when it is sent
+    render = render_group(group_state, embed_base(embed))
+
+    if on_board:
+        # The group is listed on the guild's board instead of getting its own message,
+        # and is keyed by this interaction's ID
+        group_key = interaction.id
+        group_message = None
+        channel = bot.get_channel(group_boards.channel_id(interaction.guild_id)) or interaction.channel
+        await interaction.response.send_message(
+            "Your group was added to the board.", embed=render.embed, view=BoardGroupView(group_key), ephemeral=True
+        )
+    else:
+        # Create and store group message - Changed to use channel.send instead of interaction.followup
+        group_message = await interaction.channel.send(embed=render.embed, view=RoleSelectView())
+        group_key = group_message.id
+        channel = interaction.channel
+        embed_updater.mark_sent(group_key, render.embed)
+
+    active_groups[group_key] = {
         "state": group_state,
-        "embed": embed,
+        "render": render,
+        "embed": render.embed,
         "message": group_message,
+        "channel": channel,
+        "board": on_board,
+        "guild_id": interaction.guild_id,
         "dungeon": full_dungeon_name,
-        "key_level": key_level
+        "key_level": key_level,
+        **new_lifecycle(group_state)
     }
-
-    # Update embed with initial group composition
-    await update_group_embed(group_message, embed, group_state)
-
-    # Add role selection reactions
-    for emoji in role_emojis.values():
-        await group_message.add_reaction(emoji)
+    group_store.mark_dirty(group_key)
+    group_index.update(group_key, active_groups[group_key])
+    if on_board:
+        group_boards.mark_changed(interaction.guild_id)
 
     # Set up reminder if scheduled for later
     if schedule_time:
-        group_state.reminder_task = asyncio.create_task(
-            group_state.send_reminder(interaction.channel)
+        reminder_scheduler.schedule(group_key, schedule_time - REMINDER_LEAD_TIME)
+
+    log.info("Created group", extra={"group_key": group_key, "board": on_board, "active_groups": len(active_groups)})
+
+@lfm.autocomplete("dungeon")
+async def dungeon_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        app_commands.Choice(name=full_name, value=full_name)
+        for full_name, _ in dungeon_resolver.candidates(current)
+    ]
+
+@bot.tree.command(name="lfg", description="Find open Mythic+ groups that need your role.")
+@app_commands.describe(
+    role="The role you want to play",
+    dungeon="Only show groups for this dungeon",
+    key_level="Preferred key level (e.g., +10)"
+)
+@app_commands.choices(role=[app_commands.Choice(name=role, value=role) for role in ("Tank", "Healer", "DPS")])
+@app_commands.guild_only()
+@timed("lfg")
+async def lfg(interaction: discord.Interaction, role: str, dungeon: str = None, key_level: str = None):
+    full_dungeon_name = None
+    if dungeon:
+        full_dungeon_name = translate_dungeon_name(dungeon)
+        if not full_dungeon_name:
+            await interaction.response.send_message(
+                f"Sorry, I couldn't recognize the dungeon name '{dungeon}'. Please try again with a valid name or abbreviation.",
+                ephemeral=True
+            )
+            return
+
+    matches = group_index.find(active_groups, interaction.guild_id, role, full_dungeon_name, key_level)
+    if not matches:
+        await interaction.response.send_message(
+            f"No open groups need a {role} right now. Use `/lfm` to start one.",
+            ephemeral=True
         )
+        return
 
-    print(f"Created group message with ID: {group_message.id}")
-    print(f"Active groups after creation: {list(active_groups.keys())}")
+    embed = discord.Embed(title=f"Open Groups for {role}", color=discord.Color.blue())
+    for match in matches:
+        group_info = match.group_info
+        schedule_time = group_info["state"].schedule_time
+        start = f"<t:{int(schedule_time.timestamp())}:R>" if schedule_time else "now"
+        where = "On the board" if group_info["board"] else group_info["message"].jump_url
+        embed.add_field(
+            name=f"{group_info['dungeon']} {group_info['key_level']}",
+            value=f"Starts {start} · Needs {', '.join(match.missing)}\n{where}",
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, view=LfgView(role, matches), ephemeral=True)
 
-@bot.event
-async def on_reaction_add(reaction, user):
-    print(f"Reaction detected - Emoji: {reaction.emoji}, User: {user}, Message ID: {reaction.message.id}")
-    if user == bot.user:
-        print("Reaction was from bot, ignoring")
+@lfg.autocomplete("dungeon")
+async def lfg_dungeon_autocomplete(interaction: discord.Interaction, current: str):
+    return await dungeon_autocomplete(interaction, current)
+
+class LfgView(discord.ui.View):
+    """
+    Lets a user join one of the groups /lfg found, in the role they searched for.
+    
+    Args:
+        role: The role to join as
+        matches: GroupMatch tuples shown to the user
+    """
+    def __init__(self, role, matches):
+        super().__init__(timeout=300)
+        self.role = role
+        select = discord.ui.Select(
+            placeholder=f"Join a group as {role}",
+            options=[
+                discord.SelectOption(
+                    label=f"{match.group_info['dungeon']} {match.group_info['key_level']}"[:100],
+                    value=str(match.group_key),
+                    description=f"Needs {', '.join(match.missing)}"[:100]
+                )
+                for match in matches
+            ]
+        )
+        select.callback = self.join
+        self.add_item(select)
+
+    async def join(self, interaction: discord.Interaction):
+        await handle_role_button(interaction, self.role, int(interaction.data["values"][0]))
+
+class RoleSelectView(discord.ui.View):
+    """
+    Role selection buttons attached to every group message.
+    
+    The view is persistent: its buttons have fixed custom IDs and no timeout, so the bot
+    keeps handling them for any group message, including ones posted before a restart.
+    """
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="Tank", emoji=role_emojis["Tank"], style=discord.ButtonStyle.primary, custom_id="mythicmate:role:Tank")
+    async def tank(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "Tank")
+
+    @discord.ui.button(label="Healer", emoji=role_emojis["Healer"], style=discord.ButtonStyle.success, custom_id="mythicmate:role:Healer")
+    async def healer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "Healer")
+
+    @discord.ui.button(label="DPS", emoji=role_emojis["DPS"], style=discord.ButtonStyle.danger, custom_id="mythicmate:role:DPS")
+    async def dps(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "DPS")
+
+    @discord.ui.button(label="Clear Role", emoji=role_emojis["Clear Role"], style=discord.ButtonStyle.secondary, custom_id="mythicmate:role:Clear")
+    async def clear(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "Clear Role")
+
+class BoardView(discord.ui.View):
+    """
+    Group picker attached to every board page.
+    
+    Picking a group answers with that group's embed and role buttons, visible only to the
+    user who picked it. Like RoleSelectView the view is persistent, so the board keeps
+    working across restarts.
+    
+    Args:
+        options: (label, value, description) tuples of the groups on the page
+    """
+    def __init__(self, options=()):
+        super().__init__(timeout=None)
+        select = discord.ui.Select(
+            custom_id="mythicmate:board:select",
+            placeholder="Pick a group to join" if options else "No open groups",
+            options=[
+                discord.SelectOption(label=label, value=value, description=description)
+                for label, value, description in options
+            ] or [discord.SelectOption(label="No open groups", value="0")],
+            disabled=not options,
+        )
+        select.callback = self.pick
+        self.add_item(select)
+
+    async def pick(self, interaction: discord.Interaction):
+        group_key = int(interaction.data["values"][0])
+        group_info = await get_group_info(group_key)
+        if not group_info:
+            await interaction.response.send_message("This group is no longer active.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=group_info["embed"], view=BoardGroupView(group_key), ephemeral=True)
+
+class BoardGroupView(discord.ui.View):
+    """
+    Role buttons for one board group, sent in ephemeral replies.
+    
+    Args:
+        group_key: Key of the board group in active_groups
+    """
+    def __init__(self, group_key):
+        super().__init__(timeout=600)
+        self.group_key = group_key
+
+    @discord.ui.button(label="Tank", emoji=role_emojis["Tank"], style=discord.ButtonStyle.primary)
+    async def tank(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "Tank", self.group_key)
+
+    @discord.ui.button(label="Healer", emoji=role_emojis["Healer"], style=discord.ButtonStyle.success)
+    async def healer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "Healer", self.group_key)
+
+    @discord.ui.button(label="DPS", emoji=role_emojis["DPS"], style=discord.ButtonStyle.danger)
+    async def dps(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "DPS", self.group_key)
+
+    @discord.ui.button(label="Clear Role", emoji=role_emojis["Clear Role"], style=discord.ButtonStyle.secondary)
+    async def clear(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await handle_role_button(interaction, "Clear Role", self.group_key)
+
+def announce_promotion(channel, group_key, change):
+    """
+    Queues the channel announcement for a backup promoted to a main slot.
+    
+    Args:
+        channel: The group's channel
+        group_key: Key of the group in active_groups
+        change: The RoleChange that promoted the backup
+    """
+    notifications.announce(
+        channel,
+        change.promoted_user,
+        f"promoted:{group_key}",
+        f"{mention(change.promoted_user)} has been promoted from backup to {change.role}!"
+    )
+
+@timed("role_button")
+async def handle_role_button(interaction, role, group_key=None):
+    """
+    Applies a role button press and answers it with a single response.
+    
+    The group is looked up (and restored if needed) before taking its lock, so only the
+    state change and its bookkeeping run while holding it. Role changes are then answered
+    by editing the group embed in place as the interaction response, everything else
+    with an ephemeral message.
+    
+    Args:
+        interaction: The button interaction
+        role: "Tank", "Healer", "DPS" or "Clear Role"
+        group_key: Key of the group when the buttons are on a private reply, None for the buttons on a group message
+    """
+    message_id = group_key or interaction.message.id
+    retry_after = action_limits.check("role", interaction.guild_id, interaction.user.id)
+    if retry_after:
+        await notifications.reply(
+            interaction, "rate_limited", f"Roles are changing too quickly. Please try again in {math.ceil(retry_after)} seconds."
+        )
         return
 
-    group_info = active_groups.get(reaction.message.id)
+    group_info = await get_group_info(message_id)
+    async with group_locks(message_id):
+        group_info = locked_group(message_id, group_info)
+        if group_info:
+            change = group_info["state"].select_role(role, interaction.user.id)
+            if change.result in ("added", "backup", "cleared"):
+                apply_group_change(message_id, group_info)
+                # Rendered embeds are never modified, later changes render a new one
+                embed = group_info["embed"]
+
+    # Everything below talks to Discord and runs outside the group lock
     if not group_info:
-        print(f"No group found for message ID {reaction.message.id}")
-        print(f"Active groups: {list(active_groups.keys())}")
+        await notifications.reply(interaction, "inactive", "This group is no longer active.")
+        return
+    if change.result == "not_member":
+        await notifications.reply(interaction, "not_member", "You don't have a role in this group.")
+        return
+    if change.result == "duplicate":
+        await notifications.reply(
+            interaction, "duplicate", "You can only select one role. Please clear your current role first."
+        )
         return
 
-    print(f"Found group info for message {reaction.message.id}")
-    group_state = group_info["state"]
     group_message = group_info["message"]
-    embed = group_info["embed"]
+    await interaction.response.edit_message(embed=embed)
+    if group_info["board"]:
+        # Board groups have no message of their own, the board shows the change
+        group_boards.mark_changed(group_info["guild_id"])
+    elif group_key:
+        # The response edited a private reply, the group message still needs updating
+        embed_updater.request(group_message, group_info["embed"], group_info["guild_id"])
+    else:
+        embed_updater.mark_sent(message_id, embed)
+        # Another press may have changed the group while this response was in flight
+        if group_info["embed"] is not embed:
+            embed_updater.request(group_message, group_info["embed"], group_info["guild_id"])
+
+    if change.promoted_user:
+        announce_promotion(group_info["channel"], message_id, change)
+
+    # Add completion marker once the group fills up
+    if change.completed and group_message:
+        await group_message.add_reaction("✅")
+
+@bot.event
+@timed("on_raw_reaction_add")
+async def on_raw_reaction_add(payload):
+    """
+    Handles role reactions on group posts created before role buttons were added.
+    
+    Uses the raw event so it doesn't depend on the message cache. Reactions on other
+    messages are already dropped by the reaction filter.
+    
+    Args:
+        payload: The raw reaction event
+    """
+    role = emoji_roles.get(str(payload.emoji))
+    if not role or payload.user_id == bot.user.id:
+        return
+    group_info = await get_group_info(payload.message_id)
+    if not group_info:
+        return
+    retry_after = action_limits.check("role", payload.guild_id, payload.user_id)
+    if retry_after:
+        # Take the reaction back so the message doesn't show a signup that never happened
+        log.debug("Reaction rate limited", extra={"message_id": payload.message_id, "user_id": payload.user_id})
+        if group_info["message"]:
+            await group_info["message"].remove_reaction(payload.emoji, discord.Object(id=payload.user_id))
+        notifications.notify(
+            payload.user_id, "rate_limited", f"Roles are changing too quickly. Please react again in {math.ceil(retry_after)} seconds."
+        )
+        return
+
+    async with group_locks(payload.message_id):
+        group_info = locked_group(payload.message_id, group_info)
+        if not group_info:
+            return
+        log.debug("Group reaction", extra={"message_id": payload.message_id, "user_id": payload.user_id, "role": role})
+        change = group_info["state"].select_role(role, payload.user_id)
+        if change.result in ("added", "backup", "cleared"):
+            update_group_embed(group_info)
+
+    # Reactions and DMs go out after the group lock is released
+    group_message = group_info["message"]
+    user = discord.Object(id=payload.user_id)
 
     # Handle role clearing
-    if str(reaction.emoji) == role_emojis["Clear Role"]:
-        role, promoted_user = group_state.remove_user(user)
-        if promoted_user:
-            await group_message.channel.send(
-                f"{promoted_user.mention} has been promoted from backup to {role}!",
-                delete_after=10
-            )
+    if role == "Clear Role":
+        if change.promoted_user:
+            announce_promotion(group_info["channel"], payload.message_id, change)
         # Remove all role reactions from the user
         for role_name, emoji in role_emojis.items():
             if emoji != role_emojis["Clear Role"]:
                 await group_message.remove_reaction(emoji, user)
-        await update_group_embed(group_message, embed, group_state)
-        await group_message.remove_reaction(reaction.emoji, user)
+        await group_message.remove_reaction(payload.emoji, user)
         return
 
     # Prevent users from selecting multiple roles
-    current_role = group_state.get_user_role(user)
-    if current_role:
-        await group_message.remove_reaction(reaction.emoji, user)
-        await user.send("You can only select one role. Please remove your current role first.")
+    if change.result == "duplicate":
+        await group_message.remove_reaction(payload.emoji, user)
+        notifications.notify(payload.user_id, "duplicate", "You can only select one role. Please remove your current role first.")
         return
 
-    # Handle role selection
-    role_added = False
-    if str(reaction.emoji) == role_emojis["Tank"]:
-        role_added = group_state.add_member("Tank", user)
-    elif str(reaction.emoji) == role_emojis["Healer"]:
-        role_added = group_state.add_member("Healer", user)
-    elif str(reaction.emoji) == role_emojis["DPS"]:
-        role_added = group_state.add_member("DPS", user)
-
     # Notify user if added to backup
-    if not role_added:
-        await user.send("You've been added to the backup list for this role.")
+    if change.result == "backup":
+        notifications.notify(payload.user_id, "backup", "You've been added to the backup list for this role.")
 
-    await update_group_embed(group_message, embed, group_state)
-
-    # Add completion marker if group is full
-    if group_state.is_complete():
+    # Add completion marker once the group fills up
+    if change.completed:
         await group_message.add_reaction("✅")
 
 @bot.event
-async def on_reaction_remove(reaction, user):
+@timed("on_raw_reaction_remove")
+async def on_raw_reaction_remove(payload):
     """
     Handles when users remove their role reactions.
     
     Args:
-        reaction: The reaction emoji removed
-        user: The user who removed the reaction
+        payload: The raw reaction event
     """
-    if user == bot.user:
+    role = emoji_roles.get(str(payload.emoji))
+    if not role or payload.user_id == bot.user.id:
         return
 
-    group_info = active_groups.get(reaction.message.id)
-    if not group_info:
+    group_info = await get_group_info(payload.message_id)
+    # Only removals that change the roster count against the limit, not the ones that
+    # follow the bot taking back a duplicate, cleared or rate limited reaction
+    if not group_info or group_info["state"].get_user_role(payload.user_id) != role:
         return
-
-    group_state = group_info["state"]
-    group_message = group_info["message"]
-    embed = group_info["embed"]
-
-    # Remove user from their role
-    if str(reaction.emoji) == role_emojis["Tank"] and group_state.members["Tank"] == user:
-        group_state.members["Tank"] = None
-    elif str(reaction.emoji) == role_emojis["Healer"] and group_state.members["Healer"] == user:
-        group_state.members["Healer"] = None
-    elif str(reaction.emoji) == role_emojis["DPS"] and user in group_state.members["DPS"]:
-        group_state.members["DPS"].remove(user)
-
-    await update_group_embed(group_message, embed, group_state)
-
-@bot.event
-async def on_message(message):
-    print(f"Message received: {message.content[:20]}...")
-    await bot.process_commands(message)
-
-class GroupState:
-    """
-    Manages the state of a Mythic+ group including members, backups, and reminders.
-    
-    Attributes:
-        members: Dictionary containing current group members by role
-        backups: Dictionary containing backup players by role
-        reminder_task: Optional asyncio task for scheduled groups
-    """
-    def __init__(self, interaction, initial_role, schedule_time=None):
-        """
-        Initializes a new group state.
-        
-        Args:
-            interaction: Discord interaction that created the group
-            initial_role: Starting role of the group creator
-            schedule_time: Optional datetime for scheduled groups
-        """
-        self.members = {
-            "Tank": None,
-            "Healer": None,
-            "DPS": []
-        }
-        self.backups = {
-            "Tank": [],
-            "Healer": [],
-            "DPS": []
-        }
-        self.reminder_task = None
-        self.schedule_time = schedule_time
-        
-        # Add the command user to their selected role
-        user = interaction.user
-        self.add_member(initial_role, user)
-
-    def add_member(self, role, user):
-        """
-        Adds a user to a role, or to backup if role is full.
-        
-        Args:
-            role: The role to add the user to
-            user: The Discord user to add
-            
-        Returns:
-            bool: True if added to main role, False if added to backup
-        """
-        if role == "Tank":
-            if not self.members["Tank"]:
-                self.members["Tank"] = user
-                return True
-            else:
-                self.backups["Tank"].append(user)
-                return False
-        elif role == "Healer":
-            if not self.members["Healer"]:
-                self.members["Healer"] = user
-                return True
-            else:
-                self.backups["Healer"].append(user)
-                return False
-        elif role == "DPS":
-            if len(self.members["DPS"]) < 3:
-                self.members["DPS"].append(user)
-                return True
-            else:
-                self.backups["DPS"].append(user)
-                return False
-        return False
-
-    def remove_user(self, user):
-        """
-        Removes a user from their role and promotes a backup if available.
-        
-        Args:
-            user: The Discord user to remove
-            
-        Returns:
-            tuple: (role_removed_from, promoted_user) or (None, None) if user not found
-        """
-        # Check main roles first
-        if self.members["Tank"] == user:
-            self.members["Tank"] = None
-            if self.backups["Tank"]:
-                promoted_user = self.backups["Tank"].pop(0)
-                self.members["Tank"] = promoted_user
-                return "Tank", promoted_user
-            return "Tank", None
-
-        if self.members["Healer"] == user:
-            self.members["Healer"] = None
-            if self.backups["Healer"]:
-                promoted_user = self.backups["Healer"].pop(0)
-                self.members["Healer"] = promoted_user
-                return "Healer", promoted_user
-            return "Healer", None
-
-        if user in self.members["DPS"]:
-            self.members["DPS"].remove(user)
-            if self.backups["DPS"]:
-                promoted_user = self.backups["DPS"].pop(0)
-                self.members["DPS"].append(promoted_user)
-                return "DPS", promoted_user
-            return "DPS", None
-
-        # Check backups
-        for role in ["Tank", "Healer", "DPS"]:
-            if user in self.backups[role]:
-                self.backups[role].remove(user)
-                return role, None
-
-        return None, None
-
-    def get_user_role(self, user):
-        """
-        Gets the current role of a user in the group.
-        
-        Args:
-            user: The Discord user to check
-            
-        Returns:
-            str: The user's role or None if not in group
-        """
-        if self.members["Tank"] == user:
-            return "Tank"
-        if self.members["Healer"] == user:
-            return "Healer"
-        if user in self.members["DPS"]:
-            return "DPS"
-        
-        # Check backups
-        for role, backups in self.backups.items():
-            if user in backups:
-                return f"Backup {role}"
-        return None
-
-    def is_complete(self):
-        """
-        Checks if the group has all required roles filled.
-        
-        Returns:
-            bool: True if group is complete, False otherwise
-        """
-        return (
-            self.members["Tank"] is not None and
-            self.members["Healer"] is not None and
-            len(self.members["DPS"]) == 3
+    retry_after = action_limits.check("role", payload.guild_id, payload.user_id)
+    if retry_after:
+        notifications.notify(
+            payload.user_id, "rate_limited",
+            f"Roles are changing too quickly, so you're still signed up as {role}. "
+            f"Use the Clear Role reaction to leave in {math.ceil(retry_after)} seconds."
         )
+        return
 
-    async def send_reminder(self, channel):
-        """
-        Sends reminders to group members before scheduled start time.
-        
-        Args:
-            channel: The Discord channel to send fallback messages to
-        """
-        if not self.reminder_task:
+    async with group_locks(payload.message_id):
+        group_info = locked_group(payload.message_id, group_info)
+        if not group_info:
             return
 
-        try:
-            # Wait until 15 minutes before scheduled time
-            await asyncio.sleep(max(0, (self.schedule_time - datetime.now(pytz.UTC)).total_seconds() - 900))
-            
-            # Send DMs to all members
-            all_members = [
-                self.members["Tank"],
-                self.members["Healer"],
-                *self.members["DPS"]
-            ]
-            
-            for member in all_members:
-                if member:
-                    try:
-                        await member.send(f"Reminder: Your M+ run starts in 15 minutes!")
-                    except discord.Forbidden:
-                        await channel.send(
-                            f"{member.mention} (Could not send DM: Your M+ run starts in 15 minutes!)",
-                            delete_after=60
-                        )
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            print(f"Error in reminder task: {e}")
-
-def create_connection():
-    try:
-        # Ensure data directory exists
-        os.makedirs('data', exist_ok=True)
-        conn = sqlite3.connect('data/mythicmate.db')
-        return conn
-    except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+        # Remove user from their role
+        if group_info["state"].clear_role(role, payload.user_id):
+            update_group_embed(group_info)
 
 # Modify the stats command to include server_id
 @bot.tree.command(name="mystats", description="View your M+ statistics")
 @app_commands.guild_only()
+@timed("mystats")
 async def mystats(interaction: discord.Interaction):
-    conn = create_connection()
-    if conn is None:
-        await interaction.response.send_message("Unable to access statistics at this time.", ephemeral=True)
-        return
-
     try:
-        c = conn.cursor()
-        
-        # Ensure server is registered
-        c.execute('''
-            INSERT OR IGNORE INTO servers (server_id, server_name)
-            VALUES (?, ?)
-        ''', (str(interaction.guild_id), interaction.guild.name))
-        
-        # Get total runs for this server
-        c.execute('''
-            SELECT COUNT(*), role 
-            FROM participants 
-            WHERE user_id = ? AND server_id = ?
-            GROUP BY role
-        ''', (str(interaction.user.id), str(interaction.guild_id)))
-        role_counts = c.fetchall()
-        
-        # Get average key level for this server
-        c.execute('''
-            SELECT AVG(r.key_level) 
-            FROM runs r 
-            JOIN participants p ON r.run_id = p.run_id 
-            WHERE p.user_id = ? AND p.server_id = ?
-        ''', (str(interaction.user.id), str(interaction.guild_id)))
-        avg_key = c.fetchone()[0]
+        role_counts, avg_key = await stats_cache.get(
+            ("user", interaction.guild_id, interaction.user.id),
+            lambda: database.get_user_stats(interaction.guild_id, interaction.guild.name, interaction.user.id)
+        )
         
         # Create stats embed
         embed = discord.Embed(
@@ -546,57 +978,34 @@ async def mystats(interaction: discord.Interaction):
             description=f"Server: {interaction.guild.name}",
             color=discord.Color.blue()
         )
-        
-        # ... rest of embed creation ...
+        counts = {role: count for count, role in role_counts}
+        embed.add_field(name="Total Runs", value=str(sum(counts.values())), inline=True)
+        embed.add_field(name="Average Key", value=f"+{avg_key:.1f}" if avg_key is not None else "-", inline=True)
+        embed.add_field(
+            name="Runs by Role",
+            value="\n".join(f"{role_emojis[role]} {role}: {counts.get(role, 0)}" for role in ("Tank", "Healer", "DPS")),
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed)
 
     except Error as e:
         await interaction.response.send_message(f"Error retrieving statistics: {e}", ephemeral=True)
-    finally:
-        conn.close()
 
 @bot.tree.command(name="leaderboard", description="View M+ leaderboards")
 @app_commands.guild_only()
+@timed("leaderboard")
 async def leaderboard(interaction: discord.Interaction, category: str, timeframe: str):
-    conn = create_connection()
-    if conn is None:
-        await interaction.response.send_message("Unable to access leaderboard at this time.", ephemeral=True)
-        return
-
     try:
-        c = conn.cursor()
-        
-        # Build time constraint
-        time_constraint = ""
-        if timeframe == "month":
-            time_constraint = "AND r.completion_time >= date('now', 'start of month')"
-        elif timeframe == "week":
-            time_constraint = "AND r.completion_time >= date('now', '-6 days')"
-        
-        if category == "runs":
-            query = f'''
-                SELECT p.user_id, COUNT(*) as run_count 
-                FROM participants p 
-                JOIN runs r ON p.run_id = r.run_id 
-                WHERE r.completion_time IS NOT NULL 
-                AND p.server_id = ? {time_constraint}
-                GROUP BY p.user_id 
-                ORDER BY run_count DESC 
-                LIMIT 10
-            '''
-        elif category == "keys":
-            query = f'''
-                SELECT p.user_id, MAX(r.key_level) as max_key 
-                FROM participants p 
-                JOIN runs r ON p.run_id = r.run_id 
-                WHERE r.completion_time IS NOT NULL 
-                AND p.server_id = ? {time_constraint}
-                GROUP BY p.user_id 
-                ORDER BY max_key DESC 
-                LIMIT 10
-            '''
-        
-        c.execute(query, (str(interaction.guild_id),))
-        results = c.fetchall()
+        results = await stats_cache.get(
+            ("leaderboard", interaction.guild_id, category, timeframe),
+            lambda: database.get_leaderboard(interaction.guild_id, category, timeframe)
+        )
+        if results is None:
+            await interaction.response.send_message(
+                "Unknown leaderboard category. Please use 'runs' or 'keys'.",
+                ephemeral=True
+            )
+            return
         
         # Create leaderboard embed
         embed = discord.Embed(
@@ -604,60 +1013,133 @@ async def leaderboard(interaction: discord.Interaction, category: str, timeframe
             description=f"Server: {interaction.guild.name}\nTimeframe: {timeframe.title()}",
             color=discord.Color.gold()
         )
-        
-        # ... rest of embed creation ...
+        # Mentions in embeds show the member's name without pinging them or fetching the user
+        score_format = "{} runs" if category == "runs" else "+{}"
+        ranking = "\n".join(
+            f"**{rank}.** <@{user_id}> - {score_format.format(score)}"
+            for rank, (user_id, score) in enumerate(results, start=1)
+        )
+        embed.add_field(name="Top Players", value=ranking or "No runs recorded yet", inline=False)
+        await interaction.response.send_message(embed=embed)
 
     except Error as e:
         await interaction.response.send_message(f"Error retrieving leaderboard: {e}", ephemeral=True)
-    finally:
-        conn.close()
 
-async def record_completed_run(group_state, dungeon_name, key_level, guild_id, guild_name):
-    conn = create_connection()
-    if conn is None:
+# Board mode settings, limited to members who can manage the server
+board_commands = app_commands.Group(
+    name="board",
+    description="Manage the server's group board",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True)
+)
+
+@board_commands.command(name="enable", description="List new groups on one board message instead of a message per group")
+@app_commands.describe(channel="Channel to post the board in (default: this channel)")
+@timed("board_enable")
+async def board_enable(interaction: discord.Interaction, channel: discord.TextChannel = None):
+    channel = channel or interaction.channel
+    await interaction.response.defer(ephemeral=True)
+    try:
+        await group_boards.enable(interaction.guild_id, channel.id)
+    except Error as e:
+        await interaction.followup.send(f"Error enabling the board: {e}", ephemeral=True)
         return
-    
+    await interaction.followup.send(f"New groups will be listed on the board in {channel.mention}.", ephemeral=True)
+
+@board_commands.command(name="disable", description="Post a message per group again")
+@timed("board_disable")
+async def board_disable(interaction: discord.Interaction):
     try:
-        c = conn.cursor()
-        
-        # Ensure server is registered
-        c.execute('''
-            INSERT OR IGNORE INTO servers (server_id, server_name)
-            VALUES (?, ?)
-        ''', (str(guild_id), guild_name))
-        
-        # Insert run record
-        c.execute('''
-            INSERT INTO runs (server_id, dungeon_name, key_level, completion_time)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (str(guild_id), dungeon_name, int(key_level.strip('+'))))
-        run_id = c.lastrowid
-        
-        # Record participants
-        if group_state.members["Tank"]:
-            c.execute('''
-                INSERT INTO participants (run_id, server_id, user_id, role)
-                VALUES (?, ?, ?, ?)
-            ''', (run_id, str(guild_id), str(group_state.members["Tank"].id), "Tank"))
-            
-        if group_state.members["Healer"]:
-            c.execute('''
-                INSERT INTO participants (run_id, server_id, user_id, role)
-                VALUES (?, ?, ?, ?)
-            ''', (run_id, str(guild_id), str(group_state.members["Healer"].id), "Healer"))
-            
-        for dps in group_state.members["DPS"]:
-            if dps:
-                c.execute('''
-                    INSERT INTO participants (run_id, server_id, user_id, role)
-                    VALUES (?, ?, ?, ?)
-                ''', (run_id, str(guild_id), str(dps.id), "DPS"))
-        
-        conn.commit()
+        remaining = await group_boards.disable(interaction.guild_id)
     except Error as e:
-        print(f"Error recording run: {e}")
-    finally:
-        conn.close()
+        await interaction.response.send_message(f"Error disabling the board: {e}", ephemeral=True)
+        return
+    message = "Board disabled, new groups get their own message again."
+    if remaining:
+        message += f" The board stays up until its {remaining} open group{'s' if remaining != 1 else ''} finish."
+    await interaction.response.send_message(message, ephemeral=True)
+
+bot.tree.add_command(board_commands)
+
+# Server timezone, used to read /lfm schedules
+timezone_commands = app_commands.Group(
+    name="timezone",
+    description="Manage the server's timezone",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True)
+)
+
+@timezone_commands.command(name="set", description="Set the timezone /lfm schedules are read in")
+@app_commands.describe(name="IANA timezone name, e.g. Europe/Berlin or America/New_York")
+@timed("timezone_set")
+async def timezone_set(interaction: discord.Interaction, name: str):
+    tz = find_timezone(name)
+    if tz is None:
+        await interaction.response.send_message(
+            f"Unknown timezone '{name}'. Please pick one from the suggestions, e.g. Europe/Berlin.",
+            ephemeral=True
+        )
+        return
+    try:
+        await guild_timezones.set(interaction.guild_id, interaction.guild.name, tz)
+    except Error as e:
+        await interaction.response.send_message(f"Error saving the timezone: {e}", ephemeral=True)
+        return
+    now = datetime.now(tz)
+    await interaction.response.send_message(
+        f"Schedules are now read in {tz.key} (currently {now.strftime('%H:%M')}, UTC{now.strftime('%z')}).",
+        ephemeral=True
+    )
+
+@timezone_set.autocomplete("name")
+async def timezone_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=name, value=name) for name in timezone_candidates(current)]
+
+@timezone_commands.command(name="show", description="Show the timezone /lfm schedules are read in")
+@timed("timezone_show")
+async def timezone_show(interaction: discord.Interaction):
+    tz = guild_timezones.get(interaction.guild_id)
+    now = datetime.now(tz)
+    await interaction.response.send_message(
+        f"Schedules are read in {tz.key} (currently {now.strftime('%H:%M')}, UTC{now.strftime('%z')}).",
+        ephemeral=True
+    )
+
+bot.tree.add_command(timezone_commands)
+
+def record_completed_run(group_state, dungeon_name, key_level, guild_id, guild_name):
+    """
+    Queues a completed group's run to be recorded by the background writer.
+    
+    Args:
+        group_state: The completed group's state
+        dungeon_name: Full name of the dungeon
+        key_level: The key level as entered (e.g. "+10")
+        guild_id: The Discord server ID
+        guild_name: The Discord server name
+    """
+    participants = []
+    if group_state.members["Tank"]:
+        participants.append((group_state.members["Tank"], "Tank"))
+    if group_state.members["Healer"]:
+        participants.append((group_state.members["Healer"], "Healer"))
+    for dps in group_state.members["DPS"]:
+        participants.append((dps, "DPS"))
+
+    try:
+        level = int(key_level.strip('+'))
+    except ValueError as e:
+        log.error("Error recording run", extra={"key_level": key_level, "error": str(e)})
+        return
+    run_writer.submit(CompletedRun(
+        guild_id, guild_name, dungeon_name, level, participants, datetime.now(timezone.utc)
+    ))
 
 # Run the bot with the token loaded from the environment variables
-bot.run(TOKEN)
+# Guarded so the load test harness can import the handlers without connecting
+startup_timer.mark("import")
+if __name__ == "__main__":
+    try:
+        bot.run(TOKEN, log_handler=None)
+    finally:
+        log_listener.stop()
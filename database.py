@@ -0,0 +1,619 @@
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+DB_PATH = os.getenv('DB_PATH', 'data/mythicmate.db')
+
+log = logging.getLogger(__name__)
+
+# Tables are created on startup if they don't exist yet
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS servers (
+        server_id TEXT PRIMARY KEY,
+        server_name TEXT,
+        timezone TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        server_id TEXT NOT NULL REFERENCES servers (server_id),
+        dungeon_name TEXT NOT NULL,
+        key_level INTEGER NOT NULL,
+        completion_time TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS participants (
+        run_id INTEGER NOT NULL REFERENCES runs (run_id),
+        server_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        PRIMARY KEY (run_id, user_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_runs_server_time ON runs (server_id, completion_time);
+    CREATE INDEX IF NOT EXISTS idx_participants_server_user ON participants (server_id, user_id, role);
+
+    CREATE TABLE IF NOT EXISTS groups (
+        message_id INTEGER PRIMARY KEY,
+        guild_id INTEGER,
+        channel_id INTEGER NOT NULL,
+        dungeon_name TEXT NOT NULL,
+        key_level TEXT NOT NULL,
+        schedule_time TEXT,
+        embed TEXT NOT NULL,
+        members TEXT NOT NULL,
+        backups TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        board INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_groups_schedule ON groups (schedule_time);
+
+    -- Bot-wide values that must survive restarts, e.g. the hash of the last synced command tree
+    CREATE TABLE IF NOT EXISTS bot_settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+
+    -- Guilds listing their groups on a board instead of one message per group
+    CREATE TABLE IF NOT EXISTS boards (
+        guild_id INTEGER PRIMARY KEY,
+        channel_id INTEGER NOT NULL,
+        message_ids TEXT NOT NULL DEFAULT '[]'
+    );
+
+    -- Groups that finished, completed or expired, so completion rates can be computed.
+    -- members is a JSON list of the IDs of the users in a main slot when the group finished.
+    CREATE TABLE IF NOT EXISTS group_outcomes (
+        server_id TEXT NOT NULL,
+        dungeon_name TEXT NOT NULL,
+        key_level TEXT NOT NULL,
+        outcome TEXT NOT NULL,
+        finished_at TIMESTAMP NOT NULL,
+        members TEXT NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_group_outcomes_server_time ON group_outcomes (server_id, finished_at);
+
+    -- Per-user leaderboard totals, kept up to date as runs are recorded.
+    -- period is 'all', 'month' or 'week' and bucket identifies the month ('YYYY-MM')
+    -- or week (date of its Monday); the all-time bucket is ''.
+    CREATE TABLE IF NOT EXISTS leaderboard_rollups (
+        server_id TEXT NOT NULL,
+        period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        run_count INTEGER NOT NULL,
+        max_key INTEGER NOT NULL,
+        PRIMARY KEY (server_id, period, bucket, user_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_rollups_runs
+        ON leaderboard_rollups (server_id, period, bucket, run_count DESC, user_id);
+    CREATE INDEX IF NOT EXISTS idx_rollups_keys
+        ON leaderboard_rollups (server_id, period, bucket, max_key DESC, user_id);
+'''
+
+# Columns added after their table was first released, added to existing databases on startup
+# Stored as PRAGMA user_version, bump it when adding migrations or backfills
+SCHEMA_VERSION = 1
+
+COLUMN_MIGRATIONS = [
+    ("groups", "board", "INTEGER NOT NULL DEFAULT 0"),
+    ("servers", "timezone", "TEXT"),
+]
+
+# Fills the rollups from existing history the first time they are created
+BACKFILL_ROLLUPS = '''
+    INSERT INTO leaderboard_rollups (server_id, period, bucket, user_id, run_count, max_key)
+    SELECT p.server_id, 'all', '', p.user_id, COUNT(*), MAX(r.key_level)
+    FROM participants p JOIN runs r ON p.run_id = r.run_id
+    WHERE r.completion_time IS NOT NULL
+    GROUP BY p.server_id, p.user_id
+    UNION ALL
+    SELECT p.server_id, 'month', strftime('%Y-%m', r.completion_time), p.user_id, COUNT(*), MAX(r.key_level)
+    FROM participants p JOIN runs r ON p.run_id = r.run_id
+    WHERE r.completion_time IS NOT NULL
+    GROUP BY p.server_id, strftime('%Y-%m', r.completion_time), p.user_id
+    UNION ALL
+    SELECT p.server_id, 'week', date(r.completion_time, '-' || ((strftime('%w', r.completion_time) + 6) % 7) || ' days'),
+        p.user_id, COUNT(*), MAX(r.key_level)
+    FROM participants p JOIN runs r ON p.run_id = r.run_id
+    WHERE r.completion_time IS NOT NULL
+    GROUP BY p.server_id, date(r.completion_time, '-' || ((strftime('%w', r.completion_time) + 6) % 7) || ' days'), p.user_id
+'''
+
+# Statements are kept as constants so sqlite's per-connection statement cache reuses them
+REGISTER_SERVER = '''
+    INSERT OR IGNORE INTO servers (server_id, server_name)
+    VALUES (?, ?)
+'''
+
+ROLE_COUNTS = '''
+    SELECT COUNT(*), role
+    FROM participants
+    WHERE user_id = ? AND server_id = ?
+    GROUP BY role
+'''
+
+AVERAGE_KEY = '''
+    SELECT AVG(r.key_level)
+    FROM runs r
+    JOIN participants p ON r.run_id = p.run_id
+    WHERE p.user_id = ? AND p.server_id = ?
+'''
+
+INSERT_RUN = '''
+    INSERT INTO runs (run_id, server_id, dungeon_name, key_level, completion_time)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# Highest run ID ever handed out, so a batch can number its runs up front
+LAST_RUN_ID = '''
+    SELECT MAX(
+        COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'runs'), 0),
+        COALESCE((SELECT MAX(run_id) FROM runs), 0)
+    )
+'''
+
+INSERT_PARTICIPANT = '''
+    INSERT INTO participants (run_id, server_id, user_id, role)
+    VALUES (?, ?, ?, ?)
+'''
+
+UPDATE_ROLLUP = '''
+    INSERT INTO leaderboard_rollups (server_id, period, bucket, user_id, run_count, max_key)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (server_id, period, bucket, user_id) DO UPDATE SET
+        run_count = run_count + excluded.run_count,
+        max_key = MAX(max_key, excluded.max_key)
+'''
+
+LEADERBOARD_COLUMNS = {
+    "runs": "run_count",
+    "keys": "max_key",
+}
+
+# Each query is a range scan over the matching covering index
+LEADERBOARD_QUERIES = {
+    category: f'''
+        SELECT user_id, {column}
+        FROM leaderboard_rollups
+        WHERE server_id = ? AND period = ? AND bucket = ?
+        ORDER BY {column} DESC
+        LIMIT 10
+    '''
+    for category, column in LEADERBOARD_COLUMNS.items()
+}
+
+
+# A completed run waiting to be written. participants is a list of (user_id, role) tuples.
+CompletedRun = namedtuple(
+    "CompletedRun",
+    ["guild_id", "guild_name", "dungeon_name", "key_level", "participants", "completion_time"]
+)
+
+
+def rollup_buckets(moment):
+    """
+    Returns the leaderboard buckets a moment in time falls into.
+
+    Args:
+        moment: A UTC datetime
+
+    Returns:
+        dict: Bucket key for the 'all', 'month' and 'week' periods
+    """
+    week_start = moment.date() - timedelta(days=moment.weekday())
+    return {
+        "all": "",
+        "month": moment.strftime("%Y-%m"),
+        "week": week_start.isoformat(),
+    }
+
+
+class Database:
+    """
+    Shared access to the bot's SQLite database.
+
+    Connections are kept in a small pool and only used from a dedicated thread pool, so
+    queries never block the event loop. Every connection runs in WAL mode, which lets
+    readers continue while a write is in progress.
+
+    Attributes:
+        path: Path to the SQLite database file
+        pool_size: Number of pooled connections and worker threads
+    """
+    def __init__(self, path=DB_PATH, pool_size=4):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="mythicmate-db")
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=128)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a pooled connection, opening a new one while the pool isn't full yet.
+
+        Must only be used from the database worker threads.
+
+        Yields:
+            sqlite3.Connection: A connection that is returned to the pool afterwards
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    def _call(self, fn, args):
+        with self.connection() as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn, *args):
+        """
+        Runs a function with a pooled connection on the database executor.
+
+        Args:
+            fn: Function called as fn(connection, *args)
+            *args: Extra arguments for the function
+
+        Returns:
+            The function's return value
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    async def bootstrap(self):
+        """
+        Creates all tables and indexes that don't exist yet, and migrates older databases.
+
+        Shard processes started by the launcher share one database file. The migrations run
+        under the write lock and only if the stored schema version is older, so exactly one
+        process adds the columns and backfills the rollups.
+        """
+        def create_schema(conn):
+            conn.executescript(SCHEMA)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                    for table, column, definition in COLUMN_MIGRATIONS:
+                        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+                        if column not in columns:
+                            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+                    has_rollups = conn.execute('SELECT 1 FROM leaderboard_rollups LIMIT 1').fetchone()
+                    if not has_rollups:
+                        conn.execute(BACKFILL_ROLLUPS)
+                    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        await self.run(create_schema)
+
+    def close(self):
+        """Shuts down the executor and closes every pooled connection."""
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    async def get_setting(self, key):
+        """
+        Loads a bot-wide setting.
+
+        Args:
+            key: Name of the setting
+
+        Returns:
+            str: The stored value, or None if it was never set
+        """
+        def query(conn):
+            row = conn.execute('SELECT value FROM bot_settings WHERE key = ?', (key,)).fetchone()
+            return row[0] if row else None
+        return await self.run(query)
+
+    async def set_setting(self, key, value):
+        """
+        Stores a bot-wide setting.
+
+        Args:
+            key: Name of the setting
+            value: The value to store
+        """
+        def query(conn):
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO bot_settings (key, value) VALUES (?, ?)', (key, value))
+        await self.run(query)
+
+    async def get_guild_timezones(self):
+        """
+        Loads the timezone of every server that has one set.
+
+        Returns:
+            dict: Server ID -> IANA timezone name
+        """
+        def query(conn):
+            rows = conn.execute('SELECT server_id, timezone FROM servers WHERE timezone IS NOT NULL').fetchall()
+            return {int(server_id): name for server_id, name in rows}
+        return await self.run(query)
+
+    async def set_guild_timezone(self, guild_id, guild_name, name):
+        """
+        Stores a server's timezone, registering the server if needed.
+
+        Args:
+            guild_id: The Discord server ID
+            guild_name: The Discord server name
+            name: IANA timezone name, e.g. "Europe/Berlin"
+        """
+        def query(conn):
+            with conn:
+                conn.execute(REGISTER_SERVER, (str(guild_id), guild_name))
+                conn.execute('UPDATE servers SET timezone = ? WHERE server_id = ?', (name, str(guild_id)))
+        await self.run(query)
+
+    async def get_user_stats(self, guild_id, guild_name, user_id):
+        """
+        Loads a user's statistics for one server.
+
+        Args:
+            guild_id: The Discord server ID
+            guild_name: The Discord server name
+            user_id: The Discord user ID
+
+        Returns:
+            tuple: (list of (count, role) rows, average key level or None)
+        """
+        def query(conn):
+            with conn:
+                conn.execute(REGISTER_SERVER, (str(guild_id), guild_name))
+            role_counts = conn.execute(ROLE_COUNTS, (str(user_id), str(guild_id))).fetchall()
+            avg_key = conn.execute(AVERAGE_KEY, (str(user_id), str(guild_id))).fetchone()[0]
+            return role_counts, avg_key
+        return await self.run(query)
+
+    async def get_leaderboard(self, guild_id, category, timeframe):
+        """
+        Loads the top 10 players of a server.
+
+        Args:
+            guild_id: The Discord server ID
+            category: "runs" or "keys"
+            timeframe: "month" or "week" for the current calendar month or week (starting
+                Monday, UTC), anything else means all time
+
+        Returns:
+            list: (user_id, score) rows, or None for an unknown category
+        """
+        sql = LEADERBOARD_QUERIES.get(category)
+        if sql is None:
+            return None
+        period = timeframe if timeframe in ("month", "week") else "all"
+        bucket = rollup_buckets(datetime.now(timezone.utc))[period]
+
+        def query(conn):
+            return conn.execute(sql, (str(guild_id), period, bucket)).fetchall()
+        return await self.run(query)
+
+    def write_runs(self, conn, runs):
+        """
+        Writes a batch of completed runs in a single transaction.
+
+        Runs, participants and leaderboard rollups are each written with one executemany.
+        Must be called on the database executor, see Database.run.
+
+        Args:
+            conn: A pooled connection
+            runs: List of CompletedRun tuples
+
+        Returns:
+            list: The IDs of the new runs, in order
+        """
+        # Take the write lock up front so the run IDs handed out below stay unique
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            first_id = conn.execute(LAST_RUN_ID).fetchone()[0] + 1
+            run_ids = list(range(first_id, first_id + len(runs)))
+
+            servers = {(str(run.guild_id), run.guild_name) for run in runs}
+            run_rows = []
+            participant_rows = []
+            rollups = {}
+            for run_id, run in zip(run_ids, runs):
+                server_id = str(run.guild_id)
+                run_rows.append((
+                    run_id, server_id, run.dungeon_name, run.key_level,
+                    run.completion_time.strftime("%Y-%m-%d %H:%M:%S")
+                ))
+                buckets = rollup_buckets(run.completion_time)
+                for user_id, role in run.participants:
+                    participant_rows.append((run_id, server_id, str(user_id), role))
+                    # Fold the batch into one rollup row per user and bucket before upserting
+                    for period, bucket in buckets.items():
+                        key = (server_id, period, bucket, str(user_id))
+                        count, max_key = rollups.get(key, (0, 0))
+                        rollups[key] = (count + 1, max(max_key, run.key_level))
+
+            conn.executemany(REGISTER_SERVER, servers)
+            conn.executemany(INSERT_RUN, run_rows)
+            conn.executemany(INSERT_PARTICIPANT, participant_rows)
+            conn.executemany(UPDATE_ROLLUP, [key + value for key, value in rollups.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return run_ids
+
+
+class RunWriteQueue:
+    """
+    Queues completed runs and writes them in batches from a background task.
+
+    Runs that complete close together share one transaction, so many completions
+    cost only a few commits. Anything still queued is written when the queue is closed.
+
+    Attributes:
+        database: The Database to write to
+        flush_interval: Seconds to keep collecting runs after the first one arrives
+        batch_size: Maximum number of runs written in one transaction
+        on_commit: Optional function called with the list of runs after each commit
+        runs_written: Number of runs committed
+        batches_written: Number of transactions committed
+        last_lag: Seconds between queueing and committing the oldest run of the last batch
+        max_lag: Largest lag seen so far, in seconds
+    """
+    def __init__(self, database, flush_interval=1.0, batch_size=500, on_commit=None):
+        self.database = database
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.on_commit = on_commit
+        self._queue = asyncio.Queue()
+        self._task = None
+        self._in_flight = None  # (write task, batch) while a batch is being written
+        self.runs_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        """Starts the background writer."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, run):
+        """
+        Queues a completed run to be written.
+
+        Args:
+            run: The CompletedRun to record
+        """
+        self._queue.put_nowait((time.monotonic(), run))
+
+    def _drain(self, batch):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _write(self, batch):
+        runs = [run for _, run in batch]
+        try:
+            await self.database.run(self.database.write_runs, runs)
+        except Exception as e:
+            self.write_errors += 1
+            log.error("Error recording runs", extra={"runs": len(runs), "error": str(e)})
+            return False
+
+        if self.on_commit:
+            self.on_commit(runs)
+
+        lag = time.monotonic() - batch[0][0]
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.runs_written += len(batch)
+        self.batches_written += 1
+        return True
+
+    async def _run(self):
+        batch = []
+        while True:
+            try:
+                if not batch:
+                    batch.append(await self._queue.get())
+                    # Give runs completing around the same time a chance to share the transaction
+                    await asyncio.sleep(self.flush_interval)
+                self._drain(batch)
+                # Shielded, the write may commit even if the writer is cancelled meanwhile
+                self._in_flight = (asyncio.create_task(self._write(batch)), batch)
+                written = await asyncio.shield(self._in_flight[0])
+                self._in_flight = None
+                if written:
+                    batch = []
+                else:
+                    # Keep the batch and try again after a pause
+                    await asyncio.sleep(self.flush_interval * 5)
+            except asyncio.CancelledError:
+                # A batch that is still being written is left to close(), which waits for the
+                # write, anything else is handed back so close() can write it
+                if self._in_flight is None:
+                    for item in batch:
+                        self._queue.put_nowait(item)
+                break
+
+    async def close(self):
+        """Stops the background writer and writes every queued run."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._in_flight:
+            write, batch = self._in_flight
+            self._in_flight = None
+            # Only a write that failed is retried, one that committed must not be written twice
+            if not await write:
+                for item in batch:
+                    self._queue.put_nowait(item)
+        while not self._queue.empty():
+            if not await self._write(self._drain([])):
+                break
+
+    def stats(self):
+        """
+        Returns write queue metrics.
+
+        Returns:
+            dict: Queue depth, write counts and queue lag in seconds
+        """
+        return {
+            "run_queue_depth": self._queue.qsize(),
+            "runs_written": self.runs_written,
+            "run_batches_written": self.batches_written,
+            "run_write_errors": self.write_errors,
+            "run_queue_last_lag_seconds": self.last_lag,
+            "run_queue_max_lag_seconds": self.max_lag,
+        }
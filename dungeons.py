@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import re
+import time
+
+# Define the available dungeons and their abbreviations
+# This dictionary maps full dungeon names to a list of their common abbreviations or shorthand names.
+# It can be overridden without a restart by placing the same mapping in data/dungeons.json.
+dungeon_aliases = {
+    "Ara-Kara, City of Echoes": ["ara", "city of echoes", "coe"],
+    "The Dawnbreaker": ["dawnbreaker", "breaker"],
+    "Operation: Floodgate": ["flood", "floodgate", "of"],
+    "Priory of the Sacred Flame": ["priory", "sacred", "flame", "psf"],
+    "Eco-Dome Al'dani": ["eco", "eco-dome", "dome"],
+    "Halls of Atonement": ["hoa", "halls of atonement", "halls"],
+    "Tazavesh the Veiled Market, Streets of Wonder": ["sow", "streets of wonder", "streets"],
+    "Tazavesh the Veiled Market, So'leah's Gambit": ["sol", "gambit", "sg"]
+}
+
+DUNGEONS_FILE = 'data/dungeons.json'
+
+log = logging.getLogger(__name__)
+
+# Score of a prefix match, trigram similarity is scaled to stay below it
+PREFIX_SCORE = 0.9
+FUZZY_WEIGHT = 0.85
+
+# Minimum score for a typo to be accepted as a dungeon name
+MIN_FUZZY_SCORE = 0.5
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    """
+    Lowercases text and collapses punctuation and whitespace into single spaces.
+
+    Args:
+        text: The text to normalize
+
+    Returns:
+        str: The normalized text
+    """
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(text):
+    """
+    Returns the character trigrams of normalized text, padded so word starts count.
+
+    Args:
+        text: Normalized text
+
+    Returns:
+        set: The trigrams
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DungeonIndex:
+    """
+    Precomputed lookup structures for one dungeon list.
+
+    Attributes:
+        names: Full dungeon names in list order
+        order: Position of each full name in the list
+        exact: Dictionary mapping lowercased and normalized aliases to full names
+        prefixes: Dictionary mapping every prefix of every alias word onward to full names
+        grams: Dictionary mapping trigrams to the aliases containing them
+        alias_names: Full dungeon name for each alias, by alias position
+        alias_sizes: Number of trigrams of each alias, by alias position
+    """
+    def __init__(self, aliases):
+        self.names = list(aliases)
+        self.order = {name: position for position, name in enumerate(self.names)}
+        self.exact = {}
+        self.prefixes = {}
+        self.grams = {}
+        self.alias_names = []
+        self.alias_sizes = []
+
+        for full_name, shorthands in aliases.items():
+            for alias in shorthands + [full_name.lower()]:
+                self.exact[alias] = full_name
+                key = normalize(alias)
+                self.exact.setdefault(key, full_name)
+
+                # Prefixes of the alias starting at each word, so "kara" finds "Ara-Kara"
+                words = key.split()
+                for start in range(len(words)):
+                    tail = " ".join(words[start:])
+                    for end in range(1, len(tail) + 1):
+                        self.prefixes.setdefault(tail[:end], set()).add(full_name)
+
+                position = len(self.alias_names)
+                alias_grams = trigrams(key)
+                self.alias_names.append(full_name)
+                self.alias_sizes.append(len(alias_grams))
+                for gram in alias_grams:
+                    self.grams.setdefault(gram, []).append(position)
+
+
+class DungeonResolver:
+    """
+    Resolves user input to dungeon names, tolerating typos and partial names.
+
+    Exact aliases resolve through a dictionary, partial names through a prefix index and
+    typos through a trigram index, so ranking candidates never scans the dungeon list.
+    The list is reloaded from a JSON file whenever the file changes.
+
+    Attributes:
+        path: JSON file that overrides the built-in dungeon list, if it exists
+        check_interval: Minimum seconds between checks of the file for changes
+    """
+    def __init__(self, aliases=None, path=DUNGEONS_FILE, check_interval=30):
+        self.path = path
+        self.check_interval = check_interval
+        self._default = aliases if aliases is not None else dungeon_aliases
+        self._mtime = None
+        self._checked_at = 0.0
+        self.index = DungeonIndex(self._default)
+        self.maybe_reload(force=True)
+
+    def maybe_reload(self, force=False):
+        """
+        Reloads the dungeon list if the JSON file changed since the last load.
+
+        Args:
+            force: Check the file even if the check interval hasn't passed
+
+        Returns:
+            bool: True if a new dungeon list was loaded
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        if mtime is None:
+            # The override file was removed, fall back to the built-in list
+            self.index = DungeonIndex(self._default)
+            return True
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                aliases = json.load(f)
+            self.index = DungeonIndex({name: list(shorthands) for name, shorthands in aliases.items()})
+            log.info("Loaded dungeon list", extra={"path": self.path, "dungeons": len(aliases)})
+            return True
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            log.error("Error loading dungeon list", extra={"path": self.path, "error": str(e)})
+            return False
+
+    def candidates(self, user_input, limit=25):
+        """
+        Ranks dungeons by how well they match the input.
+
+        Args:
+            user_input: What the user typed so far
+            limit: Maximum number of candidates to return
+
+        Returns:
+            list: (full_name, score) tuples, best match first
+        """
+        self.maybe_reload()
+        index = self.index
+        query = normalize(user_input)
+        if not query:
+            return [(name, 0.0) for name in index.names[:limit]]
+
+        scores = {}
+        exact = index.exact.get(user_input.lower()) or index.exact.get(query)
+        if exact:
+            scores[exact] = 1.0
+        for full_name in index.prefixes.get(query, ()):
+            scores.setdefault(full_name, PREFIX_SCORE)
+
+        # Dice coefficient over shared trigrams, counted from the posting lists
+        query_grams = trigrams(query)
+        shared = {}
+        for gram in query_grams:
+            for position in index.grams.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        for position, common in shared.items():
+            score = FUZZY_WEIGHT * 2 * common / (len(query_grams) + index.alias_sizes[position])
+            full_name = index.alias_names[position]
+            if score > scores.get(full_name, 0.0):
+                scores[full_name] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], index.order[item[0]]))
+        return ranked[:limit]
+
+    def resolve(self, user_input):
+        """
+        Translates user input to a full dungeon name.
+
+        Args:
+            user_input: A dungeon name, abbreviation, partial name or close misspelling
+
+        Returns:
+            str: The full dungeon name, or None if nothing matches well enough
+        """
+        self.maybe_reload()
+        exact = self.index.exact.get(user_input.lower())
+        if exact:
+            return exact
+
+        ranked = self.candidates(user_input, limit=2)
+        if not ranked or ranked[0][1] < MIN_FUZZY_SCORE:
+            return None
+        # Partial names only resolve when they are unambiguous
+        if len(ranked) > 1 and ranked[1][1] >= PREFIX_SCORE and ranked[0][1] < 1.0:
+            return None
+        return ranked[0][0]
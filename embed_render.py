@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+import discord
+
+from group_state import ROLE_SLOTS, mention
+
+# A rendered group embed. inputs holds what each field was rendered from, so the next
+# render can reuse the fields whose inputs didn't change. The embed is never modified
+# after rendering; every change produces a new one.
+GroupRender = namedtuple("GroupRender", ["version", "base", "inputs", "fields", "embed"])
+
+_FIELD_ORDER = ("tank", "healer", "dps", "backups")
+
+
+def embed_base(embed):
+    """
+    Returns everything but the fields of an embed, to render group embeds on top of.
+
+    Args:
+        embed: The embed, or its dictionary form
+
+    Returns:
+        dict: The embed dictionary without fields
+    """
+    base = dict(embed if isinstance(embed, dict) else embed.to_dict())
+    base.pop("fields", None)
+    return base
+
+
+def _render_field(name, group_state):
+    members = group_state.members
+    if name == "tank":
+        return {"name": "🛡️ Tank", "value": mention(members["Tank"]) if members["Tank"] else "None", "inline": False}
+    if name == "healer":
+        return {"name": "💚 Healer", "value": mention(members["Healer"]) if members["Healer"] else "None", "inline": False}
+    if name == "dps":
+        # Display DPS slots (filled or empty)
+        slots = [mention(user_id) for user_id in members["DPS"]]
+        slots += ["None"] * (ROLE_SLOTS["DPS"] - len(slots))
+        return {"name": "⚔️ DPS", "value": "\n".join(slots), "inline": False}
+
+    lines = [
+        f"**{role}**: " + ", ".join(mention(user_id) for user_id in backups)
+        for role, backups in group_state.backups.items()
+        if backups
+    ]
+    if not lines:
+        return None
+    return {"name": "📋 Backups", "value": "\n".join(lines), "inline": False}
+
+
+def _field_inputs(group_state):
+    members = group_state.members
+    return {
+        "tank": members["Tank"],
+        "healer": members["Healer"],
+        "dps": tuple(members["DPS"]),
+        "backups": group_state.backup_version,
+    }
+
+
+def render_group(group_state, base, previous=None):
+    """
+    Renders the group embed from the roster, reusing what an earlier render already built.
+
+    A render depends only on the group's roster and the embed base. If the roster
+    version hasn't changed the previous render is returned as is. Otherwise only the
+    fields whose roster entries changed are rebuilt, so a long backup list isn't joined
+    again when a DPS slot changes.
+
+    Args:
+        group_state: The group's state
+        base: Embed dictionary without fields, as returned by embed_base
+        previous: The group's previous render, if any
+
+    Returns:
+        GroupRender: The render, which is previous itself when nothing changed
+    """
+    if previous is not None and previous.version == group_state.version and previous.base is base:
+        return previous
+
+    inputs = _field_inputs(group_state)
+    reuse = previous is not None and previous.base is base
+    fields = {}
+    for name in _FIELD_ORDER:
+        if reuse and previous.inputs[name] == inputs[name]:
+            fields[name] = previous.fields[name]
+        else:
+            fields[name] = _render_field(name, group_state)
+
+    embed = discord.Embed.from_dict({**base, "fields": [field for field in fields.values() if field]})
+    return GroupRender(group_state.version, base, inputs, fields, embed)
@@ -0,0 +1,201 @@
+import asyncio
+import copy
+import logging
+from collections import Counter
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class EmbedUpdateScheduler:
+    """
+    Coalesces embed edits for group messages so bursts of reactions cost a single REST call.
+
+    Each message gets at most one pending edit. Requests that arrive while an edit is
+    pending simply replace the embed to send, and the edit goes out once the debounce
+    delay has passed. Edits whose rendered embed matches the last one sent are skipped.
+
+    A guild with many messages waiting for an edit at once is saturated, and its edits
+    wait for the longer saturated delay instead. More of the intermediate rosters are
+    then replaced before they are sent, while the last requested embed always goes out.
+
+    Attributes:
+        delay: Seconds to wait after the first request before sending the edit
+        saturation: Pending edits in one guild from which its edits are slowed down
+        saturated_delay: Seconds to wait before sending an edit of a saturated guild
+        edits_requested: Number of edit requests received
+        edits_coalesced: Number of requests merged into an already pending edit
+        edits_sent: Number of edits actually sent to Discord
+        edits_skipped: Number of edits dropped because nothing changed
+        edits_deferred: Number of edits that waited for the saturated delay
+        on_missing: Function called with the message ID when a message turns out to be deleted
+    """
+    def __init__(self, delay=0.5, on_missing=None, saturation=5, saturated_delay=3.0):
+        self.delay = delay
+        self.on_missing = on_missing
+        self.saturation = saturation
+        self.saturated_delay = saturated_delay
+        self._pending = {}  # message_id -> (message, embed, guild_id)
+        self._guild_pending = Counter()  # guild_id -> messages with a pending edit
+        self._tasks = {}  # message_id -> asyncio task draining the pending edit
+        self._last_sent = {}  # message_id -> embed dict of the last successful edit
+        self._in_flight = set()  # message_ids with an edit being sent
+        self._marked = {}  # message_id -> embed marked as sent while an edit was in flight
+        self.edits_requested = 0
+        self.edits_coalesced = 0
+        self.edits_sent = 0
+        self.edits_skipped = 0
+        self.edits_deferred = 0
+
+    def request(self, message, embed, guild_id=None):
+        """
+        Schedules an edit of the message with the given embed.
+
+        Args:
+            message: The Discord message to edit
+            embed: The embed the message should show once the edit goes out
+            guild_id: The message's server ID, edits are slowed down per server when it is saturated
+        """
+        self.edits_requested += 1
+        if message.id in self._pending:
+            self.edits_coalesced += 1
+        else:
+            self._guild_pending[guild_id] += 1
+        self._pending[message.id] = (message, embed, guild_id)
+
+        if message.id not in self._tasks:
+            self._tasks[message.id] = asyncio.create_task(self._run(message.id))
+
+    @staticmethod
+    def _snapshot(embed):
+        # to_dict shares the field list with the embed, which is mutated in place on updates
+        return copy.deepcopy(embed.to_dict())
+
+    def mark_sent(self, message_id, embed):
+        """
+        Records an embed that was sent outside the scheduler (e.g. with the original message).
+
+        Any edit still queued for the message is older than the embed that was just sent,
+        so it is dropped. An edit already in flight may land after it, in which case the
+        marked embed is sent again once that edit finishes.
+
+        Args:
+            message_id: ID of the message the embed was sent with
+            embed: The embed that is currently displayed
+        """
+        self._pop(message_id)
+        if message_id in self._in_flight:
+            self._marked[message_id] = embed
+        self._last_sent[message_id] = self._snapshot(embed)
+
+    def _pop(self, message_id):
+        pending = self._pending.pop(message_id, None)
+        if pending:
+            guild_id = pending[2]
+            self._guild_pending[guild_id] -= 1
+            if not self._guild_pending[guild_id]:
+                del self._guild_pending[guild_id]
+        return pending
+
+    def forget(self, message_id):
+        """
+        Drops all state for a message, cancelling any pending edit.
+
+        Args:
+            message_id: ID of the message to forget
+        """
+        self._pop(message_id)
+        self._last_sent.pop(message_id, None)
+        self._marked.pop(message_id, None)
+        task = self._tasks.pop(message_id, None)
+        if task and task is not asyncio.current_task():
+            task.cancel()
+
+    async def flush(self, message_id):
+        """
+        Sends the pending edit for a message immediately, if there is one.
+
+        Args:
+            message_id: ID of the message to flush
+        """
+        pending = self._pop(message_id)
+        if not pending:
+            return
+
+        message, embed, guild_id = pending
+        payload = self._snapshot(embed)
+        if self._last_sent.get(message_id) == payload:
+            self.edits_skipped += 1
+            return
+
+        self._in_flight.add(message_id)
+        try:
+            # Edit the stored message directly, there's no need to fetch it first
+            await message.edit(embed=embed)
+            self._last_sent[message_id] = payload
+            self.edits_sent += 1
+        except discord.NotFound:
+            log.info("Group message not found - it may have been deleted", extra={"message_id": message_id})
+            self.forget(message_id)
+            if self.on_missing:
+                self.on_missing(message_id)
+        except discord.Forbidden:
+            log.warning("Bot doesn't have permission to edit the message", extra={"message_id": message_id})
+        except discord.HTTPException as e:
+            if e.status == 429 and message_id not in self._marked:
+                # Put the edit back unless a newer one arrived meanwhile, and let the drain loop retry
+                if message_id not in self._pending:
+                    self._pending[message_id] = pending
+                    self._guild_pending[guild_id] += 1
+            log.warning("Error updating message", extra={"message_id": message_id, "error": str(e)})
+        finally:
+            self._in_flight.discard(message_id)
+
+        # A newer embed was sent while this edit was in flight and may have been overwritten by it
+        marked = self._marked.pop(message_id, None)
+        if marked is not None and message_id not in self._pending:
+            self.request(message, marked, guild_id)
+
+    async def flush_all(self):
+        """Sends every pending edit immediately."""
+        for message_id in list(self._pending):
+            await self.flush(message_id)
+
+    async def _run(self, message_id):
+        try:
+            # Keep draining while new requests arrive during the debounce window or the edit itself
+            while message_id in self._pending:
+                await asyncio.sleep(self._delay(self._pending[message_id][2]))
+                await self.flush(message_id)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self._tasks.get(message_id) is asyncio.current_task():
+                del self._tasks[message_id]
+
+    def _delay(self, guild_id):
+        if guild_id is not None and self._guild_pending[guild_id] >= self.saturation:
+            self.edits_deferred += 1
+            return self.saturated_delay
+        return self.delay
+
+    def stats(self):
+        """
+        Returns the scheduler counters.
+
+        Returns:
+            dict: Requested, coalesced, sent, skipped and deferred edit counts, pending edits,
+                the deepest per-server queue and the number of saturated servers
+        """
+        depths = [depth for guild_id, depth in self._guild_pending.items() if guild_id is not None]
+        return {
+            "embed_edits_requested": self.edits_requested,
+            "embed_edits_coalesced": self.edits_coalesced,
+            "embed_edits_sent": self.edits_sent,
+            "embed_edits_skipped": self.edits_skipped,
+            "embed_edits_deferred": self.edits_deferred,
+            "embed_edits_pending": len(self._pending),
+            "embed_edits_pending_max_guild": max(depths, default=0),
+            "embed_edit_guilds_saturated": sum(1 for depth in depths if depth >= self.saturation),
+        }
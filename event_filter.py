@@ -0,0 +1,76 @@
+import logging
+
+from monitoring import metrics
+
+log = logging.getLogger(__name__)
+
+FILTERED_EVENTS = metrics.counter(
+    "gateway_events_filtered_total", "Gateway events dropped before any objects were built", ("event",)
+)
+
+# Gateway events whose raw payloads go through the reaction filter
+REACTION_EVENTS = ("MESSAGE_REACTION_ADD", "MESSAGE_REACTION_REMOVE")
+
+
+class ReactionFilter:
+    """
+    Decides from the raw gateway payload whether a reaction event concerns a group.
+
+    The check only does dictionary and set lookups on the JSON payload, so reactions on
+    unrelated messages are dropped before discord.py builds emoji, member or payload
+    objects for them.
+
+    Attributes:
+        is_tracked: Function returning True if a message ID belongs to a group
+        emojis: Set of emoji names the bot reacts to
+        self_id: Function returning the bot's own user ID as a string, or None before login
+    """
+    def __init__(self, is_tracked, emojis, self_id):
+        self.is_tracked = is_tracked
+        # Reactions may arrive with or without the emoji variation selector
+        self.emojis = set(emojis) | {emoji.replace("\ufe0f", "") for emoji in emojis}
+        self.self_id = self_id
+
+    def wants(self, data):
+        """
+        Checks whether a raw reaction payload should be handled.
+
+        Args:
+            data: The raw MESSAGE_REACTION_ADD/REMOVE payload
+
+        Returns:
+            bool: True if the reaction is on a group message, with a role emoji, from someone else
+        """
+        emoji = data.get("emoji")
+        if not emoji or emoji.get("id") is not None or emoji.get("name") not in self.emojis:
+            return False
+        if not self.is_tracked(int(data["message_id"])):
+            return False
+        return data.get("user_id") != self.self_id()
+
+
+def install_reaction_filter(connection, reaction_filter):
+    """
+    Wraps discord.py's reaction parsers so filtered events are dropped before parsing.
+
+    Must be called before the gateway connects, e.g. from setup_hook.
+
+    Args:
+        connection: The client's connection state (client._connection)
+        reaction_filter: The ReactionFilter to apply
+    """
+    parsers = getattr(connection, "parsers", None)
+    if parsers is None:
+        log.warning("Connection state has no parsers, reaction events will not be pre-filtered")
+        return
+
+    def wrap(event, parser):
+        def filtered_parser(data):
+            if reaction_filter.wants(data):
+                return parser(data)
+            FILTERED_EVENTS.inc(event)
+        return filtered_parser
+
+    for event in REACTION_EVENTS:
+        if event in parsers:
+            parsers[event] = wrap(event, parsers[event])
@@ -0,0 +1,71 @@
+import asyncio
+import contextlib
+import time
+
+
+class GroupLocks:
+    """
+    One asyncio lock per group, so changes to a group are applied one at a time and in order.
+
+    Locks are created on first use and dropped as soon as nobody holds or waits on them,
+    so idle groups cost nothing. Handlers should only hold a group's lock while reading
+    and changing its state; replies, DMs and reactions go out after it is released.
+
+    Attributes:
+        acquired: Number of times a lock was acquired
+        contended: Number of acquisitions that had to wait for another holder
+        max_wait: Longest time spent waiting for a lock, in seconds
+    """
+    def __init__(self):
+        self._locks = {}  # key -> [lock, number of holders and waiters]
+        self.acquired = 0
+        self.contended = 0
+        self.max_wait = 0.0
+
+    @contextlib.asynccontextmanager
+    async def hold(self, key):
+        """
+        Holds the lock of a group for the duration of an async with block.
+
+        Args:
+            key: The group's message ID
+        """
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            lock = entry[0]
+            if lock.locked():
+                self.contended += 1
+                started = time.perf_counter()
+                await lock.acquire()
+                self.max_wait = max(self.max_wait, time.perf_counter() - started)
+            else:
+                await lock.acquire()
+            self.acquired += 1
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    def __call__(self, key):
+        return self.hold(key)
+
+    def stats(self):
+        """
+        Returns the lock counters.
+
+        Returns:
+            dict: Acquired and contended counts, longest wait and locks currently in use
+        """
+        return {
+            "group_locks_acquired": self.acquired,
+            "group_locks_contended": self.contended,
+            "group_locks_max_wait_seconds": self.max_wait,
+            "group_locks_in_use": len(self._locks),
+        }
@@ -0,0 +1,322 @@
+import asyncio
+import logging
+from collections import deque, namedtuple
+from itertools import count
+
+from reminders import REMINDER_LEAD_TIME
+
+log = logging.getLogger(__name__)
+
+# Number of main slots per role
+ROLE_SLOTS = {
+    "Tank": 1,
+    "Healer": 1,
+    "DPS": 3
+}
+
+
+# Outcome of a role selection: result is "added", "backup", "cleared", "duplicate", "not_member" or "invalid"
+RoleChange = namedtuple("RoleChange", ["result", "role", "promoted_user", "completed"])
+
+
+def mention(user_id):
+    """
+    Formats a user ID as a Discord mention.
+
+    Args:
+        user_id: The Discord user ID
+
+    Returns:
+        str: The mention string
+    """
+    return f"<@{user_id}>"
+
+
+class GroupState:
+    """
+    Manages the state of a Mythic+ group including members, backups, and reminders.
+
+    Members are stored as Discord user IDs. An index from user ID to role makes looking
+    up, removing and promoting users O(1), no matter how long the backup queues get.
+
+    Attributes:
+        members: Dictionary containing current group member IDs by role
+        schedule_time: Optional datetime for scheduled groups
+        version: Bumped on every roster change, so renders can tell if anything changed
+        backup_version: Bumped on every backup list change
+    """
+    __slots__ = ("members", "schedule_time", "version", "backup_version", "_backups", "_backup_counts", "_index", "_tokens")
+
+    def __init__(self, creator_id, initial_role, schedule_time=None):
+        """
+        Initializes a new group state.
+
+        Args:
+            creator_id: ID of the user who created the group
+            initial_role: Starting role of the group creator
+            schedule_time: Optional datetime for scheduled groups
+        """
+        self.members = {
+            "Tank": None,
+            "Healer": None,
+            "DPS": []
+        }
+        # Backup queues hold (user_id, token) pairs. Entries whose token no longer matches
+        # the index are stale and skipped, which makes removing a backup O(1).
+        self._backups = {role: deque() for role in ROLE_SLOTS}
+        self._backup_counts = dict.fromkeys(ROLE_SLOTS, 0)  # live entries per backup queue
+        self._index = {}  # user_id -> (role, is_backup, token)
+        self._tokens = count()
+        self.schedule_time = schedule_time
+        self.version = 0
+        self.backup_version = 0
+
+        # Add the command user to their selected role
+        self.add_member(initial_role, creator_id)
+
+    @classmethod
+    def restore(cls, members, backups, schedule_time=None):
+        """
+        Rebuilds a group state from stored user IDs.
+
+        Args:
+            members: Stored member IDs by role
+            backups: Stored backup IDs by role
+            schedule_time: Optional datetime for scheduled groups
+
+        Returns:
+            GroupState: The restored group state
+        """
+        group_state = cls.__new__(cls)
+        group_state.members = {"Tank": None, "Healer": None, "DPS": []}
+        group_state._backups = {role: deque() for role in ROLE_SLOTS}
+        group_state._backup_counts = dict.fromkeys(ROLE_SLOTS, 0)
+        group_state._index = {}
+        group_state._tokens = count()
+        group_state.schedule_time = schedule_time
+        group_state.version = 0
+        group_state.backup_version = 0
+
+        for role in ("Tank", "Healer"):
+            if members.get(role):
+                group_state.add_member(role, members[role])
+        for user_id in members.get("DPS", []):
+            group_state.add_member("DPS", user_id)
+        for role in ROLE_SLOTS:
+            for user_id in backups.get(role, []):
+                group_state._add_backup(role, user_id)
+        return group_state
+
+    @property
+    def backups(self):
+        """
+        Dictionary containing backup player IDs by role, in promotion order.
+        """
+        return {
+            role: [user_id for user_id, token in queue if self._is_live(user_id, token)]
+            for role, queue in self._backups.items()
+        }
+
+    def _is_live(self, user_id, token):
+        entry = self._index.get(user_id)
+        return entry is not None and entry[1] and entry[2] == token
+
+    def _add_backup(self, role, user_id):
+        token = next(self._tokens)
+        self._index[user_id] = (role, True, token)
+        self._backups[role].append((user_id, token))
+        self._backup_counts[role] += 1
+        self.version += 1
+        self.backup_version += 1
+
+    def _promote(self, role):
+        # Pop stale entries until a live backup turns up
+        queue = self._backups[role]
+        while queue:
+            user_id, token = queue.popleft()
+            if self._is_live(user_id, token):
+                self._backup_counts[role] -= 1
+                self.backup_version += 1
+                return user_id
+        return None
+
+    def add_member(self, role, user_id):
+        """
+        Adds a user to a role, or to backup if role is full.
+
+        Args:
+            role: The role to add the user to
+            user_id: The Discord user ID to add
+
+        Returns:
+            bool: True if added to main role, False if added to backup
+        """
+        if role not in ROLE_SLOTS:
+            return False
+
+        if role == "DPS":
+            if len(self.members["DPS"]) < ROLE_SLOTS["DPS"]:
+                self.members["DPS"].append(user_id)
+                self._index[user_id] = ("DPS", False, None)
+                self.version += 1
+                return True
+        elif not self.members[role]:
+            self.members[role] = user_id
+            self._index[user_id] = (role, False, None)
+            self.version += 1
+            return True
+
+        self._add_backup(role, user_id)
+        return False
+
+    def remove_user(self, user_id):
+        """
+        Removes a user from their role and promotes a backup if available.
+
+        Args:
+            user_id: The Discord user ID to remove
+
+        Returns:
+            tuple: (role_removed_from, promoted_user_id) or (None, None) if user not found
+        """
+        entry = self._index.pop(user_id, None)
+        if entry is None:
+            return None, None
+
+        role, is_backup, _ = entry
+        self.version += 1
+        if is_backup:
+            # The queue entry is now stale and gets skipped, compact once most entries are stale
+            self._backup_counts[role] -= 1
+            self.backup_version += 1
+            queue = self._backups[role]
+            if len(queue) > 32 and len(queue) > 2 * self._backup_counts[role]:
+                self._backups[role] = deque(item for item in queue if self._is_live(*item))
+            return role, None
+
+        promoted_user = self._promote(role)
+        if role == "DPS":
+            self.members["DPS"].remove(user_id)
+            if promoted_user is not None:
+                self.members["DPS"].append(promoted_user)
+        else:
+            self.members[role] = promoted_user
+        if promoted_user is not None:
+            self._index[promoted_user] = (role, False, None)
+        return role, promoted_user
+
+    def clear_role(self, role, user_id):
+        """
+        Frees a user's main role slot without promoting a backup.
+
+        Args:
+            role: The role the user is leaving
+            user_id: The Discord user ID
+
+        Returns:
+            bool: True if the user held that role
+        """
+        entry = self._index.get(user_id)
+        if entry is None or entry[0] != role or entry[1]:
+            return False
+
+        del self._index[user_id]
+        self.version += 1
+        if role == "DPS":
+            self.members["DPS"].remove(user_id)
+        else:
+            self.members[role] = None
+        return True
+
+    def select_role(self, role, user_id):
+        """
+        Applies a role selection, or clears the user's role for "Clear Role".
+
+        Makes every check and change without awaiting, so a selection is applied as a
+        whole and callers can report the outcome afterwards.
+
+        Args:
+            role: "Tank", "Healer", "DPS" or "Clear Role"
+            user_id: The Discord user ID
+
+        Returns:
+            RoleChange: What happened, the role involved, any promoted backup and whether
+                the group just became complete
+        """
+        was_complete = self.is_complete()
+        if role == "Clear Role":
+            role, promoted_user = self.remove_user(user_id)
+            if not role:
+                return RoleChange("not_member", None, None, False)
+            return RoleChange("cleared", role, promoted_user, False)
+
+        if role not in ROLE_SLOTS:
+            return RoleChange("invalid", role, None, False)
+        current_role = self.get_user_role(user_id)
+        if current_role:
+            return RoleChange("duplicate", current_role, None, False)
+
+        added = self.add_member(role, user_id)
+        return RoleChange("added" if added else "backup", role, None, not was_complete and self.is_complete())
+
+    def get_user_role(self, user_id):
+        """
+        Gets the current role of a user in the group.
+
+        Args:
+            user_id: The Discord user ID to check
+
+        Returns:
+            str: The user's role or None if not in group
+        """
+        entry = self._index.get(user_id)
+        if entry is None:
+            return None
+        role, is_backup, _ = entry
+        return f"Backup {role}" if is_backup else role
+
+    def member_ids(self):
+        """
+        Returns the IDs of all main role members.
+
+        Returns:
+            list: Member IDs, tank and healer first
+        """
+        return [
+            user_id
+            for user_id in (self.members["Tank"], self.members["Healer"], *self.members["DPS"])
+            if user_id is not None
+        ]
+
+    def is_complete(self):
+        """
+        Checks if the group has all required roles filled.
+
+        Returns:
+            bool: True if group is complete, False otherwise
+        """
+        return (
+            self.members["Tank"] is not None and
+            self.members["Healer"] is not None and
+            len(self.members["DPS"]) == ROLE_SLOTS["DPS"]
+        )
+
+    async def send_reminder(self, channel, delivery):
+        """
+        Sends reminders to group members before scheduled start time.
+
+        The reminder scheduler calls this once the reminder is due.
+
+        Args:
+            channel: The Discord channel to send fallback messages to
+            delivery: The reminder delivery pipeline to send through
+        """
+        if not self.schedule_time:
+            return
+
+        try:
+            await delivery.deliver(self.member_ids(), channel, self.schedule_time - REMINDER_LEAD_TIME)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            log.exception("Error in reminder task")
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from sqlite3 import Error
+
+log = logging.getLogger(__name__)
+
+
+class GroupStore:
+    """
+    Persists active groups to SQLite so they survive bot restarts.
+
+    Writes are batched behind the reaction handlers: handlers only mark a group as dirty,
+    and a background task periodically writes every dirty group in a single transaction
+    on the database executor. Groups are loaded back lazily, one message ID at a time.
+    Outcomes of finished groups are written in the same transaction that deletes them.
+    When the bot runs as several processes, each one only loads the groups of its guilds.
+
+    Attributes:
+        active_groups: The bot's in-memory group dictionary, keyed by message ID (board groups
+            by the ID of the interaction that created them)
+        database: The shared Database the groups table lives in
+        flush_interval: Seconds between write-behind flushes
+        owns: Function returning True if a guild's groups belong to this process
+        known_ids: Message IDs of all groups stored in the database for owned guilds
+    """
+    def __init__(self, active_groups, database, flush_interval=2.0, owns=None):
+        self.active_groups = active_groups
+        self.database = database
+        self.flush_interval = flush_interval
+        self.owns = owns or (lambda guild_id: True)
+        self.known_ids = set()
+        self._dirty = set()
+        self._deleted = set()  # evicted groups whose rows haven't been deleted yet
+        self._outcomes = []
+        self._flush_task = None
+
+    def _load_index(self, conn):
+        return {
+            message_id: schedule_time
+            for message_id, guild_id, schedule_time
+            in conn.execute('SELECT message_id, guild_id, schedule_time FROM groups')
+            if self.owns(guild_id)
+        }
+
+    async def start(self):
+        """
+        Loads the IDs of stored groups and starts the write-behind task.
+
+        Returns:
+            dict: Schedule times of stored scheduled groups keyed by message ID
+        """
+        try:
+            schedules = await self.database.run(self._load_index)
+        except Error as e:
+            log.error("Error loading stored groups", extra={"error": str(e)})
+            schedules = {}
+        self.known_ids = set(schedules)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        log.info("Group store ready", extra={"stored_groups": len(self.known_ids)})
+        return {
+            message_id: datetime.fromisoformat(schedule_time)
+            for message_id, schedule_time in schedules.items()
+            if schedule_time
+        }
+
+    def mark_dirty(self, message_id):
+        """
+        Queues a group to be written on the next flush. Removed groups are deleted.
+
+        Args:
+            message_id: ID of the group message that changed
+        """
+        self._dirty.add(message_id)
+
+    def delete(self, message_id):
+        """
+        Queues an evicted group to be deleted on the next flush.
+
+        The group is never loaded back in the meantime, so an event arriving before
+        the flush can't bring a finished group back to life.
+
+        Args:
+            message_id: ID of the evicted group's message
+        """
+        self.known_ids.discard(message_id)
+        self._deleted.add(message_id)
+        self._dirty.add(message_id)
+
+    def record_outcome(self, group_info, finished_at=None):
+        """
+        Queues a finished group's outcome to be written on the next flush.
+
+        Args:
+            group_info: The finished group, with its final status
+            finished_at: Timezone-aware time the group finished, defaults to now
+        """
+        finished_at = finished_at or datetime.now(timezone.utc)
+        members = group_info["state"].members
+        user_ids = [user_id for user_id in (members["Tank"], members["Healer"], *members["DPS"]) if user_id]
+        self._outcomes.append((
+            str(group_info["guild_id"]),
+            group_info["dungeon"],
+            group_info["key_level"],
+            group_info["status"],
+            finished_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            json.dumps([str(user_id) for user_id in user_ids]),
+        ))
+
+    def _serialize(self, message_id, group_info):
+        group_state = group_info["state"]
+        # Only the embed base is stored, fields are rendered from the roster when the group is loaded
+        embed = group_info["render"].base
+        return (
+            message_id,
+            group_info["guild_id"],
+            group_info["channel"].id,
+            group_info["dungeon"],
+            group_info["key_level"],
+            group_state.schedule_time.isoformat() if group_state.schedule_time else None,
+            json.dumps(embed),
+            json.dumps(group_state.members),
+            json.dumps(group_state.backups),
+            1 if group_info.get("board") else 0,
+        )
+
+    def _write(self, conn, rows, deleted, outcomes):
+        with conn:
+            if rows:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO groups (
+                        message_id, guild_id, channel_id, dungeon_name, key_level,
+                        schedule_time, embed, members, backups, board, updated_at
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', rows)
+            if deleted:
+                conn.executemany('DELETE FROM groups WHERE message_id = ?', [(i,) for i in deleted])
+            if outcomes:
+                conn.executemany('''
+                    INSERT INTO group_outcomes (server_id, dungeon_name, key_level, outcome, finished_at, members)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', outcomes)
+
+    async def flush(self):
+        """Writes all dirty groups and finished group outcomes to the database in a single transaction."""
+        if not self._dirty and not self._outcomes:
+            return
+        dirty, self._dirty = self._dirty, set()
+        outcomes, self._outcomes = self._outcomes, []
+
+        # Snapshot on the event loop so the worker thread never touches live group objects
+        rows = []
+        deleted = []
+        for message_id in dirty:
+            group_info = self.active_groups.get(message_id)
+            if group_info:
+                rows.append(self._serialize(message_id, group_info))
+            else:
+                deleted.append(message_id)
+
+        try:
+            await self.database.run(self._write, rows, deleted, outcomes)
+            # Groups evicted while the write was in flight stay unloadable until their delete is written
+            self.known_ids.update(row[0] for row in rows if row[0] not in self._deleted)
+            self.known_ids.difference_update(deleted)
+            self._deleted.difference_update(deleted)
+        except Error as e:
+            log.error("Error saving groups", extra={"groups": len(dirty), "error": str(e)})
+            # Retry on the next flush unless they were touched again in the meantime
+            self._dirty.update(dirty)
+            self._outcomes[:0] = outcomes
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                log.exception("Error in group store flush")
+
+    async def close(self):
+        """Stops the write-behind task and writes anything still pending."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    def _purge(self, conn, cutoff, active_ids):
+        stale = []
+        for message_id, guild_id, schedule_time, updated_at in conn.execute(
+            'SELECT message_id, guild_id, schedule_time, updated_at FROM groups'
+        ):
+            if message_id in active_ids or not self.owns(guild_id):
+                continue
+            # updated_at is SQLite's CURRENT_TIMESTAMP, which is UTC without an offset
+            last_used = datetime.fromisoformat(updated_at).replace(tzinfo=timezone.utc)
+            if schedule_time:
+                last_used = max(last_used, datetime.fromisoformat(schedule_time))
+            if last_used < cutoff:
+                stale.append((message_id,))
+        with conn:
+            conn.executemany('DELETE FROM groups WHERE message_id = ?', stale)
+        return [message_id for message_id, in stale]
+
+    async def purge(self, cutoff):
+        """
+        Deletes stored groups that weren't restored and haven't been used since the cutoff.
+
+        Args:
+            cutoff: Timezone-aware datetime, groups last updated and scheduled before it are deleted
+
+        Returns:
+            int: Number of groups deleted
+        """
+        try:
+            deleted = await self.database.run(self._purge, cutoff, set(self.active_groups))
+        except Error as e:
+            log.error("Error purging stored groups", extra={"error": str(e)})
+            return 0
+        self.known_ids.difference_update(deleted)
+        if deleted:
+            log.info("Purged stored groups", extra={"groups": len(deleted)})
+        return len(deleted)
+
+    def _read(self, conn, message_id):
+        return conn.execute('''
+            SELECT guild_id, channel_id, dungeon_name, key_level, schedule_time, embed, members, backups, board
+            FROM groups WHERE message_id = ?
+        ''', (message_id,)).fetchone()
+
+    async def load(self, message_id):
+        """
+        Loads a stored group record.
+
+        Only message IDs known to be stored hit the database, so reactions on
+        unrelated messages stay in memory. Evicted groups waiting to be deleted are
+        never loaded.
+
+        Args:
+            message_id: ID of the group message
+
+        Returns:
+            dict: The stored group record, or None if the group isn't stored
+        """
+        if message_id not in self.known_ids or message_id in self._deleted:
+            return None
+        try:
+            row = await self.database.run(self._read, message_id)
+        except Error as e:
+            log.error("Error loading group", extra={"message_id": message_id, "error": str(e)})
+            return None
+        if not row:
+            self.known_ids.discard(message_id)
+            return None
+        if message_id in self._deleted:
+            # Evicted while it was being read
+            return None
+
+        guild_id, channel_id, dungeon_name, key_level, schedule_time, embed, members, backups, board = row
+        return {
+            "message_id": message_id,
+            "guild_id": guild_id,
+            "channel_id": channel_id,
+            "dungeon": dungeon_name,
+            "key_level": key_level,
+            "schedule_time": datetime.fromisoformat(schedule_time) if schedule_time else None,
+            "embed": json.loads(embed),
+            "members": json.loads(members),
+            "backups": json.loads(backups),
+            "board": bool(board),
+        }
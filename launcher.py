@@ -0,0 +1,133 @@
+"""
+Runs MythicMate as several processes, each running its own range of shards.
+
+Every process is a regular bot.py started with SHARD_COUNT and SHARD_IDS set, so it
+connects only its shards and owns only the groups of their guilds. Processes that exit
+unexpectedly are restarted.
+
+Usage:
+    python launcher.py --processes 4 [--shards 16] [--metrics-port 9108]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+import aiohttp
+from dotenv import load_dotenv
+
+from monitoring import setup_logging
+from sharding import split_shards
+
+log = logging.getLogger("mythicmate.launcher")
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+# Seconds to wait before restarting a process that exited, doubled on every quick failure
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+
+
+async def recommended_shard_count(token):
+    """
+    Asks Discord how many shards the bot should run.
+
+    Args:
+        token: The bot token
+
+    Returns:
+        int: The recommended shard count
+    """
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data["shards"]
+
+
+async def supervise(index, shard_ids, shard_count, metrics_port, stopping):
+    """
+    Runs one bot process for a range of shards, restarting it until the launcher stops.
+
+    Args:
+        index: Position of the process, used to pick its metrics port
+        shard_ids: Shards the process runs
+        shard_count: Total number of shards
+        metrics_port: First metrics port, 0 to disable metrics
+        stopping: Event set when the launcher is shutting down
+    """
+    env = dict(os.environ)
+    env["SHARD_COUNT"] = str(shard_count)
+    env["SHARD_IDS"] = f"{shard_ids[0]}-{shard_ids[-1]}"
+    env["METRICS_PORT"] = str(metrics_port + index if metrics_port else 0)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+    delay = RESTART_DELAY
+
+    while not stopping.is_set():
+        process = await asyncio.create_subprocess_exec(sys.executable, "-u", script, env=env)
+        log.info("Started process", extra={"process": index, "pid": process.pid, "shards": env["SHARD_IDS"]})
+        started = asyncio.get_running_loop().time()
+
+        wait = asyncio.create_task(process.wait())
+        stop = asyncio.create_task(stopping.wait())
+        await asyncio.wait((wait, stop), return_when=asyncio.FIRST_COMPLETED)
+        if stop.done():
+            # Let the bot close cleanly so pending groups and runs are written
+            process.send_signal(signal.SIGINT)
+            await wait
+            log.info("Stopped process", extra={"process": index, "returncode": process.returncode})
+            return
+        stop.cancel()
+
+        # Back off if the process keeps failing right after starting
+        if asyncio.get_running_loop().time() - started > MAX_RESTART_DELAY:
+            delay = RESTART_DELAY
+        log.warning("Process exited, restarting", extra={
+            "process": index, "returncode": process.returncode, "delay": delay
+        })
+        try:
+            await asyncio.wait_for(stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        delay = min(delay * 2, MAX_RESTART_DELAY)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Number of bot processes")
+    parser.add_argument("--shards", type=int, help="Total number of shards, Discord's recommendation by default")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("METRICS_PORT", "9108")),
+                        help="Metrics port of the first process, the others count up from it (0 disables)")
+    args = parser.parse_args()
+
+    token = os.getenv("BOT_TOKEN")
+    if not token:
+        log.error("BOT_TOKEN is not set")
+        return 1
+
+    shard_count = args.shards or await recommended_shard_count(token)
+    shard_ranges = split_shards(shard_count, args.processes)
+    log.info("Launching", extra={"shards": shard_count, "processes": len(shard_ranges)})
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await asyncio.gather(*(
+        supervise(index, shard_ids, shard_count, args.metrics_port, stopping)
+        for index, shard_ids in enumerate(shard_ranges)
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    listener = setup_logging(os.getenv("LOG_LEVEL", "INFO"))
+    try:
+        sys.exit(asyncio.run(main()))
+    finally:
+        listener.stop()
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import sys
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+log = logging.getLogger(__name__)
+
+# Group statuses, in lifecycle order
+OPEN = "open"            # Looking for members
+FULL = "full"            # Every main slot is taken, waiting for the start time
+STARTED = "started"      # Full at its start time, the run is in progress
+COMPLETED = "completed"  # Still full once the run duration passed, recorded as a run
+EXPIRED = "expired"      # Never filled up, or fell apart after starting
+STATUSES = (OPEN, FULL, STARTED, COMPLETED, EXPIRED)
+
+# Groups without a schedule expire after this long without any role change
+IDLE_TIMEOUT = timedelta(hours=2)
+
+# Scheduled groups that aren't full expire this long after their start time
+START_GRACE = timedelta(hours=1)
+
+# Started groups are completed (or expired, if no longer full) after this long
+RUN_DURATION = timedelta(minutes=45)
+
+# Stored groups untouched for this long are deleted without being restored
+STORED_GROUP_TTL = timedelta(days=2)
+
+# Group fields that point at Discord objects the group doesn't own, left out of its size
+UNOWNED_GROUP_FIELDS = frozenset({"message", "channel"})
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def new_lifecycle(group_state, now=None):
+    """
+    Returns the lifecycle fields of a group that was just created or restored.
+
+    Args:
+        group_state: The group's state
+        now: Current time, defaults to now
+
+    Returns:
+        dict: status, last_activity, full_since and started_at entries for the group info
+    """
+    now = now or utcnow()
+    full = group_state.is_complete()
+    return {
+        "status": FULL if full else OPEN,
+        "last_activity": now,
+        "full_since": now if full else None,
+        "started_at": None,
+    }
+
+
+def touch(group_info, now=None):
+    """
+    Records a role change, moving the group between open and full.
+
+    Args:
+        group_info: The group whose roster changed
+        now: Current time, defaults to now
+    """
+    now = now or utcnow()
+    group_info["last_activity"] = now
+    if group_info["status"] not in (OPEN, FULL):
+        return
+    if group_info["state"].is_complete():
+        if group_info["status"] == OPEN:
+            group_info["status"] = FULL
+            group_info["full_since"] = now
+    else:
+        group_info["status"] = OPEN
+        group_info["full_since"] = None
+
+
+def advance(group_info, now):
+    """
+    Moves a group along its lifecycle based on the time.
+
+    Args:
+        group_info: The group to check
+        now: Current time
+
+    Returns:
+        str: The group's status after the check
+    """
+    status = group_info["status"]
+    group_state = group_info["state"]
+    schedule_time = group_state.schedule_time
+
+    if status == OPEN:
+        if schedule_time:
+            if now >= schedule_time + START_GRACE:
+                status = EXPIRED
+        elif now >= group_info["last_activity"] + IDLE_TIMEOUT:
+            status = EXPIRED
+    elif status == FULL:
+        # Groups without a schedule start as soon as they fill up
+        start_time = schedule_time or group_info["full_since"]
+        if now >= start_time:
+            status = STARTED
+            group_info["started_at"] = start_time
+    if status == STARTED and now >= group_info["started_at"] + RUN_DURATION:
+        status = COMPLETED if group_state.is_complete() else EXPIRED
+
+    group_info["status"] = status
+    return status
+
+
+def estimate_group_size(value, seen=None):
+    """
+    Roughly estimates the memory held by a group's own state.
+
+    Follows containers and slotted or plain objects, counting each object once. Discord
+    models (anything bound to the client's connection state) are not counted or followed,
+    they lead to the client's whole cache rather than to anything the group owns.
+
+    Args:
+        value: The object to measure
+        seen: IDs of objects already counted
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen or hasattr(value, "_state"):
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_group_size(k, seen) + estimate_group_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(estimate_group_size(item, seen) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += estimate_group_size(vars(value), seen)
+    elif hasattr(type(value), "__slots__"):
+        for slot in type(value).__slots__:
+            if hasattr(value, slot):
+                size += estimate_group_size(getattr(value, slot), seen)
+    return size
+
+
+class GroupSweeper:
+    """
+    Periodically moves groups through their lifecycle and evicts finished ones.
+
+    Every pass checks each live group's status against the clock. Groups that complete
+    or expire are handed to the finish callback, which records and evicts them. Stored
+    groups that were never restored are purged from the database on a slower cadence.
+
+    Attributes:
+        active_groups: The bot's in-memory group dictionary, keyed by message ID
+        on_finish: Coroutine function called with (message_id, group_info) of finished groups
+        group_store: The GroupStore to purge stale stored groups from
+        interval: Seconds between sweeps
+        purge_interval: Seconds between purges of stale stored groups
+        sample_size: Number of groups measured per sweep to estimate memory per group
+    """
+    def __init__(self, active_groups, on_finish, group_store=None, interval=60, purge_interval=3600, sample_size=100):
+        self.active_groups = active_groups
+        self.on_finish = on_finish
+        self.group_store = group_store
+        self.interval = interval
+        self.purge_interval = purge_interval
+        self.sample_size = sample_size
+        self._task = None
+        self._last_purge = None
+        self.finished = dict.fromkeys((COMPLETED, EXPIRED), 0)
+        self.purged = 0
+        self.bytes_per_group = 0
+
+    def start(self):
+        """Starts the background sweep task."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stops the background sweep task."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def sweep(self, now=None):
+        """
+        Advances every live group and finishes the ones that completed or expired.
+
+        Args:
+            now: Current time, defaults to now
+
+        Returns:
+            int: Number of groups finished
+        """
+        now = now or utcnow()
+        finished = []
+        for message_id, group_info in list(self.active_groups.items()):
+            if advance(group_info, now) in (COMPLETED, EXPIRED):
+                finished.append((message_id, group_info))
+
+        results = await asyncio.gather(
+            *(self.on_finish(message_id, group_info) for message_id, group_info in finished),
+            return_exceptions=True
+        )
+        for (message_id, group_info), result in zip(finished, results):
+            if isinstance(result, Exception):
+                log.error("Error finishing group", exc_info=result, extra={"message_id": message_id})
+            self.finished[group_info["status"]] += 1
+
+        self._measure()
+        if finished:
+            log.info("Swept groups", extra={
+                "finished": len(finished), "active_groups": len(self.active_groups)
+            })
+        return len(finished)
+
+    def _measure(self):
+        # Measuring every group would be as expensive as the groups are large, a sample is enough
+        sample = []
+        for group_info in self.active_groups.values():
+            sample.append(group_info)
+            if len(sample) >= self.sample_size:
+                break
+        if sample:
+            self.bytes_per_group = sum(
+                estimate_group_size({key: value for key, value in group_info.items() if key not in UNOWNED_GROUP_FIELDS})
+                for group_info in sample
+            ) // len(sample)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.sweep()
+                if self.group_store and (self._last_purge is None or loop.time() - self._last_purge >= self.purge_interval):
+                    self._last_purge = loop.time()
+                    self.purged += await self.group_store.purge(utcnow() - STORED_GROUP_TTL)
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                log.exception("Error in group sweeper")
+
+    def live_counts(self):
+        """
+        Counts live groups per status.
+
+        Returns:
+            dict: Group counts keyed by (status,) label tuples
+        """
+        counts = {(status,): 0 for status in (OPEN, FULL, STARTED)}
+        for group_info in self.active_groups.values():
+            key = (group_info["status"],)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def stats(self):
+        """
+        Returns the sweeper counters and memory estimate.
+
+        Returns:
+            dict: Finished and purged group counts plus estimated group memory
+        """
+        return {
+            "groups_completed": self.finished[COMPLETED],
+            "groups_expired": self.finished[EXPIRED],
+            "groups_purged": self.purged,
+            "group_memory_bytes_per_group": self.bytes_per_group,
+            "group_memory_bytes_estimated": self.bytes_per_group * len(self.active_groups),
+        }
@@ -0,0 +1,222 @@
+import heapq
+import logging
+from collections import namedtuple
+
+from group_state import ROLE_SLOTS
+from lifecycle import OPEN
+
+log = logging.getLogger(__name__)
+
+# Key levels are grouped into bands of this many levels, e.g. +10 to +14
+KEY_LEVEL_BAND = 5
+
+# Scheduled groups are grouped into windows of this many seconds
+SCHEDULE_WINDOW = 3600
+
+# An open slot found for a role: the group's key, its info and the roles it still needs
+GroupMatch = namedtuple("GroupMatch", ["group_key", "group_info", "missing"])
+
+
+def key_level_band(key_level):
+    """
+    Returns the band a key level falls into.
+
+    Args:
+        key_level: The key level as entered (e.g. "+10"), or an int
+
+    Returns:
+        int: The band, or None if the key level isn't a number
+    """
+    try:
+        level = int(str(key_level).strip().strip("+"))
+    except ValueError:
+        return None
+    return level // KEY_LEVEL_BAND
+
+
+def schedule_window(schedule_time):
+    """
+    Returns the window a group's start time falls into.
+
+    Args:
+        schedule_time: The group's start time, or None for groups starting now
+
+    Returns:
+        int: The window, or None for groups starting now
+    """
+    if schedule_time is None:
+        return None
+    return int(schedule_time.timestamp()) // SCHEDULE_WINDOW
+
+
+def missing_roles(group_state):
+    """
+    Lists the roles a group still needs.
+
+    Args:
+        group_state: The group's state
+
+    Returns:
+        tuple: Roles with at least one free main slot, in display order
+    """
+    members = group_state.members
+    missing = []
+    if members["Tank"] is None:
+        missing.append("Tank")
+    if members["Healer"] is None:
+        missing.append("Healer")
+    if len(members["DPS"]) < ROLE_SLOTS["DPS"]:
+        missing.append("DPS")
+    return tuple(missing)
+
+
+def bucket_rank(bucket, wanted_band=None):
+    """
+    Ranks a (dungeon, key level band, schedule window) bucket for a lookup.
+
+    Args:
+        bucket: The bucket
+        wanted_band: Band of the preferred key level, or None for any
+
+    Returns:
+        tuple: Sort key, lower is better. Ties are broken by dungeon name, band and window.
+    """
+    dungeon, band, window = bucket
+    # Groups with a key level that isn't a number match any band
+    distance = 0 if wanted_band is None or band is None else abs(band - wanted_band)
+    return (distance, window is not None, window or 0, dungeon, -1 if band is None else band)
+
+
+class GroupIndex:
+    """
+    Per-guild index of the open slots in open groups.
+
+    Groups are filed under (dungeon, key level band, schedule window) buckets for every
+    role they are missing, per guild and role. Finding slots for a role therefore only
+    looks at the buckets for that role, in ranking order, and stops once it has enough
+    groups, instead of scanning every group of the guild.
+
+    The index is kept up to date by calling update() after every roster or status
+    change. Groups whose roster version and status haven't changed since they were
+    last indexed are skipped, so repeated updates are cheap.
+    """
+    def __init__(self):
+        self._guilds = {}  # guild_id -> role -> bucket -> {group_key: sort key}
+        self._entries = {}  # group_key -> (guild_id, buckets, version, status)
+        self.updates = 0
+        self.lookups = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, group_key, group_info):
+        """
+        Files a group under the buckets for the roles it is missing, if it is open.
+
+        Args:
+            group_key: Key of the group in active_groups
+            group_info: The group's info
+        """
+        group_state = group_info["state"]
+        entry = self._entries.get(group_key)
+        if entry and entry[2] == group_state.version and entry[3] == group_info["status"]:
+            return
+
+        self.remove(group_key)
+        self.updates += 1
+        if group_info["status"] != OPEN:
+            self._entries[group_key] = (group_info["guild_id"], (), group_state.version, group_info["status"])
+            return
+
+        missing = missing_roles(group_state)
+        bucket = (group_info["dungeon"], key_level_band(group_info["key_level"]), schedule_window(group_state.schedule_time))
+        # Within a bucket groups starting sooner come first, then the ones closest to full
+        start = group_state.schedule_time.timestamp() if group_state.schedule_time else 0.0
+        sort_key = (start, -len(group_state.member_ids()), group_key)
+
+        guild = self._guilds.setdefault(group_info["guild_id"], {})
+        buckets = []
+        for role in missing:
+            guild.setdefault(role, {}).setdefault(bucket, {})[group_key] = sort_key
+            buckets.append((role, bucket))
+        self._entries[group_key] = (group_info["guild_id"], tuple(buckets), group_state.version, group_info["status"])
+
+    def remove(self, group_key):
+        """
+        Removes a group from the index.
+
+        Args:
+            group_key: Key of the group in active_groups
+        """
+        entry = self._entries.pop(group_key, None)
+        if not entry:
+            return
+        guild_id, buckets, _, _ = entry
+        guild = self._guilds.get(guild_id)
+        for role, bucket in buckets:
+            groups = guild[role][bucket]
+            del groups[group_key]
+            if not groups:
+                del guild[role][bucket]
+                if not guild[role]:
+                    del guild[role]
+        if guild is not None and not guild:
+            del self._guilds[guild_id]
+
+    def find(self, active_groups, guild_id, role, dungeon=None, key_level=None, limit=5):
+        """
+        Finds the best open slots for a role in a guild.
+
+        Groups for the requested dungeon and closest key level band rank first, then
+        groups starting now, then scheduled groups by start time, then the groups that
+        are closest to full.
+
+        Args:
+            active_groups: The bot's in-memory group dictionary
+            guild_id: The Discord server ID
+            role: "Tank", "Healer" or "DPS"
+            dungeon: Full dungeon name to limit the results to, or None for any dungeon
+            key_level: Preferred key level, or None for any
+            limit: Maximum number of groups to return
+
+        Returns:
+            list: GroupMatch tuples, best first
+        """
+        self.lookups += 1
+        buckets = self._guilds.get(guild_id, {}).get(role)
+        if not buckets:
+            return []
+
+        wanted_band = key_level_band(key_level) if key_level is not None else None
+
+        # Buckets are popped in ranking order, once enough groups are found later ones can't beat them
+        ranked = [
+            (bucket_rank(bucket, wanted_band), bucket)
+            for bucket in buckets
+            if dungeon is None or bucket[0] == dungeon
+        ]
+        heapq.heapify(ranked)
+
+        matches = []
+        while ranked and len(matches) < limit:
+            _, bucket = heapq.heappop(ranked)
+            groups = buckets[bucket]
+            for group_key, _ in heapq.nsmallest(limit - len(matches), groups.items(), key=lambda item: item[1]):
+                group_info = active_groups.get(group_key)
+                if group_info is not None:
+                    matches.append(GroupMatch(group_key, group_info, missing_roles(group_info["state"])))
+        return matches
+
+    def stats(self):
+        """
+        Returns the index size and activity counters.
+
+        Returns:
+            dict: Indexed groups, buckets, updates and lookups
+        """
+        return {
+            "matchmaking_groups_indexed": sum(1 for entry in self._entries.values() if entry[1]),
+            "matchmaking_buckets": sum(len(buckets) for roles in self._guilds.values() for buckets in roles.values()),
+            "matchmaking_updates": self.updates,
+            "matchmaking_lookups": self.lookups,
+        }
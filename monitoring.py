@@ -0,0 +1,258 @@
+import functools
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+log = logging.getLogger(__name__)
+
+# Attributes every log record has, anything else was passed through extra= and is logged as key=value
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats log records as a single line followed by their extra fields as key=value pairs."""
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-8s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = [
+            f"{key}={value!r}" if isinstance(value, str) and " " in value else f"{key}={value}"
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES
+        ]
+        return f"{line} {' '.join(fields)}" if fields else line
+
+
+def setup_logging(level="INFO"):
+    """
+    Routes all logging through a queue so handlers never block on writing output.
+
+    Records are put on an in-memory queue by the calling thread and written to stdout
+    by a background listener thread.
+
+    Args:
+        level: Name or number of the minimum level to log
+
+    Returns:
+        logging.handlers.QueueListener: The started listener, stop it on shutdown to flush
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Counts observations into cumulative buckets per label combination."""
+    def __init__(self, name, documentation, labels=(), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        series = self.values.get(label_values)
+        if series is None:
+            series = self.values[label_values] = [0] * (len(self.buckets) + 2)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[position] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, series in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels + ("le",), label_values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels + ("le",), label_values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """A value per label combination, read from a callback whenever metrics are rendered."""
+    def __init__(self, name, documentation, labels, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.collect = collect  # returns a dictionary of label value tuples to numbers
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in self.collect().items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class MetricsRegistry:
+    """
+    Holds the bot's metrics and renders them in the Prometheus text format.
+
+    Besides counters and histograms, collectors can be registered: functions returning a
+    dictionary of current values (such as a component's stats()), exported as gauges.
+    """
+    def __init__(self, prefix="mythicmate"):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(f"{self.prefix}_{name}", documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=()):
+        metric = Histogram(f"{self.prefix}_{name}", documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, labels, collect):
+        metric = Gauge(f"{self.prefix}_{name}", documentation, labels, collect)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """
+        Registers a function whose returned values are exported as gauges.
+
+        Args:
+            collector: Function returning a dictionary of metric names to numbers
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                log.warning("Metric failed to render", extra={"metric": metric.name, "error": str(e)})
+        for collector in self._collectors:
+            try:
+                values = collector()
+            except Exception as e:
+                log.warning("Metrics collector failed", extra={"error": str(e)})
+                continue
+            for name, value in values.items():
+                lines.append(f"# TYPE {self.prefix}_{name} gauge")
+                lines.append(f"{self.prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+EVENTS = metrics.counter("events_total", "Gateway events and commands handled", ("event",))
+HANDLER_ERRORS = metrics.counter("handler_errors_total", "Handlers that raised an exception", ("event",))
+HANDLER_LATENCY = metrics.histogram("handler_latency_seconds", "Time spent in event and command handlers", ("event",))
+REST_CALLS = metrics.counter("rest_requests_total", "REST requests made to Discord", ("method", "route"))
+
+
+def timed(event):
+    """
+    Decorates an async handler to count its calls and record its latency.
+
+    Args:
+        event: Name the handler is reported under
+
+    Returns:
+        The decorator
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            EVENTS.inc(event)
+            started = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            except Exception:
+                HANDLER_ERRORS.inc(event)
+                raise
+            finally:
+                HANDLER_LATENCY.observe(time.perf_counter() - started, event)
+        return wrapper
+    return decorator
+
+
+def instrument_http(http):
+    """
+    Counts every REST request made through a discord.py HTTP client.
+
+    Args:
+        http: The bot's discord.http.HTTPClient
+    """
+    request = http.request
+
+    async def counted_request(route, **kwargs):
+        REST_CALLS.inc(route.method, route.path)
+        return await request(route, **kwargs)
+
+    http.request = counted_request
+
+
+async def start_metrics_server(host="127.0.0.1", port=9108):
+    """
+    Serves the metrics at /metrics over HTTP.
+
+    Args:
+        host: Address to listen on, local only by default
+        port: Port to listen on
+
+    Returns:
+        aiohttp.web.AppRunner: The runner, call cleanup() on it to stop the server
+    """
+    # Imported here so processes without a metrics server never load the aiohttp server
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Metrics server listening", extra={"host": host, "port": port})
+    return runner
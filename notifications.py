@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Notifications of the same kind to the same user within this many seconds are dropped
+DEDUP_WINDOW = 60.0
+
+# How long notifications are collected before a batch is sent, in seconds
+BATCH_DELAY = 2.0
+
+
+class NotificationQueue:
+    """
+    Outbound queue for user notifications, deduplicated per user and batched.
+
+    A notification has a kind (e.g. "backup") and goes to one user. The first
+    notification of a kind to a user opens a dedup window; repeats within the window
+    are dropped and counted as suppressed. Queued notifications are collected for
+    batch_delay seconds, then each user gets one DM with all of their notifications and
+    each channel one message with all of its announcements.
+
+    Interaction replies come first: when the user's interaction can still be answered
+    the notification is sent as an ephemeral reply right away, which costs no DM
+    channel, and any queued DM of the same kind to that user is dropped.
+
+    Attributes:
+        resolve_user: Coroutine function returning a messageable for a user ID, or None
+        dedup_window: Seconds during which repeated notifications are dropped
+        batch_delay: Seconds notifications are collected before sending
+        announcement_ttl: Seconds before channel announcements are deleted
+        queued: Notifications accepted into the queue
+        suppressed: Notifications dropped as duplicates
+        delivered: Notifications delivered, by route ("ephemeral", "dm" or "channel")
+        failed: Notifications that could not be delivered
+        batches: Batches sent
+    """
+    def __init__(self, resolve_user, dedup_window=DEDUP_WINDOW, batch_delay=BATCH_DELAY,
+                 announcement_ttl=10, concurrency=5):
+        self.resolve_user = resolve_user
+        self.dedup_window = dedup_window
+        self.batch_delay = batch_delay
+        self.announcement_ttl = announcement_ttl
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._recent = {}  # (user_id, kind) -> end of its dedup window
+        self._dms = {}  # user_id -> {kind: text}
+        self._announcements = {}  # channel ID -> (channel, {(user_id, kind): text})
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._flushing = 0
+        self.queued = 0
+        self.suppressed = 0
+        self.delivered = Counter()
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        """Starts the background task that sends batches."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the background task and sends whatever is still queued."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def _admit(self, user_id, kind):
+        # Opens the dedup window for a notification, or counts it as suppressed
+        now = time.monotonic()
+        key = (user_id, kind)
+        if self._recent.get(key, 0.0) > now:
+            self.suppressed += 1
+            return False
+        self._recent[key] = now + self.dedup_window
+        return True
+
+    def notify(self, user_id, kind, text):
+        """
+        Queues a DM to a user.
+
+        Args:
+            user_id: The Discord user ID
+            kind: Notification type, repeats of the same type are deduplicated
+            text: The message
+
+        Returns:
+            bool: True if the notification was queued, False if it was a duplicate
+        """
+        if not self._admit(user_id, kind):
+            return False
+        self._dms.setdefault(user_id, {})[kind] = text
+        self.queued += 1
+        self._wakeup.set()
+        return True
+
+    def announce(self, channel, user_id, kind, text):
+        """
+        Queues an announcement about a user in a channel.
+
+        Args:
+            channel: The Discord channel to post in
+            user_id: ID of the user the announcement is about
+            kind: Notification type, repeats of the same type are deduplicated
+            text: The announcement
+
+        Returns:
+            bool: True if the announcement was queued, False if it was a duplicate
+        """
+        if not self._admit(user_id, kind):
+            return False
+        self._announcements.setdefault(channel.id, (channel, {}))[1][(user_id, kind)] = text
+        self.queued += 1
+        self._wakeup.set()
+        return True
+
+    async def reply(self, interaction, kind, text):
+        """
+        Answers an interaction with an ephemeral notification.
+
+        Interaction replies are never deduplicated, every interaction needs an answer.
+        A queued DM of the same kind to the user becomes redundant and is dropped.
+
+        Args:
+            interaction: The interaction to answer
+            kind: Notification type
+            text: The message
+        """
+        user_id = interaction.user.id
+        pending = self._dms.get(user_id)
+        if pending and pending.pop(kind, None) is not None:
+            self.suppressed += 1
+            if not pending:
+                del self._dms[user_id]
+        self._recent[(user_id, kind)] = time.monotonic() + self.dedup_window
+
+        if interaction.response.is_done():
+            await interaction.followup.send(text, ephemeral=True)
+        else:
+            await interaction.response.send_message(text, ephemeral=True)
+        self.delivered["ephemeral"] += 1
+
+    async def _send_dm(self, user_id, texts):
+        try:
+            async with self._semaphore:
+                user = await self.resolve_user(user_id)
+                if user is None:
+                    self.failed += len(texts)
+                    return
+                await user.send("\n".join(texts))
+            self.delivered["dm"] += len(texts)
+        except discord.HTTPException as e:
+            # Includes users who don't accept DMs, nothing else can reach them
+            log.debug("Could not send notification", extra={"user_id": user_id, "error": str(e)})
+            self.failed += len(texts)
+
+    async def _send_announcements(self, channel, texts):
+        try:
+            async with self._semaphore:
+                await channel.send("\n".join(texts), delete_after=self.announcement_ttl)
+            self.delivered["channel"] += len(texts)
+        except discord.HTTPException as e:
+            log.warning("Could not send announcement", extra={"channel_id": channel.id, "error": str(e)})
+            self.failed += len(texts)
+
+    async def flush(self):
+        """Sends everything queued so far, one DM per user and one message per channel."""
+        dms, self._dms = self._dms, {}
+        announcements, self._announcements = self._announcements, {}
+        if not dms and not announcements:
+            return
+
+        self.batches += 1
+        self._flushing += 1
+        try:
+            await asyncio.gather(
+                *(self._send_dm(user_id, list(texts.values())) for user_id, texts in dms.items() if texts),
+                *(self._send_announcements(channel, list(texts.values())) for channel, texts in announcements.values()),
+            )
+        finally:
+            self._flushing -= 1
+
+        # Forget dedup windows that have ended
+        now = time.monotonic()
+        self._recent = {key: until for key, until in self._recent.items() if until > now}
+
+    def pending(self):
+        """Returns the number of notifications waiting to be sent, including ones being sent."""
+        return (
+            sum(len(texts) for texts in self._dms.values())
+            + sum(len(texts) for _, texts in self._announcements.values())
+            + self._flushing
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await self._wakeup.wait()
+                # Collect whatever else arrives before sending the batch
+                await asyncio.sleep(self.batch_delay)
+                self._wakeup.clear()
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                log.exception("Error sending notifications")
+
+    def delivered_counts(self):
+        """
+        Returns delivered notifications by route, for the labelled metric.
+
+        Returns:
+            dict: (route,) -> notifications delivered
+        """
+        return {(route,): self.delivered[route] for route in ("ephemeral", "dm", "channel")}
+
+    def stats(self):
+        """
+        Returns queue and suppression counters.
+
+        Returns:
+            dict: Queue depth, queued, suppressed and failed notifications, and batches sent
+        """
+        return {
+            "notification_queue_depth": self.pending(),
+            "notifications_queued": self.queued,
+            "notifications_suppressed": self.suppressed,
+            "notifications_failed": self.failed,
+            "notification_batches": self.batches,
+        }
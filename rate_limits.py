@@ -0,0 +1,156 @@
+import time
+from collections import Counter
+
+# Actions that cost Discord requests -> scope -> (tokens refilled per second, burst size).
+# Users are limited across all guilds, guilds across all of their users.
+DEFAULT_LIMITS = {
+    "lfm": {
+        "user": (1 / 20, 3),   # 3 groups at once, then one every 20 seconds
+        "guild": (1 / 3, 15),  # 15 groups at once, then one every 3 seconds
+    },
+    "role": {
+        "user": (0.5, 6),      # 6 role changes at once, then one every 2 seconds
+        "guild": (10.0, 60),   # 60 role changes at once, then 10 per second
+    },
+}
+
+SCOPES = ("user", "guild")
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously up to its capacity.
+
+    Attributes:
+        rate: Tokens added per second
+        capacity: Maximum number of tokens, the allowed burst
+        tokens: Tokens available as of the last refill
+        updated: Clock value of the last refill
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def refill(self, now):
+        """
+        Adds the tokens earned since the last refill.
+
+        Args:
+            now: Current clock value
+
+        Returns:
+            bool: True if the bucket is full
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens >= self.capacity
+
+    def wait_time(self):
+        """Seconds until a token is available, 0 if one is available now."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class ActionLimits:
+    """
+    Per-user and per-guild token buckets for actions that cost Discord requests.
+
+    An action is only allowed if both the user's and the guild's bucket have a token,
+    and then takes one from each, so a rejected action never uses up the other budget.
+    Buckets are created on first use and dropped again once they are full, since a full
+    bucket behaves exactly like a new one.
+
+    Attributes:
+        limits: Action -> scope -> (tokens per second, burst size), see DEFAULT_LIMITS
+        allowed: Allowed actions per action
+        rejected: Rejected actions per (action, scope)
+    """
+    def __init__(self, limits=None, clock=time.monotonic, prune_interval=60):
+        self.limits = limits or DEFAULT_LIMITS
+        self.clock = clock
+        self.prune_interval = prune_interval
+        self._buckets = {}  # (action, scope, id) -> TokenBucket
+        self._next_prune = clock() + prune_interval
+        self.allowed = Counter()
+        self.rejected = Counter()
+
+    def _bucket(self, action, scope, key, now):
+        bucket = self._buckets.get((action, scope, key))
+        if bucket is None:
+            rate, burst = self.limits[action][scope]
+            bucket = self._buckets[(action, scope, key)] = TokenBucket(rate, burst, now)
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def check(self, action, guild_id, user_id):
+        """
+        Takes a token for an action from the user's and the guild's bucket.
+
+        Args:
+            action: "lfm" or "role"
+            guild_id: The Discord server ID, None outside of servers
+            user_id: The Discord user ID
+
+        Returns:
+            float: 0 if the action is allowed, otherwise seconds until it would be
+        """
+        now = self.clock()
+        if now >= self._next_prune:
+            self.prune(now)
+
+        buckets = [("user", self._bucket(action, "user", user_id, now))]
+        if guild_id is not None:
+            buckets.append(("guild", self._bucket(action, "guild", guild_id, now)))
+        for scope, bucket in buckets:
+            wait = bucket.wait_time()
+            if wait:
+                self.rejected[(action, scope)] += 1
+                return wait
+
+        for _, bucket in buckets:
+            bucket.tokens -= 1
+        self.allowed[action] += 1
+        return 0.0
+
+    def prune(self, now=None):
+        """
+        Drops buckets that refilled completely.
+
+        Args:
+            now: Current clock value, defaults to the clock
+
+        Returns:
+            int: Number of buckets dropped
+        """
+        now = self.clock() if now is None else now
+        full = [key for key, bucket in self._buckets.items() if bucket.refill(now)]
+        for key in full:
+            del self._buckets[key]
+        self._next_prune = now + self.prune_interval
+        return len(full)
+
+    def rejected_counts(self):
+        """
+        Returns rejected actions for the labelled metric.
+
+        Returns:
+            dict: (action, scope) -> rejected actions, for every configured limit
+        """
+        return {(action, scope): self.rejected[(action, scope)] for action in self.limits for scope in SCOPES}
+
+    def stats(self):
+        """
+        Returns the limiter counters.
+
+        Returns:
+            dict: Allowed and rejected action totals and the number of live buckets
+        """
+        return {
+            "rate_limit_allowed": sum(self.allowed.values()),
+            "rate_limit_rejected": sum(self.rejected.values()),
+            "rate_limit_buckets": len(self._buckets),
+        }
@@ -0,0 +1,298 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+
+import discord
+
+# How long before the scheduled start members get reminded
+REMINDER_LEAD_TIME = timedelta(minutes=15)
+
+REMINDER_TEXT = "Your M+ run starts in 15 minutes!"
+
+log = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Owns every reminder deadline in a single heap serviced by one background task.
+
+    Scheduling, rescheduling and cancelling are O(log n). Cancelled entries are left in
+    the heap and skipped when they reach the top. All reminders that are due when the
+    task wakes up are handed to the callback together as one batch.
+
+    Attributes:
+        callback: Coroutine function called with a list of due keys
+        batch_size: Maximum number of reminders fired in one batch
+        fired: Number of reminders fired
+        batches: Number of batches fired
+        last_lateness: Seconds between the deadline and firing of the last reminder
+        max_lateness: Largest lateness seen so far, in seconds
+    """
+    def __init__(self, callback, batch_size=100):
+        self.callback = callback
+        self.batch_size = batch_size
+        self._heap = []  # [deadline, sequence, key] entries, key is None once cancelled
+        self._entries = {}  # key -> live heap entry
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._firing = set()  # batches still being handed to the callback
+        self.fired = 0
+        self.batches = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self._total_lateness = 0.0
+
+    def start(self):
+        """Starts the background task that fires due reminders."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the background task and cancels batches still being fired. Pending reminders stay queued."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        firing = list(self._firing)
+        for task in firing:
+            task.cancel()
+        await asyncio.gather(*firing, return_exceptions=True)
+
+    def schedule(self, key, deadline):
+        """
+        Schedules a reminder, replacing any reminder already scheduled for the key.
+
+        Args:
+            key: Identifier passed to the callback when the reminder is due
+            deadline: Timezone-aware datetime at which the reminder is due
+        """
+        self.cancel(key)
+        entry = [deadline.timestamp(), next(self._sequence), key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+        # Only wake the task up if the new reminder is now the next one due
+        if self._heap[0] is entry:
+            self._wakeup.set()
+
+    def reschedule(self, key, deadline):
+        """
+        Moves an existing reminder to a new deadline.
+
+        Args:
+            key: Identifier of the reminder
+            deadline: New timezone-aware deadline
+        """
+        self.schedule(key, deadline)
+
+    def cancel(self, key):
+        """
+        Cancels the reminder for a key, if there is one.
+
+        Args:
+            key: Identifier of the reminder
+
+        Returns:
+            bool: True if a reminder was cancelled
+        """
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return False
+        entry[-1] = None
+
+        # Rebuild the heap once cancelled entries make up most of it
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [e for e in self._heap if e[-1] is not None]
+            heapq.heapify(self._heap)
+        return True
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and len(due) < self.batch_size:
+            deadline, _, key = self._heap[0]
+            if key is None:
+                heapq.heappop(self._heap)
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            del self._entries[key]
+            due.append(key)
+
+            lateness = max(0.0, now - deadline)
+            self.last_lateness = lateness
+            self.max_lateness = max(self.max_lateness, lateness)
+            self._total_lateness += lateness
+        return due
+
+    async def _run(self):
+        while True:
+            try:
+                # Drop cancelled entries so the head of the heap is the next live reminder
+                while self._heap and self._heap[0][-1] is None:
+                    heapq.heappop(self._heap)
+
+                self._wakeup.clear()
+                if not self._heap:
+                    await self._wakeup.wait()
+                    continue
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                due = self._pop_due(time.time())
+                if due:
+                    self.fired += len(due)
+                    self.batches += 1
+                    # Fire in the background so slow deliveries never delay the next deadline
+                    task = asyncio.create_task(self._fire(due))
+                    self._firing.add(task)
+                    task.add_done_callback(self._firing.discard)
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                log.exception("Error in reminder scheduler")
+
+    async def _fire(self, keys):
+        try:
+            await self.callback(keys)
+        except Exception:
+            log.exception("Error sending reminders", extra={"reminders": len(keys)})
+
+    def stats(self):
+        """
+        Returns queue depth and lateness metrics.
+
+        Returns:
+            dict: Pending reminders, fired counts and lateness in seconds
+        """
+        return {
+            "reminder_queue_depth": len(self._entries),
+            "reminder_heap_size": len(self._heap),
+            "reminders_fired": self.fired,
+            "reminder_batches_fired": self.batches,
+            "reminder_last_lateness_seconds": self.last_lateness,
+            "reminder_max_lateness_seconds": self.max_lateness,
+            "reminder_avg_lateness_seconds": self._total_lateness / self.fired if self.fired else 0.0,
+        }
+
+
+class ReminderDelivery:
+    """
+    Delivers reminder DMs with bounded parallelism across all groups.
+
+    DMs for every group share one semaphore, so a popular start time can't open an
+    unbounded number of requests at once. Members who don't accept DMs are collected
+    and mentioned together in a single channel message per group, and DMs that hit a
+    rate limit are retried with exponential backoff.
+
+    Attributes:
+        resolve_user: Coroutine function returning a messageable for a user ID, or None
+        max_retries: How often a rate limited DM is retried
+        base_delay: Backoff before the first retry, in seconds
+        sent: Number of reminder DMs delivered
+        forbidden: Number of members reminded in the channel instead
+        failed: Number of reminders that could not be delivered at all
+        retries: Number of rate limited DMs that were retried
+    """
+    def __init__(self, resolve_user, concurrency=10, max_retries=3, base_delay=1.0):
+        self.resolve_user = resolve_user
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.sent = 0
+        self.forbidden = 0
+        self.failed = 0
+        self.retries = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+        self._latency_count = 0
+
+    def _record_latency(self, deadline):
+        # Latency is measured against the intended reminder time, not the run start
+        latency = max(0.0, time.time() - deadline.timestamp())
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self._total_latency += latency
+        self._latency_count += 1
+
+    async def _send_dm(self, user_id, deadline):
+        # Returns False only when the member can't be DMed and needs the channel fallback
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    member = await self.resolve_user(user_id)
+                    if member is None:
+                        return False
+                    await member.send(f"Reminder: {REMINDER_TEXT}")
+                self.sent += 1
+                self._record_latency(deadline)
+                return True
+            except discord.Forbidden:
+                return False
+            except discord.HTTPException as e:
+                if e.status != 429 or attempt == self.max_retries:
+                    log.warning("Error sending reminder", extra={"user_id": user_id, "error": str(e)})
+                    self.failed += 1
+                    return True
+                self.retries += 1
+                await asyncio.sleep(self.base_delay * 2 ** attempt)
+
+    async def deliver(self, members, channel, deadline):
+        """
+        Sends the reminder to every member of a group.
+
+        Args:
+            members: IDs of the group members to remind
+            channel: The Discord channel to send the fallback message to
+            deadline: The datetime the reminder was due at
+        """
+        members = [user_id for user_id in members if user_id]
+        results = await asyncio.gather(*(self._send_dm(user_id, deadline) for user_id in members))
+
+        # One fallback message for everyone who doesn't accept DMs
+        unreachable = [user_id for user_id, reached in zip(members, results) if not reached]
+        if not unreachable:
+            return
+        mentions = " ".join(f"<@{user_id}>" for user_id in unreachable)
+        try:
+            async with self._semaphore:
+                await channel.send(f"{mentions} (Could not send DM: {REMINDER_TEXT})", delete_after=60)
+            self.forbidden += len(unreachable)
+            for _ in unreachable:
+                self._record_latency(deadline)
+        except discord.HTTPException as e:
+            log.warning("Error sending reminder fallback", extra={"error": str(e)})
+            self.failed += len(unreachable)
+
+    def stats(self):
+        """
+        Returns delivery counters and latency relative to the reminder deadline.
+
+        Returns:
+            dict: Delivery counts and latency in seconds
+        """
+        return {
+            "reminders_sent": self.sent,
+            "reminders_forbidden": self.forbidden,
+            "reminders_failed": self.failed,
+            "reminder_retries": self.retries,
+            "reminder_last_delivery_latency_seconds": self.last_latency,
+            "reminder_max_delivery_latency_seconds": self.max_latency,
+            "reminder_avg_delivery_latency_seconds": self._total_latency / self._latency_count if self._latency_count else 0.0,
+        }
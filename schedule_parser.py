@@ -0,0 +1,216 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from sqlite3 import Error
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+log = logging.getLogger(__name__)
+
+UTC = ZoneInfo("UTC")
+
+# "tonight" without a time means this time
+TONIGHT_HOUR = 20
+
+SCHEDULE_FORMATS = "'now', 'in 2h', 'tonight 20:00', 'tomorrow 7pm', '21:30' or 'YYYY-MM-DD HH:MM'"
+
+# Compiled once; parse_schedule picks the pattern from the first character, so each
+# input is matched against a single pattern
+_CLOCK = r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>am|pm)?"
+_DATE_TIME = re.compile(r"(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})[ t](?P<hour>\d{1,2}):(?P<minute>\d{2})")
+_TIME = re.compile(_CLOCK)
+_DAY_TIME = re.compile(r"(?P<day>today|tonight|tomorrow)(?:\s+(?:at\s+)?" + _CLOCK + r")?")
+_RELATIVE = re.compile(
+    r"in\s+(?:(?P<hours>\d+)\s*(?:h|hr|hrs|hour|hours))?\s*(?:(?P<minutes>\d+)\s*(?:m|min|mins|minute|minutes))?"
+)
+
+
+def _clock(match):
+    # Returns (hour, minute) of a matched clock time, or None if it isn't a valid time
+    hour = int(match["hour"])
+    minute = int(match["minute"] or 0)
+    if match["ampm"]:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match["ampm"] == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _local(day, hour, minute, tz):
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz).astimezone(timezone.utc)
+
+
+def parse_schedule(text, tz=UTC, now=None):
+    """
+    Parses a /lfm schedule into a UTC start time.
+
+    Absolute times are read in the guild's timezone. Supported forms are "now",
+    "in 2h", "in 1h30m", "in 45 minutes", "today 18:00", "tonight" (20:00),
+    "tonight 9pm", "tomorrow at 19:30", "21:30" (the next time it is 21:30) and
+    "YYYY-MM-DD HH:MM".
+
+    Args:
+        text: The schedule as entered
+        tz: The guild's timezone
+        now: Current time as an aware datetime, defaults to now
+
+    Returns:
+        datetime: The start time in UTC, or None for "now"
+
+    Raises:
+        ValueError: If the schedule isn't in a supported form or isn't a valid time
+    """
+    text = text.strip().lower()
+    if text == "now":
+        return None
+    if not text:
+        raise ValueError("empty schedule")
+    now = now or datetime.now(timezone.utc)
+
+    first = text[0]
+    if first == "i":
+        match = _RELATIVE.fullmatch(text)
+        if match and (match["hours"] or match["minutes"]):
+            delta = timedelta(hours=int(match["hours"] or 0), minutes=int(match["minutes"] or 0))
+            return (now + delta).astimezone(timezone.utc)
+    elif first.isdigit():
+        if len(text) > 5 and text[4] == "-":
+            match = _DATE_TIME.fullmatch(text)
+            if match:
+                hour, minute = int(match["hour"]), int(match["minute"])
+                try:
+                    return datetime(
+                        int(match["year"]), int(match["month"]), int(match["day"]), hour, minute, tzinfo=tz
+                    ).astimezone(timezone.utc)
+                except ValueError:
+                    raise ValueError(f"invalid date or time '{text}'")
+        else:
+            match = _TIME.fullmatch(text)
+            clock = match and _clock(match)
+            if clock:
+                today = now.astimezone(tz).date()
+                start = _local(today, *clock, tz)
+                # A time that already passed today means tomorrow
+                return start if start > now else _local(today + timedelta(days=1), *clock, tz)
+    elif first == "t":
+        match = _DAY_TIME.fullmatch(text)
+        if match:
+            if match["hour"]:
+                clock = _clock(match)
+            elif match["day"] == "tonight":
+                clock = (TONIGHT_HOUR, 0)
+            else:
+                clock = None
+            if clock:
+                day = now.astimezone(tz).date()
+                if match["day"] == "tomorrow":
+                    day += timedelta(days=1)
+                return _local(day, *clock, tz)
+
+    raise ValueError(f"unrecognized schedule '{text}'")
+
+
+@lru_cache(maxsize=1)
+def _timezone_names():
+    # Loaded on first use, listing every zone reads the timezone database from disk
+    return {name.lower(): name for name in available_timezones()}
+
+
+def find_timezone(name):
+    """
+    Looks up a timezone by its IANA name, ignoring case.
+
+    Args:
+        name: Timezone name, e.g. "Europe/Berlin"
+
+    Returns:
+        ZoneInfo: The timezone, or None if there is no such timezone
+    """
+    key = _timezone_names().get(name.strip().lower())
+    if key is None:
+        return None
+    try:
+        return ZoneInfo(key)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def timezone_candidates(text, limit=25):
+    """
+    Suggests timezone names containing the typed text.
+
+    Args:
+        text: What the user typed so far
+        limit: Maximum number of suggestions
+
+    Returns:
+        list: Matching timezone names, sorted
+    """
+    text = text.strip().lower().replace(" ", "_")
+    names = _timezone_names()
+    return sorted(name for key, name in names.items() if text in key)[:limit]
+
+
+class GuildTimezones:
+    """
+    In-memory cache of each guild's timezone, backed by the servers table.
+
+    Guilds without a timezone use UTC. The cache is filled once on startup and kept up
+    to date by set(), so looking up a guild's timezone never touches the database.
+
+    Attributes:
+        database: The shared Database the timezones are stored in
+    """
+    def __init__(self, database):
+        self.database = database
+        self._zones = {}  # guild_id -> ZoneInfo
+
+    async def load(self):
+        """Loads every configured timezone from the database."""
+        try:
+            rows = await self.database.get_guild_timezones()
+        except Error as e:
+            log.error("Error loading guild timezones", extra={"error": str(e)})
+            return
+        for guild_id, name in rows.items():
+            tz = find_timezone(name)
+            if tz is None:
+                log.warning("Unknown guild timezone", extra={"guild_id": guild_id, "timezone": name})
+                continue
+            self._zones[guild_id] = tz
+        log.info("Guild timezones loaded", extra={"guilds": len(self._zones)})
+
+    def get(self, guild_id):
+        """
+        Returns a guild's timezone.
+
+        Args:
+            guild_id: The Discord server ID
+
+        Returns:
+            ZoneInfo: The guild's timezone, UTC if none is set
+        """
+        return self._zones.get(guild_id, UTC)
+
+    async def set(self, guild_id, guild_name, tz):
+        """
+        Stores a guild's timezone.
+
+        Args:
+            guild_id: The Discord server ID
+            guild_name: The Discord server name
+            tz: The new timezone
+        """
+        await self.database.set_guild_timezone(guild_id, guild_name, tz.key)
+        self._zones[guild_id] = tz
+
+    def stats(self):
+        """
+        Returns the number of guilds with a timezone.
+
+        Returns:
+            dict: Guilds with a configured timezone
+        """
+        return {"guild_timezones": len(self._zones)}
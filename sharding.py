@@ -0,0 +1,130 @@
+def shard_for_guild(guild_id, shard_count):
+    """
+    Returns the shard Discord routes a guild's events to.
+
+    Args:
+        guild_id: The Discord server ID
+        shard_count: Total number of shards
+
+    Returns:
+        int: The shard ID
+    """
+    return (guild_id >> 22) % shard_count
+
+
+def parse_shard_ids(text):
+    """
+    Parses a shard ID list such as "0-3,8,10-11".
+
+    Args:
+        text: Comma separated shard IDs and inclusive ranges
+
+    Returns:
+        list: The sorted shard IDs
+
+    Raises:
+        ValueError: If the list is malformed
+    """
+    shard_ids = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        first, last = int(start), int(end or start)
+        if first < 0 or last < first:
+            raise ValueError(f"Invalid shard range: {part}")
+        shard_ids.update(range(first, last + 1))
+    return sorted(shard_ids)
+
+
+def split_shards(shard_count, processes):
+    """
+    Splits shards into contiguous ranges, one per process.
+
+    Args:
+        shard_count: Total number of shards
+        processes: Number of processes to split them over
+
+    Returns:
+        list: Lists of shard IDs, one per process, sized as evenly as possible
+    """
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+class ShardPartition:
+    """
+    The shards this process runs, and with them the guilds whose groups it owns.
+
+    Each guild's events only reach the process running its shard, so every process can
+    keep its groups in memory without coordinating with the others. Without a shard
+    count the process runs every shard and owns every guild.
+
+    Attributes:
+        shard_count: Total number of shards across all processes, or None to let Discord decide
+        shard_ids: Shards run by this process, or None for all of them
+    """
+    def __init__(self, shard_count=None, shard_ids=None):
+        if shard_ids is not None and shard_count is None:
+            raise ValueError("A shard count is required when running a subset of shards")
+        if shard_ids is not None and any(shard_id >= shard_count for shard_id in shard_ids):
+            raise ValueError(f"Shard IDs must be below the shard count of {shard_count}")
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self._owned = frozenset(shard_ids) if shard_ids is not None else None
+
+    @classmethod
+    def from_env(cls, environ):
+        """
+        Reads SHARD_COUNT and SHARD_IDS from the environment.
+
+        Args:
+            environ: The environment mapping, usually os.environ
+
+        Returns:
+            ShardPartition: The configured partition
+        """
+        count = environ.get("SHARD_COUNT")
+        ids = environ.get("SHARD_IDS")
+        return cls(int(count) if count else None, parse_shard_ids(ids) if ids else None)
+
+    def runs_shard(self, shard_id):
+        """
+        Checks whether this process runs a shard.
+
+        Args:
+            shard_id: The shard ID
+
+        Returns:
+            bool: True if the shard belongs to this process
+        """
+        return self._owned is None or shard_id in self._owned
+
+    def owns(self, guild_id):
+        """
+        Checks whether a guild's groups belong to this process.
+
+        Args:
+            guild_id: The Discord server ID, or None for direct messages
+
+        Returns:
+            bool: True if this process handles the guild's events
+        """
+        if self._owned is None:
+            return True
+        # Discord delivers direct message events to shard 0
+        shard_id = 0 if guild_id is None else shard_for_guild(guild_id, self.shard_count)
+        return shard_id in self._owned
+
+    def __repr__(self):
+        if self.shard_count is None:
+            return "ShardPartition(auto)"
+        return f"ShardPartition({self.shard_ids or 'all'} of {self.shard_count})"
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import time
+from sqlite3 import Error
+
+log = logging.getLogger(__name__)
+
+# bot_settings key of the hash of the last command tree synced with Discord
+COMMAND_TREE_HASH_KEY = "command_tree_hash"
+
+# Startup phases, in order
+PHASES = ("import", "setup", "connect", "ready")
+
+
+def command_tree_hash(tree):
+    """
+    Hashes the global command tree as it would be sent to Discord.
+
+    Args:
+        tree: The bot's app command tree
+
+    Returns:
+        str: Hex digest that changes whenever a command, option or description changes
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda command: (command.get("type", 1), command["name"])
+    )
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+async def sync_command_tree(tree, database, force=False):
+    """
+    Syncs the global command tree with Discord if it changed since the last sync.
+
+    Syncing is a rate limited global request, so it only happens when the hash of the
+    tree differs from the one stored after the last successful sync.
+
+    Args:
+        tree: The bot's app command tree
+        database: The shared Database the hash is stored in
+        force: Sync even if the tree didn't change
+
+    Returns:
+        bool: True if the tree was synced
+    """
+    tree_hash = command_tree_hash(tree)
+    try:
+        synced_hash = await database.get_setting(COMMAND_TREE_HASH_KEY)
+    except Error as e:
+        log.warning("Could not load command tree hash", extra={"error": str(e)})
+        synced_hash = None
+    if tree_hash == synced_hash and not force:
+        log.info("Command tree unchanged, skipping sync", extra={"hash": tree_hash[:12]})
+        return False
+
+    synced = await tree.sync()
+    log.info("Synced %d commands.", len(synced), extra={"hash": tree_hash[:12]})
+    try:
+        await database.set_setting(COMMAND_TREE_HASH_KEY, tree_hash)
+    except Error as e:
+        log.warning("Could not store command tree hash", extra={"error": str(e)})
+    return True
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase took, for tracking cold start latency.
+
+    Phases are import (loading the modules), setup (setup_hook), connect (gateway
+    connection until the first shard is ready) and ready (until every shard is ready).
+
+    Attributes:
+        started: perf_counter value at process start
+        durations: Seconds per finished phase
+    """
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.durations = {}
+        self._last = self.started
+
+    def mark(self, phase):
+        """
+        Ends a phase. Only the first mark of a phase counts, later ones are ignored.
+
+        Args:
+            phase: Name of the phase that just ended
+
+        Returns:
+            float: Seconds the phase took, or None if it was already marked
+        """
+        if phase in self.durations:
+            return None
+        now = time.perf_counter()
+        self.durations[phase] = now - self._last
+        self._last = now
+        return self.durations[phase]
+
+    @property
+    def time_to_ready(self):
+        """Seconds from process start until ready, or None while still starting."""
+        if "ready" not in self.durations:
+            return None
+        return self._last - self.started
+
+    def phase_durations(self):
+        """
+        Returns phase durations for the labelled metric.
+
+        Returns:
+            dict: (phase,) -> seconds, for the phases finished so far
+        """
+        return {(phase,): self.durations[phase] for phase in PHASES if phase in self.durations}
@@ -0,0 +1,143 @@
+import sys
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """
+    Roughly estimates the memory used by a query result.
+
+    Args:
+        value: A query result made of tuples, lists and scalars
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class StatsCache:
+    """
+    Read-through cache for /mystats and /leaderboard query results.
+
+    Entries are keyed by ("user", guild_id, user_id) or ("leaderboard", guild_id,
+    category, timeframe), expire after a TTL and are evicted least recently used first
+    once the entry or memory cap is reached. Recording a run invalidates the
+    leaderboards of its server and the stats of its participants.
+
+    Attributes:
+        ttl: Seconds an entry stays valid
+        max_entries: Maximum number of cached entries
+        max_bytes: Approximate memory cap for cached results
+    """
+    def __init__(self, ttl=300, max_entries=5000, max_bytes=8 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._guild_keys = {}  # guild_id -> set of cached keys for that guild
+        self._generations = {}  # guild_id -> bumped on every invalidation
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes_used -= size
+        guild_keys = self._guild_keys.get(key[1])
+        if guild_keys is not None:
+            guild_keys.discard(key)
+            if not guild_keys:
+                del self._guild_keys[key[1]]
+
+    def _store(self, key, value):
+        if key in self._entries:
+            self._remove(key)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._guild_keys.setdefault(key[1], set()).add(key)
+        self.bytes_used += size
+
+        while len(self._entries) > self.max_entries or self.bytes_used > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def get(self, key, loader):
+        """
+        Returns a cached result, loading and caching it on a miss.
+
+        Args:
+            key: Cache key, the guild ID must be its second element
+            loader: Coroutine function that runs the query
+
+        Returns:
+            The cached or freshly loaded result
+        """
+        entry = self._entries.get(key)
+        if entry:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self._remove(key)
+            self.expirations += 1
+
+        self.misses += 1
+        guild_id = key[1]
+        generation = self._generations.get(guild_id, 0)
+        value = await loader()
+
+        # Don't cache a result that a run recorded during the query already made stale
+        if self._generations.get(guild_id, 0) == generation:
+            self._store(key, value)
+        return value
+
+    def invalidate_run(self, guild_id, user_ids):
+        """
+        Drops the entries a newly recorded run makes stale.
+
+        Args:
+            guild_id: The Discord server ID the run belongs to
+            user_ids: IDs of the run's participants
+        """
+        self._generations[guild_id] = self._generations.get(guild_id, 0) + 1
+        user_keys = {("user", guild_id, user_id) for user_id in user_ids}
+        for key in list(self._guild_keys.get(guild_id, ())):
+            if key[0] == "leaderboard" or key in user_keys:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_runs(self, runs):
+        """
+        Drops the entries made stale by a batch of recorded runs.
+
+        Args:
+            runs: The CompletedRun tuples that were committed
+        """
+        for run in runs:
+            self.invalidate_run(run.guild_id, [user_id for user_id, _ in run.participants])
+
+    def stats(self):
+        """
+        Returns cache size and hit/miss/eviction counters.
+
+        Returns:
+            dict: Cache metrics
+        """
+        return {
+            "stats_cache_entries": len(self._entries),
+            "stats_cache_bytes": self.bytes_used,
+            "stats_cache_hits": self.hits,
+            "stats_cache_misses": self.misses,
+            "stats_cache_evictions": self.evictions,
+            "stats_cache_expirations": self.expirations,
+            "stats_cache_invalidations": self.invalidations,
+        }